@@ -3,6 +3,11 @@
 # from svgtools import tools
 from svgtools.primitives import Point, Rect, DefsSection, SvgText, SvgRect, SvgLine, SvgCircle, SvgFigure, SvgRoot
 from svgtools.figures import SmartBulb, SmartBulbGrid, SmartRect, SmartRectGrid, SmartBar, SmartBarsCtrl
+from svgtools.document import SvgDocument
+from svgtools.server import LiveServer
+import asyncio
+import random
+import sys
 # from xml.dom import minidom
 # import xml.dom.minidom
 # from pympler import asizeof
@@ -107,10 +112,35 @@ if __name__ == '__main__':
     with open("temlate.html", "r") as tmpl_file:
         tmpl += tmpl_file.read()
 
-    canvas_01 = f'{tmpl.format(svgCanvas_02.to_svg(), svgCanvas_05.to_svg())}'
+    # both canvases share one defs section of the page
+    document = SvgDocument([svgCanvas_02, svgCanvas_05], template=tmpl)
+    canvas_01 = document.to_html()
     with open("index.html", "w") as file:
         file.write(canvas_01)
 
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        # python app.py serve - the live page, the widgets get random values pushed by server-sent events
+        async def serve():
+            server = LiveServer(document, port=8080, fps=10)
+            await server.start()
+            print(f'serving on http://{server.host}:{server.port}')
+            while True:
+                await asyncio.sleep(0.5)
+                server.update({
+                    "BigBulb": random.uniform(0, 100),
+                    "HorBar": random.uniform(0, 200),
+                    "VertBar": random.uniform(0, 100),
+                    "SqBar": random.uniform(0, 100),
+                    "VerBulbGrid": [random.uniform(0, 100) for _ in range(6)],
+                    "bars-vert-1": [random.uniform(0, 100) for _ in range(3)],
+                    "bars-vert-2": [random.uniform(0, 100) for _ in range(6)],
+                })
+
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+
     # print(asizeof.asizeof(svgCanvas_05))
 
 
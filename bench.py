@@ -0,0 +1,588 @@
+"""
+Benchmarks of svgtools
+
+Usage: python bench.py [benchmark name ...]
+Runs all benchmarks, or only the specified ones. The sizes may be changed by the constants below.
+"""
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    from pympler import asizeof
+except ImportError:     # pympler is required by the memory benchmarks only
+    asizeof = None
+
+from svgtools.batch import BatchRenderer, CanvasSpec, render_job
+from svgtools.figures import SmartBar, SmartBulb, SmartBulbGrid
+from svgtools.server import LiveServer, read_events
+from svgtools.spec import SpecLoader
+from math import pi, sin, cos
+
+from svgtools.primitives import Point, Rect, SvgCircle, SvgFigure, SvgRoot, fmt_num, set_precision
+from svgtools.columnar import ArrayBulbGrid
+from svgtools.smartarray import LinkedSmartArray, SmartArray
+
+GRID_CELLS = 100_000
+ARRAY_ITEMS = 100_000
+ARRAY_OPS = 1_000    # the count of positional operations, O(n) each for the linked list
+MEMORY_ITEMS = 1_000_000
+ATTR_ELEMENTS = 100_000
+FIGURES = 10_000
+SPATIAL_ELEMENTS = 50_000
+SPATIAL_QUERIES = 2_000
+VIEWPORT_ELEMENTS = 200_000
+AUTOBOUND_ELEMENTS = 100_000
+BATCH_CANVASES = 400
+SERVER_CLIENTS = 2_000
+SERVER_SECONDS = 3
+SPEC_WIDGETS = 50_000
+SPEC_BUDGET = 2.0    # seconds, the max time of validation and build of SPEC_WIDGETS widgets spec
+
+
+class Steps:
+    """
+    Measure the steps of scenario: the wall time of each step and (in the separate pass, because tracing slows
+    down the allocations) the memory allocated by the step and not released
+    """
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.results = {}
+
+    def run(self, name: str, func, *args, **kwargs):
+        if self.trace_memory:
+            tracemalloc.start()
+            result = func(*args, **kwargs)
+            self.results[name] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+        else:
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            self.results[name] = time.perf_counter() - start
+        return result
+
+
+def run_scenario(scenario, *args) -> dict:
+    """
+    Run the scenario twice: to measure the time and to measure the memory of steps, and print the report
+    :return: {step name: seconds}
+    """
+    timing = Steps()
+    scenario(timing, *args)
+    memory = Steps(trace_memory=True)
+    scenario(memory, *args)
+    for name, seconds in timing.results.items():
+        print(f'    {name:<44} {seconds * 1000:10.1f} ms {memory.results[name] / 2 ** 20:10.1f} MB')
+    return timing.results
+
+
+def bench_columnar_grid(count: int = GRID_CELLS):
+    """ object per cell SmartBulbGrid vs array backed ArrayBulbGrid """
+    print(f'bulb grid, {count} cells')
+    values = [(index * 7) % 100 for index in range(count)]
+    thresholds = {0: "blue", 5: "green", 55: "yellow", 65: "red", 95: "crimson"}
+
+    def scenario(steps: Steps, grid_class):
+        grid = steps.run(f'{grid_class.__name__}: build', grid_class, "grid", bulb_radius=5, count=count)
+        grid.set_thresholds(thresholds)
+        steps.run(f'{grid_class.__name__}: set_values', grid.set_values, values)
+        steps.run(f'{grid_class.__name__}: to_svg', grid.to_svg)
+
+    for grid_class in (SmartBulbGrid, ArrayBulbGrid):
+        run_scenario(scenario, grid_class)
+
+
+def bench_smartarray(count: int = ARRAY_ITEMS, ops: int = ARRAY_OPS):
+    """ doubly linked list LinkedSmartArray vs list backed SmartArray with hash index of keys """
+    print(f'smart array, {count} items, {ops} operations')
+    keys = [f'key-{index}' for index in range(count)]
+    step = count // ops
+
+    def append(arr):
+        for index, key in enumerate(keys):
+            arr.append(index, key=key)
+
+    def index(arr):
+        for position in range(0, count, step):
+            arr.value(position)
+
+    def lookup_by_key(arr):
+        for position in range(0, count, step):
+            arr.value(key=keys[position])
+
+    def insert_at_front(arr):
+        for position in range(ops):
+            arr.insert(position, key=f'front-{position}', at_index=0)
+
+    def insert_at_front_and_lookup(arr):
+        for position in range(ops):
+            arr.insert(position, key=f'mixed-{position}', at_index=0)
+            arr.value(key=keys[position * step])
+
+    def delete(arr):
+        for position in range(count - step, 0, -step):
+            arr.delete(position)
+
+    def scenario(steps: Steps, array_class):
+        arr = array_class()
+        name = array_class.__name__
+        steps.run(f'{name}: append', append, arr)
+        steps.run(f'{name}: index', index, arr)
+        steps.run(f'{name}: lookup by key', lookup_by_key, arr)
+        steps.run(f'{name}: insert at front', insert_at_front, arr)
+        steps.run(f'{name}: lookup by key after insert', lookup_by_key, arr)
+        steps.run(f'{name}: insert at front + lookup by key', insert_at_front_and_lookup, arr)
+        steps.run(f'{name}: delete', delete, arr)
+
+    for array_class in (LinkedSmartArray, SmartArray):
+        run_scenario(scenario, array_class)
+
+
+def deep_size(arr) -> int:
+    """ pympler deep size of SmartArray; the nodes of linked list are passed explicitly, because asizeof does not
+    follow the chain of 1M nodes deeper than its recursion limit """
+    if not isinstance(arr, LinkedSmartArray):
+        return asizeof.asizeof(arr)
+    nodes = []
+    node = arr._LinkedSmartArray__items
+    while node:
+        nodes.append(node)
+        node = node.next
+    return asizeof.asizeof(arr, *nodes, limit=2)
+
+
+def bench_smartarray_memory(count: int = MEMORY_ITEMS):
+    """ deep size (pympler) of the array of floats: linked list, list backed and typed SmartArray """
+    print(f'smart array memory, {count} floats')
+    if asizeof is None:
+        print('    skipped: pympler is not installed')
+        return
+    values = [index * 0.5 for index in range(count)]
+    arrays = {
+        'LinkedSmartArray': lambda: LinkedSmartArray(from_list=values),
+        'SmartArray': lambda: SmartArray(from_list=values),
+        "SmartArray(typecode='d')": lambda: SmartArray(from_list=values, typecode='d'),
+    }
+    for name, build in arrays.items():
+        start = time.perf_counter()
+        arr = build()
+        seconds = time.perf_counter() - start
+        size = deep_size(arr)
+        print(f'    {name:<44} build {seconds * 1000:10.1f} ms {size / 2 ** 20:10.1f} MB '
+              f'{size / count:6.1f} bytes per item')
+        start = time.perf_counter()
+        arr.sort()
+        print(f'    {name:<44} sort  {(time.perf_counter() - start) * 1000:10.1f} ms')
+        del arr
+
+
+def legacy_to_attr_string(element) -> str:
+    """ The serializer replaced by the cached SvgElement.to_attr_string(): no cache, no escaping, no separators """
+    attrs_str = ''
+    if element.id:
+        attrs_str += f'id="{element.id}"'
+    if element.class_name:
+        attrs_str += f'class="{element.class_name}"'
+    for key in element.attributes.keys():
+        if key == "opacity" and float(element.attributes[key]) == 1.0:
+            continue
+        attrs_str += f'{key}="{element.attributes[key]}"'
+    return attrs_str
+
+
+def bench_attr_serializer(count: int = ATTR_ELEMENTS):
+    """ legacy attribute serializer vs compiled and cached to_attr_string() """
+    print(f'attribute serializer, {count} elements')
+    elements = [SvgCircle(cx=index, cy=index, r=5, id=f'c-{index}', class_name='dot', fill='red', stroke='gray',
+                          stroke_width=1, attrs=['opacity:1', 'pointer-events:none', 'display:inline'])
+                for index in range(count)]
+
+    def serialize(serializer):
+        for element in elements:
+            serializer(element)
+
+    def move_and_serialize():
+        """ the typical update of animated element: the geometry is changed, the attributes are not """
+        for element in elements:
+            element.cx += 1
+            element.invalidate(attributes=False)
+            element.to_attr_string()
+
+    def scenario(steps: Steps):
+        for element in elements:
+            element.invalidate()
+        steps.run('legacy to_attr_string, unescaped', serialize, legacy_to_attr_string)
+        steps.run('compile_attr_string, escaped', serialize, SvgCircle.compile_attr_string)
+        steps.run('to_attr_string, first call', serialize, SvgCircle.to_attr_string)
+        steps.run('to_attr_string, cached', serialize, SvgCircle.to_attr_string)
+        steps.run('to_attr_string, after geometry change', move_and_serialize)
+
+    run_scenario(scenario)
+
+
+def legacy_build_figure(figure, counterclockwise=0):
+    """ The points builder replaced by the cached unit shape of SvgFigure.build_figure() """
+    start_angle = figure.start_angle / 2 if figure.r_inner_pct else figure.start_angle
+    angels_count = figure.angels * 2 if figure.r_inner_pct else figure.angels
+
+    start_angle_rad = ((start_angle + figure.rotation) * pi) / 180
+    inner_radius = (figure.r_out / 100) * figure.r_inner_pct
+
+    points = ''
+    if figure.r_inner_pct:
+        points += f'{fmt_num(figure.cx + inner_radius * sin(start_angle_rad))}, ' \
+                  f'{fmt_num(figure.cy - inner_radius * cos(start_angle_rad))}'
+    else:
+        points += f'{fmt_num(figure.cx + figure.r_out * sin(start_angle_rad))}, ' \
+                  f'{fmt_num(figure.cy - figure.r_out * cos(start_angle_rad))}'
+
+    delta = (2 * pi) / angels_count
+
+    for i in range(1, angels_count):
+        if counterclockwise:
+            start_angle_rad += -delta
+        else:
+            start_angle_rad += delta   # correct an angle
+        if figure.r_inner_pct:
+            if i % 2:
+                points += f' {fmt_num(figure.cx + figure.r_out * sin(start_angle_rad))},' \
+                          f'{fmt_num(figure.cy - figure.r_out * cos(start_angle_rad))}'
+            else:
+                points += f' {fmt_num(figure.cx + inner_radius * sin(start_angle_rad))},' \
+                          f'{fmt_num(figure.cy - inner_radius * cos(start_angle_rad))}'
+        else:
+            points += f' {fmt_num(figure.cx + figure.r_out * sin(start_angle_rad))},' \
+                      f'{fmt_num(figure.cy - figure.r_out * cos(start_angle_rad))}'
+
+    return points
+
+
+def bench_figures(count: int = FIGURES):
+    """ identical stars: legacy per vertex sin/cos, cached unit shape, vectorized render_many() """
+    print(f'figures, {count} identical stars')
+    figures = [SvgFigure(cx=(index % 100) * 20, cy=(index // 100) * 20, r_out=8, r_inner=50, angels_count=5,
+                         fill='gold') for index in range(count)]
+
+    def build_points(builder):
+        for figure in figures:
+            builder(figure)
+
+    def scenario(steps: Steps):
+        for digits in (None, 2):
+            set_precision(digits)
+            suffix = '' if digits is None else f', precision {digits}'
+            steps.run(f'legacy build_figure{suffix}', build_points, legacy_build_figure)
+            steps.run(f'build_figure, cached unit shape{suffix}', build_points, SvgFigure.build_figure)
+            for figure in figures:
+                figure.invalidate()
+            steps.run(f'to_svg of every figure{suffix}', build_points, SvgFigure.to_svg)
+            for figure in figures:
+                figure.invalidate()
+            steps.run(f'render_many{suffix}', SvgFigure.render_many, figures)
+        set_precision(None)
+
+    run_scenario(scenario)
+
+
+def bench_spatial(count: int = SPATIAL_ELEMENTS, queries: int = SPATIAL_QUERIES):
+    """ hit testing and region queries: the scan of all elements vs the grid index of SvgRoot """
+    print(f'spatial queries, {count} elements, {queries} queries of each kind')
+    side = int(count ** 0.5) + 1
+    points = [((index * 7919) % (side * 40), (index * 104729) % (side * 40)) for index in range(queries)]
+
+    def build():
+        canvas = SvgRoot(view_box=[0, 0, side * 40, side * 40], autobound=False)
+        canvas.add_elements([SvgCircle((index % side) * 40 + 20, (index // side) * 40 + 20, 15)
+                             for index in range(count)])
+        return canvas
+
+    def hit_test(canvas, points):
+        for x, y in points:
+            canvas.elements_at(x, y)
+
+    def regions(canvas, points):
+        for x, y in points:
+            canvas.elements_in(Rect(x, y, 200, 200))
+
+    def nearest(canvas, points):
+        for x, y in points:
+            canvas.nearest(x, y)
+
+    def scenario(steps: Steps):
+        canvas = build()
+        # the scan of all elements is O(n) per query, it is measured on 1/100 of queries
+        scan_points = points[:queries // 100]
+        steps.run('scan: elements_at, 1/100 of queries', hit_test, canvas, scan_points)
+        steps.run('scan: elements_in, 1/100 of queries', regions, canvas, scan_points)
+        steps.run('scan: nearest, 1/100 of queries', nearest, canvas, scan_points)
+
+        canvas.set_spatial_index(64)
+        steps.run('index: build by the first query', canvas.elements_at, 0, 0)
+        steps.run('index: elements_at', hit_test, canvas, points)
+        steps.run('index: elements_in', regions, canvas, points)
+        steps.run('index: nearest', nearest, canvas, points)
+
+    run_scenario(scenario)
+
+
+def bench_viewport(count: int = VIEWPORT_ELEMENTS):
+    """ the whole canvas vs the viewport (culling) vs the cached tiles """
+    print(f'viewport rendering, {count} elements, viewport and tiles of 1000 x 1000')
+    side = int(count ** 0.5) + 1
+
+    def build():
+        canvas = SvgRoot(view_box=[0, 0, side * 40, side * 40], autobound=False)
+        canvas.add_elements([SvgCircle((index % side) * 40 + 20, (index // side) * 40 + 20, 15, fill='green')
+                             for index in range(count)])
+        canvas.set_spatial_index(64)
+        return canvas
+
+    def render_tiles(canvas, tiles):
+        for column, row, rc in tiles:
+            canvas.render_tile(column, row, 1000)
+
+    def scenario(steps: Steps):
+        canvas = build()
+        steps.run('whole canvas to_svg', canvas.to_svg)
+        steps.run('spatial index: build by the first query', canvas.elements_at, 0, 0)
+        steps.run('viewport to_svg', canvas.to_svg, viewport=Rect(5000, 5000, 1000, 1000))
+        tiles = canvas.tiles(1000)[:16]
+        steps.run('16 tiles: first render', render_tiles, canvas, tiles)
+        steps.run('16 tiles: unchanged, from cache', render_tiles, canvas, tiles)
+        canvas.elements[0].set_attrs(fill='red')
+        steps.run('16 tiles: one element changed', render_tiles, canvas, tiles)
+
+    run_scenario(scenario)
+
+
+def legacy_calc_bound_rect(canvas):
+    """ SvgRoot.calc_bound_rect() before the incremental union box: all elements, Rect per element """
+    left = Point()
+    right = Point()
+
+    for el in canvas.elements:
+        rect = el.get_bound_rect()
+        x1, y1, x2, y2 = rect.to_coord()
+        left.x = x1 if left.x == 0 or x1 < left.x else left.x
+        left.y = y1 if left.y == 0 or y1 < left.y else left.y
+        right.x = x2 if x2 > right.x else right.x
+        right.y = y2 if y2 > right.y else right.y
+
+    return Rect().from_coord(left.x, left.y, right.x, right.y)
+
+
+def bench_autobound(count: int = AUTOBOUND_ELEMENTS):
+    """ the bound rect of autobound canvas: the scan of all elements vs the incrementally maintained union box """
+    print(f'autobound, {count} circles')
+    side = int(count ** 0.5) + 1
+
+    def move_inner(canvas, times: int = 1000):
+        circle = canvas.elements[count // 2]
+        for _ in range(times):
+            circle.cx += 1
+            circle.invalidate(attributes=False, geometry=True)
+            canvas.calc_bound_rect()
+
+    def scenario(steps: Steps):
+        canvas = SvgRoot(view_box=[0, 0, 0, 0])
+        canvas.add_elements([SvgCircle((index % side) * 40 + 20, (index // side) * 40 + 20, 15)
+                             for index in range(count)])
+        steps.run('legacy calc_bound_rect', legacy_calc_bound_rect, canvas)
+        steps.run('calc_bound_rect: first, all elements', canvas.calc_bound_rect)
+        steps.run('calc_bound_rect: unchanged', canvas.calc_bound_rect)
+        steps.run('1000 x (move inner element, calc_bound_rect)', move_inner, canvas)
+        canvas.elements[-1].r += 1000
+        canvas.elements[-1].invalidate(attributes=False, geometry=True)
+        steps.run('calc_bound_rect: edge element grown', canvas.calc_bound_rect)
+        canvas.elements[-1].r -= 1000
+        canvas.elements[-1].invalidate(attributes=False, geometry=True)
+        steps.run('calc_bound_rect: edge element shrunk, rescan', canvas.calc_bound_rect)
+
+    run_scenario(scenario)
+
+
+SITE_THRESHOLDS = '{0:blue,25:green,50:yellow,75:red}'
+
+
+def build_site_canvas(site: int) -> SvgRoot:
+    """ The dashboard of one site: a grid of bulbs, bulbs and bars with values, like app.py builds """
+    canvas = SvgRoot(view_box=[0, 0, 600, 400], autobound=False)
+    grid = SmartBulbGrid(f"site-{site}-grid", x=0, y=0, bulb_radius=8, count=32, gap=2)
+    grid.set_thresholds(SITE_THRESHOLDS)
+    grid.set_values([(site * 7 + index * 13) % 100 for index in range(32)])
+    canvas.add_element(grid)
+    for index in range(20):
+        bulb = SmartBulb(cx=20 + index * 28, cy=60, r=12, id=f"site-{site}-bulb-{index}")
+        bulb.set_thresholds(SITE_THRESHOLDS)
+        bulb.set_value((site + index * 11) % 100)
+        bar = SmartBar(x=10 + index * 28, y=100, width=20, height=150, id=f"site-{site}-bar-{index}",
+                       orient="vert", direction="top", is_3d=False)
+        bar.set_thresholds(SITE_THRESHOLDS)
+        bar.set_value((site * 3 + index * 17) % 100)
+        canvas.add_elements([bulb, bar])
+    return canvas
+
+
+def bench_batch(count: int = BATCH_CANVASES):
+    """ the serial build and rendering of canvases vs BatchRenderer with the pool of worker processes """
+    print(f'batch rendering, {count} site canvases, {os.cpu_count()} cpu cores')
+    jobs = {site: CanvasSpec(build_site_canvas, site) for site in range(count)}
+
+    def serial():
+        return {site: render_job(job) for site, job in jobs.items()}
+
+    def batch(workers: int):
+        with BatchRenderer(workers=workers, thresholds=[SITE_THRESHOLDS]) as renderer:
+            return renderer.render_all(jobs)
+
+    def scenario(steps: Steps):
+        expected = steps.run('serial', serial)
+        steps.run('BatchRenderer, in process', batch, 0)
+        for workers in sorted({1, 2, os.cpu_count() or 1}):
+            result = steps.run(f'BatchRenderer, {workers} workers', batch, workers)
+            assert result == expected
+
+    run_scenario(scenario)
+
+
+def bench_server(clients: int = SERVER_CLIENTS, seconds: float = SERVER_SECONDS, fps: int = 10):
+    """ LiveServer: the stand-in clients connected to one process, the widgets updated every 10 ms """
+    print(f'live server, {clients} clients, {seconds} s of updates, {fps} fps, the clients run in the same process')
+
+    async def client(port: int, received: list, index: int):
+        async for _ in read_events('127.0.0.1', port):
+            received[index] += 1
+
+    async def scenario():
+        canvas = build_site_canvas(0)
+        server = LiveServer(canvas, port=0, fps=fps)
+        frame_times = []
+        build_frame = server.build_frame
+
+        def timed_frame():
+            start = time.perf_counter()
+            data = build_frame()
+            if data is not None:
+                frame_times.append((start, len(data)))
+            return data
+
+        def timed_broadcast(data, broadcast=server.broadcast):
+            broadcast(data)
+            if data is not None:
+                frame_times[-1] = time.perf_counter() - frame_times[-1][0]
+
+        server.build_frame = timed_frame
+        server.broadcast = timed_broadcast
+        await server.start()
+
+        received = [0] * clients
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(client(server.port, received, index)) for index in range(clients)]
+        while len(server.clients) < clients:
+            await asyncio.sleep(0.01)
+        print(f'    {"connect all clients":<44} {(time.perf_counter() - start) * 1000:10.1f} ms')
+
+        updates = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            for _ in range(10):
+                index = updates % 20
+                server.update({f"site-0-bar-{index}": (updates * 7) % 100, f"site-0-bulb-{index}": updates % 100})
+                updates += 1
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(2 / fps)
+        frames = server.frame
+        print(f'    {"updates applied":<44} {updates:10d}')
+        print(f'    {"frames pushed (coalesced updates)":<44} {frames:10d}')
+        print(f'    {"build and write of frame to all clients":<44} '
+              f'{sum(frame_times) / len(frame_times) * 1000:10.1f} ms')
+        print(f'    {"events received by client, min / max":<44} {min(received):10d} / {max(received)}')
+        for task in tasks:
+            task.cancel()
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def build_dashboard_spec(count: int, per_canvas: int = 1000) -> dict:
+    """ The spec of count widgets: the canvases of bulbs and bars sharing presets and thresholds, see spec.py """
+    canvases = []
+    for site in range(0, count, per_canvas):
+        widgets = []
+        for index in range(site, min(site + per_canvas, count)):
+            column, row = index % 40, index % per_canvas // 40
+            if index % 2:
+                widgets.append({"preset": "bar", "id": f"bar-{index}", "x": column * 28, "y": row * 160,
+                                "value": index * 17 % 100})
+            else:
+                widgets.append({"preset": "bulb", "id": f"bulb-{index}", "cx": column * 28 + 12,
+                                "cy": row * 160 + 12, "value": index * 11 % 100})
+        canvases.append({"id": f"site-{site // per_canvas}", "view_box": [0, 0, 1120, 4000], "autobound": False,
+                         "widgets": widgets})
+    return {
+        "thresholds": {"levels": SITE_THRESHOLDS},
+        "presets": {
+            "bulb": {"type": "SmartBulb", "r": 12, "thresholds": "levels"},
+            "bar": {"type": "SmartBar", "width": 20, "height": 150, "orient": "vert", "direction": "top",
+                    "is_3d": False, "thresholds": "levels"},
+        },
+        "canvases": canvases,
+    }
+
+
+def bench_spec(count: int = SPEC_WIDGETS, budget: float = SPEC_BUDGET):
+    """ SpecLoader: the validation and build of dashboard spec vs the widgets built by hand """
+    print(f'dashboard spec, {count} widgets, budget {budget * 1000:.0f} ms')
+    spec = build_dashboard_spec(count)
+
+    def by_hand():
+        canvases = []
+        for canvas_spec in spec["canvases"]:
+            canvas = SvgRoot(id=canvas_spec["id"], view_box=canvas_spec["view_box"], autobound=False)
+            widgets = []
+            for widget in canvas_spec["widgets"]:
+                if widget["preset"] == "bar":
+                    element = SmartBar(x=widget["x"], y=widget["y"], width=20, height=150, id=widget["id"],
+                                       orient="vert", direction="top", is_3d=False)
+                else:
+                    element = SmartBulb(cx=widget["cx"], cy=widget["cy"], r=12, id=widget["id"])
+                element.set_thresholds(SITE_THRESHOLDS)
+                element.set_value(widget["value"])
+                widgets.append(element)
+            canvas.add_elements(widgets)
+            canvases.append(canvas)
+        return canvases
+
+    def scenario(steps: Steps):
+        steps.run('built by hand', by_hand)
+        loader = SpecLoader(spec)
+        steps.run('SpecLoader.validate', loader.validate)
+        loader = SpecLoader(spec)
+        steps.run('SpecLoader.load (validate and build)', loader.load)
+
+    seconds = run_scenario(scenario)['SpecLoader.load (validate and build)']
+    print(f'    {"load time / budget":<44} {seconds / budget * 100:10.1f} % '
+          f'{"ok" if seconds <= budget else "OVER BUDGET"}')
+
+
+BENCHMARKS = {
+    "columnar_grid": bench_columnar_grid,
+    "smartarray": bench_smartarray,
+    "smartarray_memory": bench_smartarray_memory,
+    "attr_serializer": bench_attr_serializer,
+    "figures": bench_figures,
+    "spatial": bench_spatial,
+    "viewport": bench_viewport,
+    "autobound": bench_autobound,
+    "batch": bench_batch,
+    "server": bench_server,
+    "spec": bench_spec,
+}
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for bench_name in names:
+        BENCHMARKS[bench_name]()
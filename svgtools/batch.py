@@ -0,0 +1,162 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+import os
+
+from svgtools.primitives import SvgRoot, defs_registry
+from svgtools.thresholds import compile_thresholds
+
+
+class CanvasSpec:
+    """ CanvasSpec
+        The picklable recipe of canvas: only the reference to the builder and its arguments are sent to the worker
+        process, the tree of elements is built there. It is much cheaper than pickling of the built tree.
+
+        :param builder: the module level function (pickled by reference), which returns SvgRoot, SvgDocument
+                    or any object, whose str() is the markup
+        :param args, kwargs: the arguments of builder, must be picklable
+    """
+    __slots__ = ("builder", "args", "kwargs")
+
+    def __init__(self, builder, *args, **kwargs):
+        self.builder = builder
+        self.args = args
+        self.kwargs = kwargs
+
+    def __repr__(self):
+        return f'CanvasSpec: {getattr(self.builder, "__name__", self.builder)}, args: {self.args}, ' \
+               f'kwargs: {self.kwargs}'
+
+    def build(self):
+        return self.builder(*self.args, **self.kwargs)
+
+
+_warm_state = set()     # the objects kept alive for the life of worker process, see init_worker()
+
+
+def init_worker(thresholds=()):
+    """
+    Warm up the worker process: load the defs resources and compile the shared thresholds once.
+    The compiled thresholds are interned by weak references, so they are kept alive here and reused
+    by all canvases rendered by the worker
+    :param thresholds: thresholds (strings, dicts) used by the canvases
+    """
+    defs_registry.load()
+    _warm_state.update(compile_thresholds(item) for item in thresholds)
+
+
+def render_job(job, with_defs: bool = True) -> str:
+    """
+    Build (in case of CanvasSpec) and serialize the canvas
+    :param job: CanvasSpec, SvgRoot or SvgDocument
+    :param with_defs: False - SvgRoot is rendered without own <defs> section
+    :return: the markup
+    """
+    canvas = job.build() if isinstance(job, CanvasSpec) else job
+    if isinstance(canvas, SvgRoot):
+        return canvas.to_svg(with_defs)
+    return str(canvas)
+
+
+def render_chunk(chunk: list, with_defs: bool = True, return_exceptions: bool = False) -> list:
+    """
+    Render the chunk of jobs in the worker process, the chunk is sent to the worker at once to save the round trips
+    :param chunk: list of (key, job)
+    :return: list of (key, markup), or (key, exception) in case of return_exceptions is True and the job failed
+    """
+    results = []
+    for key, job in chunk:
+        try:
+            results.append((key, render_job(job, with_defs)))
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append((key, e))
+    return results
+
+
+class BatchRenderer:
+    """ BatchRenderer
+        Render many independent canvases in the pool of worker processes.
+        The jobs are sent to the workers in chunks, the results are yielded as soon as they are completed
+        (not in the order of jobs). The count of jobs in flight is limited by max_pending chunks, so the jobs
+        may be produced lazily by a generator and the memory use does not depend on the count of jobs.
+        The workers live as long as the renderer, so their warm state (the loaded defs, the compiled thresholds,
+        the memoized figure shapes, etc.) is reused by all batches.
+
+        with BatchRenderer(thresholds=['{0:blue,25:green}']) as renderer:
+            for key, svg in renderer.render((site, CanvasSpec(build_site, site)) for site in sites):
+                ...
+
+        :param workers: the count of worker processes, None - the count of cpu cores,
+                    0 - render in the current process (no pool, for debugging)
+        :param chunk_size: the count of jobs sent to the worker at once
+        :param max_pending: the max count of chunks in flight, None - 2 chunks per worker
+        :param thresholds: thresholds to be compiled by every worker at the start, see init_worker()
+        :param with_defs: False - SvgRoot canvases are rendered without own <defs> section
+        :param return_exceptions: True - the failed job yields (key, exception), False - the exception is raised
+    """
+    __slots__ = ("workers", "chunk_size", "max_pending", "thresholds", "with_defs", "return_exceptions", "_executor")
+
+    def __init__(self, workers: int = None, chunk_size: int = 8, max_pending: int = None, thresholds=(),
+                 with_defs: bool = True, return_exceptions: bool = False):
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be positive integer, not {chunk_size}")
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending or max(self.workers, 1) * 2
+        self.thresholds = tuple(thresholds)
+        self.with_defs = with_defs
+        self.return_exceptions = return_exceptions
+        self._executor = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        """ Start the worker processes, it is called by the first render() too """
+        if self._executor is None and self.workers:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                                 initargs=(self.thresholds,))
+        return self
+
+    def close(self):
+        """ Stop the worker processes """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def render(self, jobs):
+        """
+        Render the jobs
+        :param jobs: dict {key: job} or iterable of (key, job), job - CanvasSpec (preferred) or the built
+                    SvgRoot/SvgDocument (the whole tree is pickled)
+        :return: iterator of (key, markup) in the order of completion
+        """
+        items = iter(jobs.items() if isinstance(jobs, dict) else jobs)
+        if not self.workers:
+            init_worker(self.thresholds)
+            while chunk := list(islice(items, self.chunk_size)):
+                yield from render_chunk(chunk, self.with_defs, self.return_exceptions)
+            return
+
+        self.start()
+        pending = set()
+        while True:
+            while len(pending) < self.max_pending:
+                chunk = list(islice(items, self.chunk_size))
+                if not chunk:
+                    break
+                pending.add(self._executor.submit(render_chunk, chunk, self.with_defs, self.return_exceptions))
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+    def render_all(self, jobs) -> dict:
+        """ Render the jobs and collect the results: {key: markup} """
+        return dict(self.render(jobs))
@@ -0,0 +1,254 @@
+from array import array
+
+from svgtools.primitives import Rect, SvgElement, diff_attrs, escape_attr, fmt_num
+from svgtools.figures import SmartWidget, as_value_array
+from svgtools.thresholds import ThresholdTable
+
+try:
+    import numpy as np
+except ImportError:     # numpy is optional, set_values() falls back to pure python
+    np = None
+
+
+class ArrayBulbGrid(SmartWidget):
+    """ ArrayBulbGrid
+        The array backed alternative of SmartBulbGrid for very large grids (status walls).
+        The bulbs are not objects: the geometry and the state of all bulbs are stored in contiguous typed arrays
+        (struct of arrays) and the markup is serialized directly from these arrays. The markup and the API
+        (set_states, set_values, set_thresholds, to_svg) are the same as of SmartBulbGrid.
+        The bulbs are the virtual children of grid for SvgRoot.delta(): the deltas address them by the same ids
+        ({id}-bulb-{index}, {id}-bulb-{index}-active) as the bulbs of SmartBulbGrid, only the changed bulbs are sent.
+
+        cx, cy - centers of bulbs, array of doubles
+        states - alert state of bulb, the index of alert_state_N gradient, array of ints
+        values - the last value of bulb, array of doubles
+        colors - the color index of bulb in palette, -1 - bulb displays its state, array of shorts
+        filtered - 1 - the 3d filter is applied to the bulb (the bulb has displayed a value), bytearray
+    """
+    __slots__ = ("is_3d", "is_web_comp", "body_color", "body_width", "bulb_counts", "x", "y", "bulb_radius",
+                 "bulb_gap", "orient", "cx", "cy", "states", "values", "colors", "filtered", "palette", "_palette_index")
+
+    default_state = 5   # no value
+
+    def __init__(self, id: str, x=0, y=0, bulb_radius: int = 24, count: int = 2, gap: int = 2, orient: str = 'hor',
+                 body_color="gray", body_width=1, is_3d: bool = True, is_web_comp: bool = False):
+        super().__init__(id=id, class_name="'SmartBulbGrid'")
+        self.is_3d = is_3d
+        self.is_web_comp = is_web_comp
+        self.body_color = body_color
+        self.body_width = body_width
+        self.bulb_counts = count
+        self.x = x
+        self.y = y
+        self.bulb_radius = bulb_radius
+        self.bulb_gap = gap
+        self.orient = orient
+
+        self.palette: list = []         # colors of values, referenced by index from colors array
+        self._palette_index: dict = {}  # {color: index in palette}
+        self.build_ctrl()
+        self.set_attrs({
+            'is_3d': is_3d,
+            'is_web_comp': is_web_comp,
+            'count': count,
+            'orient': orient,
+            'body_color': body_color,
+            'body_width': body_width,
+            'bulb_radius': bulb_radius,
+            'gap': gap,
+            'thr': str(self.thresholds)
+        })
+
+    def build_ctrl(self):
+        count = self.bulb_counts
+        r = self.bulb_radius
+        step = r * 2 + self.bulb_gap
+        along = [step * index + r for index in range(count)]
+        if self.orient == "vert":
+            self.cx = array('d', [self.x + r]) * count
+            self.cy = array('d', [self.y + offset for offset in along])
+        else:
+            self.cx = array('d', [self.x + offset for offset in along])
+            self.cy = array('d', [self.y + r]) * count
+        self.states = array('i', [self.default_state]) * count
+        self.values = array('d', [0.0]) * count
+        self.colors = array('h', [-1]) * count
+        self.filtered = bytearray(count)
+
+        length = r * 2 * count + self.bulb_gap * (count - 1)
+        wide = r * 2
+        if self.orient == "vert":
+            self.bound_rect.set_rect(Rect(self.x, self.y, wide, length))
+        else:
+            self.bound_rect.set_rect(Rect(self.x, self.y, length, wide))
+
+    def __str__(self):
+        return self.to_svg()
+
+    def __len__(self):
+        return self.bulb_counts
+
+    def get_bound_rect(self):
+        return self.bound_rect.get_bound_rect()
+
+    def iter_children(self):
+        return self.bound_rect,
+
+    def compile_own_refs(self, refs: set):
+        super().compile_own_refs(refs)
+        for state in set(state for state, color in zip(self.states, self.colors) if color < 0):
+            refs.add(f"alert_state_{state}")
+        if self.is_3d and any(self.filtered):
+            refs.add("MyFilter")
+
+    def palette_indexes(self, table: ThresholdTable, default: str = 'black') -> list:
+        """ Map the colors of thresholds table (default color first) to the indexes in the palette """
+        indexes = []
+        for color in (default,) + table.colors:
+            index = self._palette_index.get(color)
+            if index is None:
+                index = self._palette_index[color] = len(self.palette)
+                self.palette.append(color)
+            indexes.append(index)
+        return indexes
+
+    def set_state(self, index: int, state: int):
+        self.states[index] = state
+        self.colors[index] = -1
+        self.invalidate(attributes=False)
+
+    def set_states(self, states):
+        count = min(self.bulb_counts, len(states))
+        self.states[:count] = array('i', states[:count])
+        self.colors[:count] = array('h', [-1]) * count
+        self.invalidate(attributes=False)
+
+    def set_value(self, index: int, value):
+        self.values[index] = value
+        self.colors[index] = self.palette_indexes(self.thresholds)[self.thresholds.index(value) + 1]
+        self.filtered[index] = 1
+        self.invalidate(attributes=False)
+
+    def set_values(self, values):
+        """
+        :param values: list, numpy array or buffer protocol object (array.array, memoryview, ...)
+        """
+        values = as_value_array(values)
+        count = min(self.bulb_counts, len(values))
+        palette_indexes = self.palette_indexes(self.thresholds)
+        if np is not None:
+            values = values[:count]
+            np.frombuffer(self.values, dtype=np.float64)[:count] = values
+            table_indexes = np.searchsorted(self.thresholds.keys, values, side='left') if len(self.thresholds) \
+                else np.zeros(count, dtype=np.intp)
+            np.frombuffer(self.colors, dtype=np.int16)[:count] = np.asarray(palette_indexes, np.int16)[table_indexes]
+        else:
+            values = list(values[:count])
+            self.values[:count] = array('d', values)
+            table = self.thresholds
+            self.colors[:count] = array('h', [palette_indexes[table.index(value) + 1] for value in values])
+        self.filtered[:count] = b'\x01' * count
+        self.invalidate(attributes=False)
+
+    def virtual_snapshot(self) -> tuple:
+        """ The copy of the state of bulbs: (thresholds, states, colors, filtered, palette), see virtual_delta() """
+        return str(self.thresholds), array('i', self.states), array('h', self.colors), bytes(self.filtered), \
+            tuple(self.palette)
+
+    def changed_bulbs(self, snapshot: tuple, prev_snapshot: tuple):
+        """ :return: the indexes of bulbs whose state, color or filter differ in two snapshots """
+        _, states, colors, filtered, _ = snapshot
+        _, prev_states, prev_colors, prev_filtered, _ = prev_snapshot
+        if states == prev_states and colors == prev_colors and filtered == prev_filtered:
+            return ()
+        if np is not None:
+            changed = (np.frombuffer(states, np.intc) != np.frombuffer(prev_states, np.intc)) | \
+                      (np.frombuffer(colors, np.int16) != np.frombuffer(prev_colors, np.int16)) | \
+                      (np.frombuffer(filtered, np.uint8) != np.frombuffer(prev_filtered, np.uint8))
+            return np.flatnonzero(changed).tolist()
+        return [index for index, (state, color, flt, prev_state, prev_color, prev_flt)
+                in enumerate(zip(states, colors, filtered, prev_states, prev_colors, prev_filtered))
+                if state != prev_state or color != prev_color or flt != prev_flt]
+
+    def bulb_attr_dicts(self, index: int, snapshot: tuple) -> tuple:
+        """
+        :return: the attributes of bulb in snapshot as SmartBulb.to_attr_dict() and of its active circle:
+            (bulb attributes, active circle attributes)
+        """
+        thresholds, states, colors, filtered, palette = snapshot
+        body_color = SvgElement.normalize_color_value(self.body_color)
+        bulb = {'class': 'SmartBulb', 'is_3d': str(self.is_3d), 'is_web_comp': str(self.is_web_comp),
+                'w_r': fmt_num(self.bulb_radius), 'body_color': fmt_num(self.body_color),
+                'body_width': fmt_num(self.body_width), 'thr': thresholds}
+        active = {'cx': fmt_num(self.cx[index]), 'cy': fmt_num(self.cy[index]),
+                  'r': fmt_num(self.bulb_radius - self.body_width)}
+        if body_color:
+            active['stroke'] = body_color
+        if self.body_width:
+            active['stroke-width'] = fmt_num(self.body_width)
+        color = colors[index]
+        active['fill'] = f'url(#alert_state_{states[index]})' if color < 0 else palette[color]
+        if self.is_3d and filtered[index]:
+            active['filter'] = 'url(#MyFilter)'
+        return bulb, active
+
+    def virtual_delta(self, snapshot: tuple, prev_snapshot: tuple = None) -> dict:
+        """ The changes of bulbs, see SvgElement.virtual_delta() """
+        if prev_snapshot is None or prev_snapshot[0] != snapshot[0]:
+            indexes = range(self.bulb_counts)
+        else:
+            indexes = self.changed_bulbs(snapshot, prev_snapshot)
+        changes = {}
+        for index in indexes:
+            bulb, active = self.bulb_attr_dicts(index, snapshot)
+            prev_bulb, prev_active = self.bulb_attr_dicts(index, prev_snapshot) if prev_snapshot else (None, None)
+            bulb_id = f'{self.id}-bulb-{index}'
+            for element_id, attrs, prev_attrs in ((bulb_id, bulb, prev_bulb),
+                                                  (f'{bulb_id}-active', active, prev_active)):
+                changed = diff_attrs(attrs, prev_attrs)
+                if changed:
+                    changes[element_id] = changed
+        return changes
+
+    def iter_bulbs_svg(self):
+        """ Yield the markup of bulbs one by one, serialized directly from the arrays """
+        r = self.bulb_radius
+        body_width = self.body_width
+        active_r = fmt_num(r - body_width)
+        body_color = SvgElement.normalize_color_value(self.body_color)
+        id_prefix = f'{escape_attr(self.id)}-bulb-'
+        g_attrs = f'" class="SmartBulb" is_3d="{self.is_3d}" is_web_comp="{self.is_web_comp}" w_r="{fmt_num(r)}"' \
+                  f' body_color="{escape_attr(self.body_color)}" body_width="{fmt_num(body_width)}"' \
+                  f' thr="{escape_attr(self.thresholds)}">\n'
+        stroke = ''
+        if body_color:
+            stroke += f' stroke="{escape_attr(body_color)}"'
+        if body_width:
+            stroke += f' stroke-width="{fmt_num(body_width)}"'
+        filter_attr = ' filter="url(#MyFilter)"' if self.is_3d else ''
+        palette = self.palette
+        r_str = fmt_num(r)
+
+        for index, (cx, cy, state, color, filtered) in enumerate(zip(self.cx, self.cy, self.states, self.colors,
+                                                                     self.filtered)):
+            x1 = cx - r
+            y1 = cy - r
+            width = cx + r - x1
+            height = cy + r - y1
+            cx, cy, x1, y1, width, height = fmt_num(cx), fmt_num(cy), fmt_num(x1), fmt_num(y1), fmt_num(width), \
+                fmt_num(height)
+            fill = f'url(#alert_state_{state})' if color < 0 else palette[color]
+            yield f'<g id="{id_prefix}{index}{g_attrs}' \
+                  f'<rect x="{x1}" y="{y1}" width="{width}" height="{height}" display="none"/>\n' \
+                  f'<circle cx="{cx}" cy="{cy}" r="{r_str}" pointer-events="none" fill="none"/>\n' \
+                  f'<circle cx="{cx}" cy="{cy}" r="{active_r}" id="{id_prefix}{index}-active"{stroke}' \
+                  f' fill="{escape_attr(fill)}"{filter_attr if filtered else ""}/>\n' \
+                  f'</g>\n'
+
+    def iter_svg(self):
+        if self.is_web_comp:
+            return
+        yield f'<g{self.to_attr_string()}>\n'
+        yield self.bound_rect.to_svg()
+        yield from self.iter_bulbs_svg()
+        yield '</g>\n'
@@ -0,0 +1,30 @@
+/**
+ * Apply the delta, produced by SvgRoot.delta_json(), to the svg elements of the page.
+ * The delta has form {element id: {attribute: value}}, null value removes the attribute,
+ * the pseudo attribute "textContent" replaces the text of element.
+ * @param {Object|string} delta - delta object or json string
+ * @param {Document|Element} [root=document] - the document or svg element containing the canvas
+ */
+function applySvgDelta(delta, root) {
+    if (typeof delta === 'string') {
+        delta = JSON.parse(delta);
+    }
+    root = root || document;
+    for (const id in delta) {
+        const el = root.getElementById ? root.getElementById(id) : root.querySelector('[id="' + id + '"]');
+        if (!el) {
+            continue;
+        }
+        const attrs = delta[id];
+        for (const name in attrs) {
+            const value = attrs[name];
+            if (name === 'textContent') {
+                el.textContent = value === null ? '' : value;
+            } else if (value === null) {
+                el.removeAttribute(name);
+            } else {
+                el.setAttribute(name, value);
+            }
+        }
+    }
+}
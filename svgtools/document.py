@@ -0,0 +1,76 @@
+from svgtools.primitives import DefsSection, SvgRoot
+
+
+class SvgDocument:
+    """ SvgDocument
+        Composes several SvgRoot canvases into one html page.
+        The defs referenced by all canvases are emitted only once, into a hidden shared <svg>,
+        and the canvases are rendered without their own <defs> sections, so the ids stay unique on the page.
+
+        :param canvases: list of SvgRoot instances, in order of the template placeholders
+        :param template: html template with positional placeholders {0}, {1}, ... for canvases
+                    and optional {defs} placeholder for the shared defs, empty - the minimal page with all canvases
+                    one after another, see default_template()
+    """
+    __slots__ = ("canvases", "template")
+
+    namespace = 'xmlns="http://www.w3.org/2000/svg"'
+    # do not use display:none here, browsers do not render gradients and filters defined inside a hidden svg
+    defs_style = 'position:absolute;width:0;height:0;overflow:hidden'
+
+    def __init__(self, canvases: list = None, template: str = ''):
+        self.canvases: list = []
+        self.template = template
+        if canvases:
+            self.add_canvases(canvases)
+
+    def __str__(self) -> str:
+        return self.to_html()
+
+    def add_canvas(self, canvas: SvgRoot):
+        self.canvases.append(canvas)
+
+    def add_canvases(self, canvases: list):
+        for canvas in canvases:
+            self.canvases.append(canvas)
+
+    def collect_refs(self) -> set:
+        """ collect ids of defs referenced by all canvases of the document """
+        refs = set()
+        for canvas in self.canvases:
+            canvas.collect_refs(refs)
+        return refs
+
+    def defs_to_svg(self, all_defs: bool = False) -> str:
+        """
+        build the hidden <svg> with shared defs of all canvases
+        :param all_defs: emit all entries of defs registry, not only the referenced ones.
+                    For the live pages, which may get the references to other defs later
+        """
+        refs = None if all_defs else self.collect_refs()
+        return f'<svg {self.namespace} width="0" height="0" style="{self.defs_style}" aria-hidden="true">\n' \
+               f'{DefsSection.to_svg(refs)}</svg>'
+
+    def canvases_to_svg(self) -> list:
+        return [canvas.to_svg(with_defs=False) for canvas in self.canvases]
+
+    def default_template(self) -> str:
+        """ :return: the minimal html page: the shared defs and all canvases of document in the body """
+        canvases = ''.join(f'{{{index}}}\n' for index in range(len(self.canvases)))
+        return f'<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"></head>\n<body>\n{{defs}}\n{canvases}</body>\n</html>\n'
+
+    def to_html(self, template: str = '', all_defs: bool = False) -> str:
+        """
+        Fill the template with shared defs and canvases
+        :param template: html template, the template of document is used in case of empty,
+                    the default_template() in case of both are empty
+        :param all_defs: see defs_to_svg()
+        :return: html page string
+        """
+        template = template or self.template or self.default_template()
+        defs = self.defs_to_svg(all_defs)
+        canvases = self.canvases_to_svg()
+        if '{defs}' not in template and canvases:
+            # no dedicated placeholder, the shared defs precede the first canvas
+            canvases[0] = f'{defs}\n{canvases[0]}'
+        return template.format(*canvases, defs=defs)
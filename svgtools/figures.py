@@ -2,7 +2,29 @@ from abc import abstractmethod, ABCMeta
 from typing import Dict, overload
 
 from svgtools.primitives import Point, Rect, DefsSection, SvgElement, SvgRect, SvgLine, SvgText, SvgCircle, SvgEllipse, SvgFigure
+from svgtools.primitives import ATTRS_HIDDEN, ATTRS_NO_POINTER_EVENTS, ATTRS_FILTER_3D, ATTRS_DASHED, attr_preset
 from svgtools.smartarray import SmartArray
+from svgtools.thresholds import ThresholdTable, compile_thresholds
+
+try:
+    import numpy as np
+except ImportError:     # numpy is optional, set_values() falls back to pure python
+    np = None
+
+
+ATTRS_DROP_SHADOW = attr_preset({'filter': 'url(#dropShadow)'})
+
+
+def as_value_array(values):
+    """
+    Accept values as list, numpy array or any object supporting the buffer protocol (array.array, memoryview, ...)
+    :return: numpy float array in case of numpy is installed, otherwise the sequence of values
+    """
+    if np is not None:
+        return np.asarray(values, dtype=float)
+    if isinstance(values, memoryview):
+        return values.tolist()
+    return values
 
 
 class SmartWidget(SvgElement, metaclass=ABCMeta):
@@ -12,8 +34,9 @@ class SmartWidget(SvgElement, metaclass=ABCMeta):
         super().__init__(id, class_name)
         self.min_value: float = float(0)
         self.max_value: float = float(100)
-        self.thresholds = dict()
-        self.bound_rect = SvgRect(attrs='{"display":"none"}')
+        self.thresholds: ThresholdTable = compile_thresholds({})
+        self.bound_rect = SvgRect(attrs=ATTRS_HIDDEN)
+        self.adopt(self.bound_rect)
 
     @abstractmethod
     def build_ctrl(self):
@@ -25,27 +48,42 @@ class SmartWidget(SvgElement, metaclass=ABCMeta):
     def set_bound_rect(self, rect: Rect):
         self.bound_rect.set_rect(rect)
 
+    def get_bound_box(self) -> tuple:
+        return self.bound_rect.get_bound_box()
+
     def set_min_value(self, value: float | int):
         self.min_value = float(value)
+        self.invalidate(attributes=False)
 
     def set_max_value(self, value: float | int):
         self.max_value = float(value)
-
-    def set_thresholds(self, thr_str: str | dict):
-        self.thresholds = dict()
-
-        if type(thr_str) == dict:
-            self.thresholds = thr_str.copy()
-        else:
-            thr_str = thr_str.removeprefix('{')
-            thr_str = thr_str.removesuffix('}')
-
-            thr_a = thr_str.split(",")
-            for thr in thr_a:
-                v, c = thr.split(":")
-                self.thresholds.update({int(v):c})
-
-        self.set_attributes([f'thr:{self.thresholds.__str__()}'])
+        self.invalidate(attributes=False)
+
+    def set_children_values(self, children: list, values):
+        """
+        Set values of child widgets at once: the colors of all values are resolved in one vectorized pass
+        in case of all children share the thresholds of this widget
+        :param children: child widgets, each having set_color() and set_value() methods
+        :param values: list, numpy array or buffer protocol object (array.array, memoryview, ...)
+        """
+        values = as_value_array(values)
+        count = min(len(children), len(values))
+        children = children[:count]
+        if not all(child.thresholds is self.thresholds for child in children):
+            for child, value in zip(children, values):
+                child.set_value(value)
+            return
+
+        for child, color in zip(children, self.thresholds.resolve_many(values[:count])):
+            child.set_color(color)
+
+    def set_thresholds(self, thr_str: str | dict | ThresholdTable):
+        """
+        :param thr_str: thresholds string '{0:blue,25:green}', dict {0: 'blue', 25: 'green'}
+                    or already compiled ThresholdTable. The keys may be specified in any order
+        """
+        self.thresholds = compile_thresholds(thr_str)
+        self.set_attrs(thr=str(self.thresholds))
 
 
 class SmartBulb(SmartWidget):
@@ -66,19 +104,20 @@ class SmartBulb(SmartWidget):
         self.body_width = body_width
 
         self.build_ctrl()
-        self.set_attributes([
-            f'is_3d:{is_3d}',
-            f'is_web_comp:{is_web_comp}',
-            f'w_r:{r}',
-            f'body_color:{body_color}',
-            f'body_width:{body_width}',
-            f'thr:{self.thresholds}'
-        ])
+        self.set_attrs({
+            'is_3d': is_3d,
+            'is_web_comp': is_web_comp,
+            'w_r': r,
+            'body_color': body_color,
+            'body_width': body_width,
+            'thr': str(self.thresholds)
+        })
 
     def build_ctrl(self):
-        self.body = SvgCircle(cx=self.cx, cy=self.cy, r=self.r, fill="none", attrs='{"pointer-events":"none"}')
+        self.body = SvgCircle(cx=self.cx, cy=self.cy, r=self.r, fill="none", attrs=ATTRS_NO_POINTER_EVENTS)
         self.active = SvgCircle(cx=self.cx, cy=self.cy, r=self.r - self.body_width, id=self.build_id("active"),
                                 stroke=self.body_color, stroke_width=self.body_width)
+        self.adopt(self.body, self.active)
         self.set_bound_rect(self.body.get_bound_rect())
         self.set_state(5)  # default state (no value)
 
@@ -88,34 +127,29 @@ class SmartBulb(SmartWidget):
     def get_bound_rect(self):
         return self.bound_rect.get_bound_rect()
 
-    def to_svg(self):
-        svg_str = ''
+    def iter_children(self):
+        return self.bound_rect, self.body, self.active
+
+    def iter_svg(self):
         if self.is_web_comp:
-            pass
-        else:
-            svg_str += f'<g {self.to_attr_string()}>\n' \
-                f'{self.bound_rect.to_svg()}\n' \
-                f'{self.body.to_svg()}\n' \
-                f'{self.active.to_svg()}\n' \
-                f'</g>\n'
-        return svg_str
+            return
+        yield f'<g{self.to_attr_string()}>\n'
+        for element in (self.bound_rect, self.body, self.active):
+            yield element.to_svg()
+            yield '\n'
+        yield '</g>\n'
 
     def set_value(self, value):
-        color = 'black'
-        attr_list = []
-        if self.is_3d:
-            attr_list.append('filter:url(#MyFilter)')
-
-        for v in self.thresholds:
-            if value > v:
-                color = self.thresholds[v]
+        self.set_color(self.thresholds.resolve(value))
 
-        attr_list.append(f"fill:{color}")
-        self.active.set_attributes(attr_list)
+    def set_color(self, color):
+        if self.is_3d:
+            self.active.set_attrs(ATTRS_FILTER_3D, fill=color)
+        else:
+            self.active.set_attrs(fill=color)
 
     def set_state(self, state):
-        attrs = [f"fill:url(#alert_state_{state})"]
-        self.active.set_attributes(attrs)
+        self.active.set_attrs(fill=f"url(#alert_state_{state})")
 
 
 class SmartBulbGrid(SmartWidget):
@@ -136,20 +170,21 @@ class SmartBulbGrid(SmartWidget):
         self.bulb_gap = gap
         self.orient = orient
 
-        self.bound_rect = SvgRect(attrs='{"display":"none"}')
+        self.bound_rect = SvgRect(attrs=ATTRS_HIDDEN)
+        self.adopt(self.bound_rect)
         self.bulbs: list = []
         self.build_ctrl()
-        self.set_attributes([
-            f'is_3d:{is_3d}',
-            f'is_web_comp:{is_web_comp}',
-            f'count:{count}',
-            f'orient:{orient}',
-            f'body_color:{body_color}',
-            f'body_width:{body_width}',
-            f'bulb_radius:{bulb_radius}',
-            f'gap:{gap}',
-            f'thr:{self.thresholds}'
-        ])
+        self.set_attrs({
+            'is_3d': is_3d,
+            'is_web_comp': is_web_comp,
+            'count': count,
+            'orient': orient,
+            'body_color': body_color,
+            'body_width': body_width,
+            'bulb_radius': bulb_radius,
+            'gap': gap,
+            'thr': str(self.thresholds)
+        })
 
     def build_ctrl(self):
         cx = self.bulb_radius
@@ -166,45 +201,48 @@ class SmartBulbGrid(SmartWidget):
                              body_width=self.body_width, is_3d=self.is_3d, is_web_comp=self.is_web_comp)
             bulb.set_state(5)   # default state (no value)
             self.bulbs.append(bulb)
+            self.adopt(bulb)
 
         length = cx * 2 * self.bulb_counts + self.bulb_gap * (self.bulb_counts - 1)
         wide = cy * 2
         if self.orient == "vert":
-            self.bound_rect.set_rect(Rect(0, 0, wide, length))
+            self.bound_rect.set_rect(Rect(self.x, self.y, wide, length))
         else:
-            self.bound_rect.set_rect(Rect(0, 0, length, wide))
+            self.bound_rect.set_rect(Rect(self.x, self.y, length, wide))
 
     def get_bound_rect(self):
         return self.bound_rect.get_bound_rect()
 
-    def set_thresholds(self, thr_str: str | dict):
+    def iter_children(self):
+        yield self.bound_rect
+        yield from self.bulbs
+
+    def set_thresholds(self, thr_str: str | dict | ThresholdTable):
         super().set_thresholds(thr_str)
         for bulb in self.bulbs:
-            bulb.set_thresholds(thr_str)
+            bulb.set_thresholds(self.thresholds)    # all bulbs share the compiled table
 
     def set_states(self, states: list):
         for stz in zip(self.bulbs, states):
             stz[0].set_state(stz[1])
 
-    def set_values(self, values: list):
-        for vlz in zip(self.bulbs, values):
-            vlz[0].set_value(vlz[1])
+    def set_values(self, values):
+        """
+        :param values: list, numpy array or buffer protocol object (array.array, memoryview, ...)
+        """
+        self.set_children_values(self.bulbs, values)
 
     def __str__(self):
         return self.to_svg()
 
-    def to_svg(self) -> str:
+    def iter_svg(self):
         if self.is_web_comp:
-            pass
-        else:
-            svg_str = f'<g {self.to_attr_string()}>\n'
-            svg_str += self.bound_rect.to_svg()
-            for el in self.bulbs:
-                bulb_str = el.to_svg()
-                svg_str += bulb_str
-
-            svg_str += f'</g>\n'
-        return svg_str
+            return
+        yield f'<g{self.to_attr_string()}>\n'
+        yield self.bound_rect.to_svg()
+        for el in self.bulbs:
+            yield el.to_svg()
+        yield '</g>\n'
 
 
 class SmartRect(SmartWidget):
@@ -227,23 +265,24 @@ class SmartRect(SmartWidget):
         self.body_color = body_color
         self.body_width = body_width
         self.build_ctrl()
-        self.set_attributes([
-            f'is_3d:{is_3d}',
-            f'is_web_comp:{is_web_comp}',
-            f'w_width:{width}',
-            f'w_height:{height}',
-            f'w_rx:{rx}',
-            f'w_ry:{ry}',
-            f'body_color:{body_color}',
-            f'body_width:{body_width}',
-            f'thr:{self.thresholds}'
-        ])
+        self.set_attrs({
+            'is_3d': is_3d,
+            'is_web_comp': is_web_comp,
+            'w_width': width,
+            'w_height': height,
+            'w_rx': rx,
+            'w_ry': ry,
+            'body_color': body_color,
+            'body_width': body_width,
+            'thr': str(self.thresholds)
+        })
 
     def build_ctrl(self):
         self.body = SvgRect(self.x, self.y, self.width, self.height, rx=self.rx, ry=self.ry,
-                            fill=self.body_color, attrs='{"pointer-events":"none"}')
+                            fill=self.body_color, attrs=ATTRS_NO_POINTER_EVENTS)
         self.active = SvgRect(self.x + self.body_width, self.y + self.body_width, self.width - self.body_width * 2,
                               self.height - self.body_width * 2, rx=self.rx, ry=self.ry, id=self.build_id("active"))
+        self.adopt(self.body, self.active)
         self.set_bound_rect(self.body.get_bound_rect())
         self.set_state(5)   # default state (no value)
 
@@ -253,34 +292,29 @@ class SmartRect(SmartWidget):
     def get_bound_rect(self):
         return self.bound_rect.get_bound_rect()
 
-    def to_svg(self):
-        svg_str = ''
+    def iter_children(self):
+        return self.bound_rect, self.body, self.active
+
+    def iter_svg(self):
         if self.is_web_comp:
-            pass
-        else:
-            svg_str += f'<g {self.to_attr_string()}>\n' \
-                f'{self.bound_rect.to_svg()}\n' \
-                f'{self.body.to_svg()}\n' \
-                f'{self.active.to_svg()}\n' \
-                f'</g>\n'
-        return svg_str
+            return
+        yield f'<g{self.to_attr_string()}>\n'
+        for element in (self.bound_rect, self.body, self.active):
+            yield element.to_svg()
+            yield '\n'
+        yield '</g>\n'
 
     def set_value(self, value):
-        color = 'black'
-        attr_list = []
-        if self.is_3d:
-            attr_list.append('filter:url(#MyFilter)')
+        self.set_color(self.thresholds.resolve(value))
 
-        for v in self.thresholds:
-            if value > v:
-                color = self.thresholds[v]
-
-        attr_list.append(f"fill:{color}")
-        self.active.set_attributes(attr_list)
+    def set_color(self, color):
+        if self.is_3d:
+            self.active.set_attrs(ATTRS_FILTER_3D, fill=color)
+        else:
+            self.active.set_attrs(fill=color)
 
     def set_state(self, state):
-        attrs = [f"fill:url(#alert_state_{state})"]
-        self.active.set_attributes(attrs)
+        self.active.set_attrs(fill=f"url(#alert_state_{state})")
 
 
 class SmartRectGrid(SmartWidget):
@@ -304,24 +338,25 @@ class SmartRectGrid(SmartWidget):
         self.rect_gap = gap
         self.orient = orient
 
-        self.bound_rect = SvgRect(attrs='{"display":"none"}')
+        self.bound_rect = SvgRect(attrs=ATTRS_HIDDEN)
+        self.adopt(self.bound_rect)
         self.children: list = []
         self.build_ctrl()
 
-        self.set_attributes([
-            f'is_3d:{is_3d}',
-            f'is_web_comp:{is_web_comp}',
-            f'count:{count}',
-            f'orient:{orient}',
-            f'body_color:{body_color}',
-            f'body_width:{body_width}',
-            f'w_width:{width}',
-            f'w_height:{height}',
-            f'w_rx:{rx}',
-            f'w_ry:{ry}',
-            f'gap:{gap}',
-            f'thr:{self.thresholds}'
-        ])
+        self.set_attrs({
+            'is_3d': is_3d,
+            'is_web_comp': is_web_comp,
+            'count': count,
+            'orient': orient,
+            'body_color': body_color,
+            'body_width': body_width,
+            'w_width': width,
+            'w_height': height,
+            'w_rx': rx,
+            'w_ry': ry,
+            'gap': gap,
+            'thr': str(self.thresholds)
+        })
 
     def build_ctrl(self):
         for index in range(self.rect_counts):
@@ -337,6 +372,7 @@ class SmartRectGrid(SmartWidget):
                              is_3d=self.is_3d, is_web_comp=self.is_web_comp)
             rect.set_state(5)   # default state (no value)
             self.children.append(rect)
+            self.adopt(rect)
 
         if self.orient == "vert":
             length = (self.height * self.rect_counts) + self.rect_gap * (self.rect_counts - 1)
@@ -348,33 +384,36 @@ class SmartRectGrid(SmartWidget):
     def get_bound_rect(self):
         return self.bound_rect.get_bound_rect()
 
-    def set_thresholds(self, thr_str: str | dict):
+    def iter_children(self):
+        yield self.bound_rect
+        yield from self.children
+
+    def set_thresholds(self, thr_str: str | dict | ThresholdTable):
         super().set_thresholds(thr_str)
         for child in self.children:
-            child.set_thresholds(thr_str)
+            child.set_thresholds(self.thresholds)   # all children share the compiled table
 
     def set_states(self, states: list):
         for stz in zip(self.children, states):
             stz[0].set_state(stz[1])
 
-    def set_values(self, values: list):
-        for vlz in zip(self.children, values):
-            vlz[0].set_value(vlz[1])
+    def set_values(self, values):
+        """
+        :param values: list, numpy array or buffer protocol object (array.array, memoryview, ...)
+        """
+        self.set_children_values(self.children, values)
 
     def __str__(self):
         return self.to_svg()
 
-    def to_svg(self) -> str:
+    def iter_svg(self):
         if self.is_web_comp:
-            pass
-        else:
-            svg_str = f'<g {self.to_attr_string()}>\n'
-            svg_str += self.bound_rect.to_svg()
-            for el in self.children:
-                svg_str += el.to_svg()
-
-            svg_str += f'</g>\n'
-        return svg_str
+            return
+        yield f'<g{self.to_attr_string()}>\n'
+        yield self.bound_rect.to_svg()
+        for el in self.children:
+            yield el.to_svg()
+        yield '</g>\n'
 
 
 class SmartBar(SmartRect):
@@ -391,24 +430,21 @@ class SmartBar(SmartRect):
         self.direction = direction
         xx, yy, ww, hh = self.active.get_bound_rect().to_list()
         self.abrc = Rect(xx, yy, ww, hh)    # store original active body rectangle
-        self.set_attributes([
-            f'orient:{orient}',
-            f'direction:{direction}'
-        ])
+        self.set_attrs({
+            'orient': orient,
+            'direction': direction
+        })
 
-    def to_svg(self):
-        svg_str = ''
+    def iter_svg(self):
         if self.is_web_comp:
-            pass
-        else:
-            svg_str += f'<g {self.to_attr_string()}>\n' \
-                f'{self.bound_rect.to_svg()}\n' \
-                f'{self.body.to_svg()}\n' \
-                f'{self.active.to_svg()}\n' \
-                f'</g>\n'
-        return svg_str
-
-    def normalize_value(self, value):
+            return
+        yield f'<g{self.to_attr_string()}>\n'
+        for element in (self.bound_rect, self.body, self.active):
+            yield element.to_svg()
+            yield '\n'
+        yield '</g>\n'
+
+    def check_value(self, value):
         if value > self.max_value:
             print(f'{self.id}: ValueException: input value {value} greater max value {self.max_value}')
             value = self.max_value
@@ -416,44 +452,51 @@ class SmartBar(SmartRect):
         if value < self.min_value:
             print(f'{self.id}: ValueException: input value {value} lower min value {self.min_value}')
             value = self.max_value
+        return value
 
+    def normalize(self, value) -> tuple:
+        """
+        :return: tuple (norm_v, norm_w, norm_h, offset_x, offset_y)
+        """
+        value = self.check_value(value)
         norm_v = value * 100 / self.max_value
 
         norm_w = (self.abrc.width / (self.max_value - self.min_value)) * value
         norm_h = (self.abrc.height / (self.max_value - self.min_value)) * value
         offset_y = self.abrc.height - norm_h
         offset_x = self.abrc.width - norm_w
+        return norm_v, norm_w, norm_h, offset_x, offset_y
+
+    def normalize_value(self, value):
+        norm_v, norm_w, norm_h, offset_x, offset_y = self.normalize(value)
         return {"norm_v": norm_v, "norm_w": norm_w, "norm_h": norm_h, "offset_y": offset_y, "offset_x": offset_x}
 
     def set_value(self, value):
-        color = 'black'
-        attr_list = []
-        if self.is_3d:
-            attr_list.append('filter:url(#MyFilter)')
-
-        norm = self.normalize_value(value)
-        for v in self.thresholds:
-            if norm["norm_v"] > v:
-                color = self.thresholds[v]
-
-        attr_list.append(f"fill:{color}")
-        self.active.set_attributes(attr_list)
-
+        norm_v, norm_w, norm_h, offset_x, offset_y = self.normalize(value)
+        self.set_color(self.thresholds.resolve(norm_v))
+        self.set_active_geometry(norm_w, norm_h, offset_x, offset_y)
+
+    def set_active_geometry(self, norm_w, norm_h, offset_x, offset_y):
+        """
+        Place the active body of bar by normalized size and offset. The position is calculated from the original
+        active body rectangle, so it does not depend on the previous value
+        """
+        x, y, width, height = self.abrc.to_list()
         if self.orient == 'hor':
-            self.active.set_width(norm["norm_w"])
-            self.active.offset(norm["offset_x"] if self.direction == "left" else 0, 0)
+            width = norm_w
+            x += offset_x if self.direction == "left" else 0
         elif self.orient == 'vert':
-            self.active.set_height(norm["norm_h"])
-            self.active.offset(0, norm["offset_y"] if self.direction == "top" else 0)
+            height = norm_h
+            y += offset_y if self.direction == "top" else 0
         elif self.orient == 'sq':
-            self.active.set_size(norm["norm_w"], norm["norm_h"])
             dir_arr = self.direction.split("-")
             if len(dir_arr) < 2:
                 raise AttributeError("Square bar must have one of directions: left-top, "
                                      "left-bottom, right-top, right-bottom")
-            o_x = norm["offset_x"] if dir_arr[0] == "left" else 0
-            o_y = norm["offset_y"] if dir_arr[1] == "top" else 0
-            self.active.offset(o_x, o_y)
+            width, height = norm_w, norm_h
+            x += offset_x if dir_arr[0] == "left" else 0
+            y += offset_y if dir_arr[1] == "top" else 0
+        self.active.set_rect_coords(x, y, width, height)
 
 
 class SmartBarsCtrl(SmartWidget):
@@ -483,31 +526,32 @@ class SmartBarsCtrl(SmartWidget):
         self.bkg_rx = bkg_rx
         self.bkg_shadow = bkg_shadow
 
-        self.bound_rect = SvgRect(attrs='{"display":"none"}')
+        self.bound_rect = SvgRect(attrs=ATTRS_HIDDEN)
+        self.adopt(self.bound_rect)
         self.children: list = []
         self.build_ctrl()
-        self.set_attributes([
-            f'bkg_color:{bkg_color}',
-            f'bkg_border_color:{bkg_border_color}',
-            f'bkg_border_width:{bkg_border_width}',
-            f'bkg_gap:{bkg_gap}',
-            f'bkg_rx:{bkg_rx}',
-            f'bkg_shadow:{bkg_shadow}',
-            f'show_grid:{show_grid}',
-            f'is_3d:{is_3d}',
-            f'is_web_comp:{is_web_comp}',
-            f'count:{count}',
-            f'bars_orient:{orient}',
-            f'bars_direction:{direction}',
-            f'bars_body_color:{body_color}',
-            f'bars_body_width:{body_width}',
-            f'bars_width:{width}',
-            f'bars_height:{height}',
-            f'bars_rx:{rx}',
-            f'bars_ry:{ry}',
-            f'bars_gap:{gap}',
-            f'thr:{self.thresholds}'
-        ])
+        self.set_attrs({
+            'bkg_color': bkg_color,
+            'bkg_border_color': bkg_border_color,
+            'bkg_border_width': bkg_border_width,
+            'bkg_gap': bkg_gap,
+            'bkg_rx': bkg_rx,
+            'bkg_shadow': bkg_shadow,
+            'show_grid': show_grid,
+            'is_3d': is_3d,
+            'is_web_comp': is_web_comp,
+            'count': count,
+            'bars_orient': orient,
+            'bars_direction': direction,
+            'bars_body_color': body_color,
+            'bars_body_width': body_width,
+            'bars_width': width,
+            'bars_height': height,
+            'bars_rx': rx,
+            'bars_ry': ry,
+            'bars_gap': gap,
+            'thr': str(self.thresholds)
+        })
 
     def build_ctrl(self):
         for index in range(self.count):
@@ -526,6 +570,7 @@ class SmartBarsCtrl(SmartWidget):
                            body_color=self.bars_body_color, body_width=self.bars_body_width,
                            is_3d=self.is_3d, is_web_comp=self.is_web_comp)
             self.children.append(bar)
+            self.adopt(bar)
 
         if self.bars_orient == "hor":
             gap = (self.bkg_gap * 5) if self.show_grid else (self.bkg_gap * 2)
@@ -536,13 +581,16 @@ class SmartBarsCtrl(SmartWidget):
             bars_size = (self.bars_width * self.count) + self.bars_gap * (self.count - 1)
             self.bound_rect.set_rect(Rect(self.x, self.y, bars_size + gap, self.bars_height + self.bkg_gap * 2))
 
-        self.bound_rect.set_attributes([
-            'display:true',
-            f'fill:{self.bkg_color}', f'stroke:{self.bkg_border_color}', f'stroke-width:{self.bkg_border_width}',
-            f'rx:{self.bkg_rx}', f'ry:{self.bkg_rx}'
-        ])
+        self.bound_rect.set_attrs({
+            'display': 'true',
+            'fill': self.bkg_color,
+            'stroke': self.bkg_border_color,
+            'stroke-width': self.bkg_border_width,
+            'rx': self.bkg_rx,
+            'ry': self.bkg_rx
+        })
         if self.bkg_shadow:
-            self.bound_rect.set_attributes(['filter:url(#dropShadow)'])
+            self.bound_rect.set_attrs(ATTRS_DROP_SHADOW)
 
     def get_bound_rect(self):
         return self.bound_rect.get_bound_rect()
@@ -555,107 +603,149 @@ class SmartBarsCtrl(SmartWidget):
         for child in self.children:
             child.set_max_value(value)
 
-    def set_thresholds(self, thr_str: str | dict):
+    def iter_children(self):
+        yield self.bound_rect
+        yield from self.children
+
+    def set_thresholds(self, thr_str: str | dict | ThresholdTable):
         super().set_thresholds(thr_str)
         for child in self.children:
-            child.set_thresholds(thr_str)
+            child.set_thresholds(self.thresholds)   # all children share the compiled table
+
+    def set_values(self, values):
+        """
+        Set values of all bars. In case of numpy is installed the normalization, clamping, colors and geometry
+        of all bars are calculated in one vectorized pass
+        :param values: list, numpy array or buffer protocol object (array.array, memoryview, ...)
+        """
+        values = as_value_array(values)
+        count = min(len(self.children), len(values))
+        children = self.children[:count]
+        if np is None or not count:
+            for child, value in zip(children, values):
+                child.set_value(value)
+            return
+
+        values = values[:count]
+        min_v = np.fromiter((child.min_value for child in children), float, count)
+        max_v = np.fromiter((child.max_value for child in children), float, count)
+        width = np.fromiter((child.abrc.width for child in children), float, count)
+        height = np.fromiter((child.abrc.height for child in children), float, count)
+
+        # the same clamping as SmartBar.check_value()
+        over = values > max_v
+        for index in np.flatnonzero(over):
+            children[index].check_value(values[index])
+        values = np.where(over, max_v, values)
+        under = values < min_v
+        for index in np.flatnonzero(under):
+            children[index].check_value(values[index])
+        values = np.where(under, max_v, values)
+
+        norm_v = values * 100 / max_v
+        norm_w = (width / (max_v - min_v)) * values
+        norm_h = (height / (max_v - min_v)) * values
+        offset_x = width - norm_w
+        offset_y = height - norm_h
+
+        if all(child.thresholds is self.thresholds for child in children):
+            colors = self.thresholds.resolve_many(norm_v)
+        else:
+            colors = [child.thresholds.resolve(v) for child, v in zip(children, norm_v.tolist())]
 
-    def set_values(self, values: list):
-        for vlz in zip(self.children, values):
-            vlz[0].set_value(vlz[1])
+        for child, color, w, h, o_x, o_y in zip(children, colors, norm_w.tolist(), norm_h.tolist(),
+                                                offset_x.tolist(), offset_y.tolist()):
+            child.set_color(color)
+            child.set_active_geometry(w, h, o_x, o_y)
 
     def __str__(self):
         return self.to_svg()
 
-    def to_svg(self) -> str:
-        svg_str = ""
+    def iter_svg(self):
         if self.is_web_comp:
-            pass
-        else:
-            svg_str = f'<g {self.to_attr_string()}>\n'
-            svg_str += self.bound_rect.to_svg()
-
-            if self.show_grid:
-                min_value = int(self.children[0].min_value)
-                max_value = int(self.children[0].max_value)
-                v50 = int((max_value - min_value) / 2)
-                s10 = int((max_value - min_value) / 10)
-
-                bars_b_rc = Rect()
-                for index, child in enumerate(self.children):
-                    if index == 0:
-                        child.abrc.copy_to(bars_b_rc)
-                    else:
-                        x1, y1, x2, y2 = child.abrc.to_coord()
-                        bars_b_rc.expand(x2, y2)
-
-                l_x_start = l_y_start = l_x_end = l_y_end = dot_x = dot_y = text_x = text_y = 0
-                text_val = text_anchor = text_baseline = ''
-                is_draw_text = False
-                line = dot = t_value = None
-                x1, y1, x2, y2 = bars_b_rc.to_coord()
-
-                for li in range(min_value, s10 * 10 + s10, s10):
-                    norm = self.children[0].normalize_value(li)
-                    if self.bars_orient == 'vert':
-                        l_x_start = x1 - 1
-                        l_y_start = y1 + norm["norm_h"]
-                        l_x_end = x2 + 1
-                        l_y_end = l_y_start
-
-                        dot_x = l_x_end + 2
-                        dot_y = l_y_end
-
-                        text_x = dot_x + self.bars_gap
-                        text_y = dot_y
-                        text_val = str(100 - li)
-                        text_anchor = 'left'
-                        text_baseline = 'middle'
-
-                    elif self.bars_orient == 'hor':
-                        l_x_start = x1 + norm["norm_w"]
-                        l_y_start = y1 - 1
-                        l_x_end = l_x_start
-                        l_y_end = y2 + 1
-
-                        dot_x = l_x_end
-                        dot_y = l_y_end + 2
-
-                        text_x = dot_x
-                        text_y = dot_y + self.bars_gap
-                        text_val = str(li)
-                        text_anchor = 'middle'
-                        text_baseline = 'hanging'
-
-                    line = SvgLine(id=f'li-{li}', x1=l_x_start, y1=l_y_start, x2=l_x_end, y2=l_y_end, stroke_width=0.5, stroke="gray", attrs='{"stroke-dasharray":"1"}')
-                    svg_str += line.to_svg()
-
-                    if li == min_value:
-                        text_anchor = 'left' if self.bars_orient == 'vert' else 'left'
-                        text_baseline = 'hanging' if self.bars_orient == 'hor' else 'hanging'
-                        is_draw_text = True
-                    elif li == v50:
-                        text_anchor = 'left' if self.bars_orient == 'vert' else 'middle'
-                        text_baseline = 'hanging' if self.bars_orient == 'hor' else 'middle'
-                        is_draw_text = True
-                    elif li == max_value:
-                        text_anchor = 'left' if self.bars_orient == 'vert' else 'end'
-                        text_baseline = 'hanging' if self.bars_orient == 'hor' else 'auto'
-                        is_draw_text = True
-                    else:
-                        is_draw_text = False
-
-                    if is_draw_text:
-                        dot = SvgCircle(dot_x, dot_y, 1, fill=SvgText.var_font_color)
-                        t_value = SvgText(text_x, text_y, text=text_val, fill="white", baseline=text_baseline, anchor=text_anchor)
-                        svg_str += dot.to_svg()
-                        svg_str += t_value.to_svg()
-
-            for el in self.children:
-                svg_str += el.to_svg()
-
-            svg_str += f'</g>\n'
-        return svg_str
+            return
+        yield f'<g{self.to_attr_string()}>\n'
+        yield self.bound_rect.to_svg()
+
+        if self.show_grid:
+            min_value = int(self.children[0].min_value)
+            max_value = int(self.children[0].max_value)
+            v50 = int((max_value - min_value) / 2)
+            s10 = int((max_value - min_value) / 10)
+
+            bars_b_rc = Rect()
+            for index, child in enumerate(self.children):
+                if index == 0:
+                    child.abrc.copy_to(bars_b_rc)
+                else:
+                    x1, y1, x2, y2 = child.abrc.to_coord()
+                    bars_b_rc.expand(x2, y2)
+
+            l_x_start = l_y_start = l_x_end = l_y_end = dot_x = dot_y = text_x = text_y = 0
+            text_val = text_anchor = text_baseline = ''
+            is_draw_text = False
+            line = dot = t_value = None
+            x1, y1, x2, y2 = bars_b_rc.to_coord()
+
+            for li in range(min_value, s10 * 10 + s10, s10):
+                norm = self.children[0].normalize_value(li)
+                if self.bars_orient == 'vert':
+                    l_x_start = x1 - 1
+                    l_y_start = y1 + norm["norm_h"]
+                    l_x_end = x2 + 1
+                    l_y_end = l_y_start
+
+                    dot_x = l_x_end + 2
+                    dot_y = l_y_end
+
+                    text_x = dot_x + self.bars_gap
+                    text_y = dot_y
+                    text_val = str(100 - li)
+                    text_anchor = 'left'
+                    text_baseline = 'middle'
+
+                elif self.bars_orient == 'hor':
+                    l_x_start = x1 + norm["norm_w"]
+                    l_y_start = y1 - 1
+                    l_x_end = l_x_start
+                    l_y_end = y2 + 1
+
+                    dot_x = l_x_end
+                    dot_y = l_y_end + 2
+
+                    text_x = dot_x
+                    text_y = dot_y + self.bars_gap
+                    text_val = str(li)
+                    text_anchor = 'middle'
+                    text_baseline = 'hanging'
+
+                line = SvgLine(id=f'li-{li}', x1=l_x_start, y1=l_y_start, x2=l_x_end, y2=l_y_end, stroke_width=0.5, stroke="gray", attrs=ATTRS_DASHED)
+                yield from line.iter_svg()
+
+                if li == min_value:
+                    text_anchor = 'left' if self.bars_orient == 'vert' else 'left'
+                    text_baseline = 'hanging' if self.bars_orient == 'hor' else 'hanging'
+                    is_draw_text = True
+                elif li == v50:
+                    text_anchor = 'left' if self.bars_orient == 'vert' else 'middle'
+                    text_baseline = 'hanging' if self.bars_orient == 'hor' else 'middle'
+                    is_draw_text = True
+                elif li == max_value:
+                    text_anchor = 'left' if self.bars_orient == 'vert' else 'end'
+                    text_baseline = 'hanging' if self.bars_orient == 'hor' else 'auto'
+                    is_draw_text = True
+                else:
+                    is_draw_text = False
+
+                if is_draw_text:
+                    dot = SvgCircle(dot_x, dot_y, 1, fill=SvgText.var_font_color)
+                    t_value = SvgText(text_x, text_y, text=text_val, fill="white", baseline=text_baseline, anchor=text_anchor)
+                    yield from dot.iter_svg()
+                    yield from t_value.iter_svg()
+
+        for el in self.children:
+            yield el.to_svg()
+        yield '</g>\n'
 
 
 
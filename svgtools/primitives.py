@@ -1,7 +1,75 @@
 from abc import abstractmethod, ABCMeta
 from dataclasses import dataclass
-from math import pi, sin, cos
+from math import pi, sin, cos, ceil, isfinite
+from functools import lru_cache
+from types import MappingProxyType
+import importlib.resources
+import io
 import json
+import os
+import re
+
+from svgtools.spatial import SpatialGrid, box_contains, box_intersects, box_inside, box_distance, box_union, \
+    box_on_edge
+
+try:
+    import numpy as np
+except ImportError:     # numpy is optional, SvgFigure.render_many() falls back to pure python
+    np = None
+
+
+_float_format = None    # format spec of floats, None - the shortest exact representation, see set_precision()
+_float_digits = None
+_trailing_zero_re = re.compile(r'\.0(?=,|$)')       # of repr of integral float
+_trailing_zeros_re = re.compile(r'\.?0+(?=,|$)')    # of fixed point number
+_negative_zero_re = re.compile(r'(?<![^ ])-0(?=,|$)')   # "-0" of rounded negative number, formatted as "0"
+
+
+def set_precision(digits: int | None = None):
+    """
+    Set the count of decimal digits of coordinates and numeric attributes in the markup, the trailing zeros are
+    stripped: 2 digits - 30.000000000000004 -> "30", 12.5 -> "12.5", 1/3 -> "0.33".
+    Call it before rendering: the markup already cached by elements is not re-serialized
+    :param digits: count of digits after decimal point, None - the shortest exact representation of float
+    """
+    global _float_format, _float_digits
+    _float_format = None if digits is None else f'.{digits}f'
+    _float_digits = digits
+
+
+def fmt_num(value) -> str:
+    """ Format the number for markup, see set_precision(). The integral floats are formatted as ints: 16.0 -> "16" """
+    if type(value) is not float:
+        if not isinstance(value, float):
+            return str(value)
+        value = float(value)    # numpy.float64, etc.
+    if _float_format is None:
+        return str(int(value)) if value.is_integer() else repr(value)
+    text = format(value, _float_format)
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return '0' if text == '-0' else text
+
+
+@lru_cache(maxsize=64)
+def _coords_format(count: int, digits: int) -> str:
+    return ', '.join([f'%.{digits}f'] * count)
+
+
+def fmt_coords(values: list) -> str:
+    """
+    Format the flat list of coordinates [x0, y0, x1, y1, ...] as 'x0, y0, x1, y1, ...' (the valid list of points
+    of polygon) by one formatting operation: the repr of list or the printf style format of all values at once.
+    The values are converted to floats (the repr of numpy numbers is not a number), the precision and
+    the formatting of integral numbers and of negative zeros are the same as of fmt_num()
+    """
+    if _float_digits is None:
+        text = _trailing_zero_re.sub('', str(list(map(float, values)))[1:-1])
+    else:
+        text = _coords_format(len(values), _float_digits) % tuple(values)
+        if _float_digits:
+            text = _trailing_zeros_re.sub('', text)
+    return _negative_zero_re.sub('0', text) if '-0' in text else text
 
 
 class Point:
@@ -16,7 +84,7 @@ class Point:
     #     self.y = y
 
     def __str__(self) -> str:
-        return f'{self.x} {self.y}'
+        return f'{fmt_num(self.x)} {fmt_num(self.y)}'
 
     def __repr__(self) -> str:
         return f'Point: x: {self.x}, y: {self.y}'
@@ -61,13 +129,14 @@ class Rect(object):
         self.height = height
 
     def __str__(self) -> str:
-        return f'{self.pt.x} {self.pt.y} {self.width} {self.height}'
+        return f'{fmt_num(self.pt.x)} {fmt_num(self.pt.y)} {fmt_num(self.width)} {fmt_num(self.height)}'
 
     def __repr__(self) -> str:
         return f'Rect: x: {self.pt.x}, y: {self.pt.y}, width:{self.width}, height:{self.height}'
 
     def to_attr_string(self):
-        return f'x="{self.pt.x}"y="{self.pt.y}"width="{self.width}"height="{self.height}"'
+        return f'x="{fmt_num(self.pt.x)}" y="{fmt_num(self.pt.y)}" width="{fmt_num(self.width)}" ' \
+               f'height="{fmt_num(self.height)}"'
 
     def to_dict(self):
         return {'x': self.pt.x, 'y': self.pt.y, 'width': self.width, 'height': self.height}
@@ -88,6 +157,14 @@ class Rect(object):
         y2 = y1 + self.height
         return x1, y1, x2, y2
 
+    def to_box(self):
+        """ :return: normalized box (x1, y1, x2, y2), x1 <= x2 and y1 <= y2, in case of negative width or height """
+        x1 = self.pt.x
+        y1 = self.pt.y
+        x2 = x1 + self.width
+        y2 = y1 + self.height
+        return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
     def set_rect(self, x, y, width, height):
         self.pt.set_point(x, y)
         self.width = width
@@ -120,6 +197,220 @@ class Rect(object):
         return self.pt.offset(dx, dy)
 
 
+class DefsRegistry:
+    """ DefsRegistry
+        Keeps the reusable <defs> entries (filters and gradients) in memory.
+        The resource files are read once, relative to the package (not to the current working directory),
+        and parsed into named entries: {entry id: svg fragment}.
+
+        :param resources: dict of {group name: resource file name} inside the package
+        :param auto_reload: check the modification time of resource files on every access
+                    and reload changed files. Intended for development only, default is False
+    """
+    __slots__ = ("package", "resources", "auto_reload", "_mtimes", "_groups", "_entries", "_defs_str")
+
+    entry_re = re.compile(r'^[ \t]*<(\w+)\b[^>]*?\sid="([^"]+)".*?</\1>[ \t]*\n?', re.MULTILINE | re.DOTALL)
+
+    def __init__(self, resources: dict = None, package: str = __package__, auto_reload: bool = False):
+        self.package = package
+        self.resources = resources or {"filters": "filters.txt", "gradients": "gradients.txt"}
+        self.auto_reload = auto_reload
+        self._mtimes = {}
+        self._groups = None
+        self._entries = None
+        self._defs_str = None
+
+    def __str__(self):
+        return self.to_svg()
+
+    def __contains__(self, entry_id):
+        return entry_id in self.entries
+
+    def _resource(self, file_name):
+        return importlib.resources.files(self.package).joinpath(file_name)
+
+    @staticmethod
+    def _mtime(resource):
+        try:
+            return os.stat(resource).st_mtime_ns
+        except (TypeError, OSError):
+            return None     # not a file system resource (zip, etc.), never reloaded
+
+    def is_stale(self) -> bool:
+        if self._groups is None:
+            return True
+        if not self.auto_reload:
+            return False
+        return any(self._mtime(self._resource(file_name)) != self._mtimes.get(name)
+                   for name, file_name in self.resources.items())
+
+    def load(self):
+        """ (Re)load all resource files and parse them into named entries """
+        groups = {}
+        entries = {}
+        defs_str = ''
+        for name, file_name in self.resources.items():
+            resource = self._resource(file_name)
+            self._mtimes[name] = self._mtime(resource)
+            text = resource.read_text()
+            defs_str += text
+            groups[name] = {m.group(2): m.group(0) for m in self.entry_re.finditer(text)}
+            entries.update(groups[name])
+
+        self._groups = groups
+        self._entries = entries
+        self._defs_str = defs_str
+        return self
+
+    def _check(self):
+        if self.is_stale():
+            self.load()
+
+    @property
+    def entries(self) -> dict:
+        """ all entries of all groups: {entry id: svg fragment} """
+        self._check()
+        return self._entries
+
+    @property
+    def filters(self) -> dict:
+        self._check()
+        return self._groups.get("filters", {})
+
+    @property
+    def gradients(self) -> dict:
+        self._check()
+        return self._groups.get("gradients", {})
+
+    def get(self, entry_id: str, default=None):
+        return self.entries.get(entry_id, default)
+
+    def to_svg(self, refs: set = None):
+        """
+        Build the <defs> section
+        :param refs: ids of entries to be emitted, unknown ids are ignored. None - emit all entries
+        :return: <defs> section string
+        """
+        self._check()
+        if refs is None:
+            return f"<defs>\n{self._defs_str}</defs>\n"
+        entries = ''.join(fragment for entry_id, fragment in self._entries.items() if entry_id in refs)
+        return f"<defs>\n{entries}</defs>\n"
+
+
+defs_registry = DefsRegistry()
+
+_missing = object()     # never equal to any attribute value
+
+_xml_attr_escapes = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})
+
+# the serialized prefixes ' name="' of attributes, precomputed for known svg attributes, extended by others on demand
+attr_key_table = {name: f' {name}="' for name in (
+    'id', 'class', 'x', 'y', 'width', 'height', 'rx', 'ry', 'cx', 'cy', 'r', 'x1', 'x2', 'y1', 'y2', 'points',
+    'fill', 'fill-opacity', 'stroke', 'stroke-width', 'stroke-opacity', 'stroke-dasharray', 'opacity', 'filter',
+    'display', 'visibility', 'pointer-events', 'transform', 'style', 'font-family', 'font-size', 'font-stretch',
+    'dominant-baseline', 'text-anchor', 'is_3d', 'is_web_comp', 'thr', 'w_r', 'body_color', 'body_width'
+)}
+
+attr_name_re = re.compile(r'[A-Za-z_:][-A-Za-z0-9_.:]*\Z')    # xml name, the others break the markup
+
+
+def attr_prefix(name) -> str:
+    """
+    :return: the serialized prefix ' name="' of attribute, the new names are checked once and added to attr_key_table
+    :raise ValueError: in case of the name is not an xml name
+    """
+    prefix = attr_key_table.get(name)
+    if prefix is None:
+        if type(name) is not str or not attr_name_re.match(name):
+            raise ValueError(f"invalid attribute name {name!r}")
+        prefix = attr_key_table[name] = f' {name}="'
+    return prefix
+
+
+def check_attr(name, value):
+    """
+    Check the attribute is serialized into the valid markup: the name is xml name, the value is string or
+    finite number, the opacity is numeric. For the attributes coming from outside (specs, requests)
+    :raise ValueError: in case of invalid name or value
+    """
+    if type(name) is not str or not attr_name_re.match(name):
+        raise ValueError(f"invalid attribute name {name!r}")
+    if type(value) not in (str, int, float):
+        raise ValueError(f"attribute {name!r} must be a string or a number, not {type(value).__name__}")
+    if type(value) is float and not isfinite(value):
+        raise ValueError(f"attribute {name!r} must be a finite number, not {value!r}")
+    if name == 'opacity':
+        try:
+            opacity = float(value)
+        except ValueError:
+            opacity = None
+        if opacity is None or not isfinite(opacity):
+            raise ValueError(f"attribute 'opacity' must be a number, not {value!r}")
+
+
+def is_opaque(value) -> bool:
+    """ The opacity value is 1 and may be omitted, the non-numeric value is not, it is serialized as it is """
+    try:
+        return float(value) == 1.0
+    except (TypeError, ValueError):
+        return False
+
+
+def attr_preset(attrs: dict) -> MappingProxyType:
+    """
+    Create the immutable set of attributes, which may be shared by any count of elements
+    :param attrs: {name: value}
+    """
+    return MappingProxyType(dict(attrs))
+
+
+ATTRS_HIDDEN = attr_preset({'display': 'none'})
+ATTRS_NO_POINTER_EVENTS = attr_preset({'pointer-events': 'none'})
+ATTRS_FILTER_3D = attr_preset({'filter': 'url(#MyFilter)'})
+ATTRS_DASHED = attr_preset({'stroke-dasharray': '1'})
+
+# the serialized attributes ' name="value"' of str and int values: {name: {value: fragment}}, the repeated values
+# (colors, presets, widths) are escaped and formatted once. Up to attr_fragments_limit values are kept per name
+_attr_fragments = {}
+attr_fragments_limit = 256
+
+
+def escape_attr(value) -> str:
+    """ Convert the attribute value to string and escape the characters, which break the double quoted attribute """
+    value = str(value)
+    if '&' in value or '<' in value or '>' in value or '"' in value:
+        return value.translate(_xml_attr_escapes)
+    return value
+
+
+def escape_text(text) -> str:
+    """ Escape the text content of element """
+    text = str(text)
+    if '&' in text or '<' in text or '>' in text:
+        return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    return text
+
+
+def diff_attrs(attrs: dict, prev_attrs: dict = None) -> dict:
+    """
+    :return: the attributes changed from prev_attrs to attrs {name: value}, the removed ones have value None
+    """
+    if not prev_attrs:
+        return dict(attrs)
+    changed = {name: value for name, value in attrs.items() if prev_attrs.get(name, _missing) != value}
+    for name in prev_attrs:
+        if name not in attrs:
+            changed[name] = None
+    return changed
+
+
+@lru_cache(maxsize=None)
+def delta_applier_script() -> str:
+    """ The client side code (javascript) which applies the deltas, produced by SvgRoot.delta(), to the page """
+    return importlib.resources.files(__package__).joinpath("delta.js").read_text()
+
+
 class DefsSection:
     def __init__(self):
         pass
@@ -128,25 +419,25 @@ class DefsSection:
         return self.to_svg()
 
     @staticmethod
-    def to_svg():
-        defs_str = "<defs>\n"
-        filters_str = ''
-        with open("svgtools/filters.txt", "r") as filters:
-            filters_str += filters.read()
-        with open("svgtools/gradients.txt", "r") as gradients:
-            filters_str += gradients.read()
-        defs_str += f"{filters_str}</defs>\n"
-        return defs_str
+    def to_svg(refs: set = None):
+        return defs_registry.to_svg(refs)
 
 
 class SvgElement(object, metaclass=ABCMeta):
-    __slots__ = ("id", "class_name", "attributes")
+    __slots__ = ("id", "class_name", "attributes", "parent", "_svg_cache", "_attr_cache", "_refs_cache", "_rev")
+
+    url_ref_re = re.compile(r'url\(#([^)\s]+)\)')
 
-    def __init__(self, id='', class_name='', attrs: list | str = None,
+    def __init__(self, id='', class_name='', attrs: list | str | dict = None,
                  fill: str = '', stroke: str = '', stroke_width: float = 0):
         self.id = id
         self.class_name = class_name
         self.attributes = {}
+        self.parent = None          # the composite element (or the canvas) this element belongs to
+        self._svg_cache = None      # serialized markup, None - element is dirty and must be re-serialized
+        self._attr_cache = None     # serialized attributes, None - attributes are changed, see to_attr_string()
+        self._refs_cache = None     # ids of defs referenced by element and its children, None - must be collected
+        self._rev = 0               # revision, incremented on every change of element or of its descendants
 
         # self.set_attributes([f'fill:{fill}',
         #                      f'stroke:{stroke}',
@@ -157,6 +448,8 @@ class SvgElement(object, metaclass=ABCMeta):
                 self.set_attr_from_json(attrs)
             elif type(attrs) == list:
                 self.set_attributes(attrs)
+            else:
+                self.attributes.update(attrs)   # dict or shared preset, see attr_preset()
 
         if fill:
             self.attributes['fill'] = SvgElement.normalize_color_value(fill)
@@ -178,6 +471,21 @@ class SvgElement(object, metaclass=ABCMeta):
         if type(value) == int:
             return f"#{str(hex(value)).removeprefix('0x')}"
 
+    def set_attrs(self, attrs: dict = None, /, **kwargs):
+        """ Add/Set attributes of svg element as they are, nothing is parsed
+            :param attrs: {name: value}, or the shared preset, see attr_preset()
+            :param kwargs: attributes, which names are python identifiers
+            Example: set_attrs(ATTRS_FILTER_3D, fill='red'); set_attrs({'stroke-width': 2})
+        """
+        for source in (attrs, kwargs):
+            if source:
+                if 'id' in source or 'class_name' in source:
+                    source = dict(source)
+                    self.id = source.pop('id', self.id)
+                    self.class_name = source.pop('class_name', self.class_name)
+                self.attributes.update(source)
+        self.invalidate()
+
     def set_attributes(self, attr_list: list):
         """ Add/Set additional attributes to svg element
             :param attr_list: list of attributes, represented as a pair of key and value separated by colon
@@ -193,6 +501,7 @@ class SvgElement(object, metaclass=ABCMeta):
                 continue
 
             self.attributes[name] = value
+        self.invalidate()
 
     def set_attr_from_json(self, attr_json: str):
         """
@@ -211,33 +520,228 @@ class SvgElement(object, metaclass=ABCMeta):
                     self.class_name = value
                     continue
                 self.attributes[name] = value
+            self.invalidate()
 
     def set_id(self, id):
-        self.id = id | ''
+        self.id = id or ''
+        self.invalidate()
 
     def set_class(self, class_name):
-        self.class_name = class_name | ''
+        self.class_name = class_name or ''
+        self.invalidate()
+
+    def adopt(self, *elements):
+        """ Make this element the parent of specified child elements, so their changes invalidate it """
+        for element in elements:
+            element.parent = self
+
+    def invalidate(self, attributes: bool = True, geometry: bool = False):
+        """
+        Mark the element as changed: drop the cached markup and increment the revision of element
+        and of all its ancestors
+        :param attributes: False - only the geometry (or the state) of element is changed, the serialized attributes
+            are still valid
+        :param geometry: True - the position or the size of element is changed, the ancestors are notified
+            by _child_moved(), so the canvas may update its spatial index
+        The topmost ancestor is notified by _child_changed() about its changed child
+        """
+        if attributes:
+            self._attr_cache = None
+        node = self
+        child = None
+        while node is not None:
+            node._svg_cache = None
+            node._refs_cache = None
+            node._rev += 1
+            if geometry and node.parent is not None:
+                node.parent._child_moved(node)
+            child, node = node, node.parent
+            if node is not None and node.parent is None:
+                node._child_changed(child)
+
+    def _child_moved(self, child):
+        """ The geometry of child element (or of its descendant) is changed """
+        pass
+
+    def _child_changed(self, child):
+        """ The child element (or its descendant) is changed, called for the topmost element of tree only """
+        pass
 
     def to_attr_string(self):
-        attrs_str = ''
-        if self.id:
-            attrs_str += f'id="{self.id}"'
+        """
+        Serialize the id, the class and the attributes of element, every attribute is preceded by space:
+        ' id="el-id" class="name" fill="red"'. The result is cached until the attributes are changed
+        """
+        attrs_str = self._attr_cache
+        if attrs_str is None:
+            attrs_str = self._attr_cache = self.compile_attr_string()
+        return attrs_str
+
+    def compile_attr_string(self):
+        """ Serialize the attributes, the values are escaped, see to_attr_string() """
+        element_id = self.id
+        if element_id:
+            if type(element_id) is not str:
+                element_id = str(element_id)
+            if '&' in element_id or '<' in element_id or '>' in element_id or '"' in element_id:
+                element_id = element_id.translate(_xml_attr_escapes)
+            attrs_str = f' id="{element_id}"'
+        else:
+            attrs_str = ''
+        class_name = self.class_name
+        if class_name:
+            if type(class_name) is not str:
+                class_name = str(class_name)
+            if '&' in class_name or '<' in class_name or '>' in class_name or '"' in class_name:
+                class_name = class_name.translate(_xml_attr_escapes)
+            attrs_str += f' class="{class_name}"'
+        fragments = _attr_fragments
+        for key, value in self.attributes.items():
+            value_type = type(value)
+            if value_type is str or value_type is int:    # not bool: True == 1 would share the fragment of 1
+                key_fragments = fragments.get(key)
+                if key_fragments is None:
+                    attr_prefix(key)
+                    key_fragments = fragments[key] = {}
+                else:
+                    fragment = key_fragments.get(value)
+                    if fragment is not None:
+                        attrs_str += fragment
+                        continue
+                if key == "opacity" and is_opaque(value):
+                    fragment = ''
+                elif value_type is int:
+                    fragment = f' {key}="{value}"'
+                elif '&' in value or '<' in value or '>' in value or '"' in value:
+                    fragment = f' {key}="{value.translate(_xml_attr_escapes)}"'
+                else:
+                    fragment = f' {key}="{value}"'
+                if len(key_fragments) < attr_fragments_limit:
+                    key_fragments[value] = fragment
+                attrs_str += fragment
+                continue
+            if key == "opacity" and is_opaque(value):
+                continue
+            if value_type is float:
+                value = fmt_num(value)
+            elif value_type is not bool:
+                value = escape_attr(value)
+            attrs_str += f'{attr_prefix(key)}{value}"'
+        return attrs_str
+
+    def to_attr_dict(self) -> dict:
+        """
+        Return all attributes of element, except the id, in form {name: value}, as they are serialized into markup:
+        the values are strings formatted as by compile_attr_string() (not escaped), see fmt_num()
+        :raise ValueError: in case of invalid attribute name, see attr_prefix()
+        """
+        attrs = {}
         if self.class_name:
-            attrs_str += f'class="{self.class_name}"'
-        for key in self.attributes.keys():
-            if key == "opacity" and float(self.attributes[key]) == 1.0:
+            attrs['class'] = str(self.class_name)
+        key_table = attr_key_table
+        for key, value in self.attributes.items():
+            if key not in key_table:
+                attr_prefix(key)
+            if key == "opacity" and is_opaque(value):
                 continue
-            attrs_str += f'{key}="{self.attributes[key]}"'
+            attrs[key] = value if type(value) is str else fmt_num(value)
+        return attrs
 
-        return attrs_str
+    def virtual_snapshot(self):
+        """
+        The copy of state of virtual children: the parts of markup with own ids, which are not SvgElement objects
+        (for ex. the bulbs of ArrayBulbGrid), to be compared by virtual_delta()
+        :return: None - the element has no virtual children
+        """
+        return None
+
+    def virtual_delta(self, snapshot, prev_snapshot=None) -> dict:
+        """
+        :return: the changes of virtual children {id: {attribute: value}} from prev_snapshot to snapshot,
+            the full state of them in case of prev_snapshot is None, see virtual_snapshot()
+        """
+        return {}
+
+    def iter_children(self):
+        """ Iterate over child svg elements of composite element, simple elements have no children """
+        return ()
+
+    def collect_refs(self, refs: set = None, children=None) -> set:
+        """
+        Collect ids of defs (filters, gradients, etc.) referenced as url(#id) by this element and its children.
+        The ids are cached per element (see get_refs()), so only the changed subtrees are visited again
+        :param refs: set to be updated, a new one is created if None
+        :param children: the children to be visited, None - all children of element
+        :return: the set of referenced ids
+        """
+        refs = set() if refs is None else refs
+        if children is None:
+            refs.update(self.get_refs())
+            return refs
+        self.compile_own_refs(refs)
+        for child in children:
+            refs.update(child.get_refs())
+        return refs
+
+    def get_refs(self) -> frozenset:
+        """ :return: ids of defs referenced by element and its children, cached until the element is changed """
+        refs = self._refs_cache
+        if refs is None:
+            refs = set()
+            self.compile_own_refs(refs)
+            for child in self.iter_children():
+                refs.update(child.get_refs())
+            refs = self._refs_cache = frozenset(refs)
+        return refs
+
+    def compile_own_refs(self, refs: set):
+        """ Add ids of defs referenced by the element itself (not by its children) to refs """
+        for value in self.attributes.values():
+            if type(value) == str and 'url(#' in value:
+                refs.update(self.url_ref_re.findall(value))
 
     @abstractmethod
     def get_bound_rect(self):
         ...
 
+    def get_bound_box(self) -> tuple:
+        """
+        The bounding box of element as tuple (x1, y1, x2, y2), x1 <= x2 and y1 <= y2.
+        The primitives compute it without creating Rect, use it on hot paths
+        """
+        return self.get_bound_rect().to_box()
+
+    @abstractmethod
+    def iter_svg(self):
+        """ Yield the svg markup of element fragment by fragment """
+        ...
+
+    def to_svg(self):
+        """ Return the svg markup of element, only changed elements are re-serialized """
+        if self._svg_cache is None:
+            self._svg_cache = ''.join(self.iter_svg())
+        return self._svg_cache
+
 
 class SvgRoot(SvgElement):
-    __slots__ = ("is_autobound", "rc", "elements")
+    """ SvgRoot
+        The canvas: the <svg> element with the list of top level elements.
+
+        Hit testing and region queries: elements_at(x, y), elements_in(rect) and nearest(x, y) check
+        the bounding rects of top level elements. By default all elements are scanned, set_spatial_index()
+        enables the grid index, which answers these queries in time proportional to the count of elements
+        around the point instead of the count of all elements of canvas. The index is maintained by add_element()
+        and by the geometry changes of elements (invalidate(geometry=True)), the moved elements are re-indexed
+        lazily, by the next query. After a direct change of coordinates (for ex. circle.cx = 10) call
+        element.invalidate(geometry=True).
+
+        Viewport culling: to_svg(viewport=rect) renders only the region of canvas, the elements outside of it
+        are not serialized. render_tile() renders one tile of the canvas split into the grid of tiles, see tiles(),
+        the markup of tile is cached until one of its elements is changed or moved, or an element is moved into
+        the tile. Enable the spatial index for large canvases, otherwise every viewport scans all elements.
+    """
+    __slots__ = ("is_autobound", "rc", "elements", "_committed", "_spatial", "_moved", "_tiles", "_bounds",
+                 "_edge_boxes", "_element_refs", "_ref_counts", "_refs_dirty")
 
     def __init__(self, id: str = '', class_name: str = '', view_box: list = [],
                  attrs: list | str = None, autobound: bool = True):
@@ -246,49 +750,348 @@ class SvgRoot(SvgElement):
         x, y, w, h = view_box
         self.rc = Rect(x, y, w, h)
         self.elements = []
+        self._committed = {}    # the state sent to clients: {element: (revision, attributes, virtual snapshot)}
+        self._spatial = None    # SpatialGrid of top level elements, None - the spatial index is disabled
+        self._moved = None      # {element: None} - added or moved elements, not re-indexed yet
+        self._tiles = {}        # {(column, row, width, height, with_defs): (state of tile, markup)}
+        self._bounds = None     # the union box of elements, () - no elements, None - must be recomputed
+        self._edge_boxes = {}   # {element: box} of elements on the edge of union box, they may shrink it
+        self._element_refs = {}     # {element: its refs counted in _ref_counts}
+        self._ref_counts = {}       # {id of defs: count of elements referencing it}
+        self._refs_dirty = {}       # {element: None} - added or changed elements, their refs are not counted yet
 
     def __str__(self) -> str:
         return self.to_svg()
 
     def calc_bound_rect(self):
-        left = Point()
-        right = Point()
-
-        for el in self.elements:
-            rect = el.get_bound_rect()
-            x1, y1, x2, y2 = rect.to_coord()
-            left.x = x1 if left.x == 0 or x1 < left.x else left.x
-            left.y = y1 if left.y == 0 or y1 < left.y else left.y
-            right.x = x2 if x2 > right.x else right.x
-            right.y = y2 if y2 > right.y else right.y
-
-        rc = Rect().from_coord(left.x, left.y, right.x, right.y)
+        """
+        The bounding rect of all elements. The union box of elements is maintained incrementally: add_element()
+        extends it, the geometry change of element extends it too, unless the element was on the edge of box,
+        in that case the box is recomputed by the next call. So the autobound canvas does not visit all elements
+        on every to_svg()
+        """
+        if self._bounds is None:
+            boxes = [element.get_bound_box() for element in self.elements]
+            self._bounds = box_union(boxes)
+            if boxes:
+                x1, y1, x2, y2 = self._bounds
+                self._edge_boxes = {element: box for element, box in zip(self.elements, boxes)
+                                    if box[0] <= x1 or box[1] <= y1 or box[2] >= x2 or box[3] >= y2}
+        if not self._bounds:
+            return Rect()
+
+        rc = Rect().from_coord(*self._bounds)
         if rc.pt.x > 0:
             rc.offset(dx=-rc.pt.x)
         if rc.pt.y > 0:
             rc.offset(dy=-rc.pt.y)
         return rc
 
-    def to_svg(self):
+    def iter_svg(self, with_defs: bool = True, viewport: Rect = None, elements: list = None):
+        """
+        Yield the svg markup of canvas element by element, the whole document is never built in memory.
+        Unchanged elements are yielded from their caches
+        :param with_defs: False - omit own <defs> section, in case of canvas uses the shared defs of the document
+        :param viewport: render the region of canvas only: the viewport becomes the viewBox and only the elements
+            intersecting it are serialized. None - the whole canvas
+        :param elements: the elements of viewport, in case of they are already found
+        """
         namespace = 'xmlns="http://www.w3.org/2000/svg"'
         # viewbox = ' '.join(str(element) for element in self.view_box)
 
-        elements = '\n'.join(element.to_svg() for element in self.elements)
+        if viewport is None:
+            # calculate bound rect
+            if self.is_autobound:
+                self.rc = self.calc_bound_rect()
+            rc = self.rc
+            elements = self.elements
+        else:
+            rc = viewport
+            elements = self.elements_in(viewport) if elements is None else elements
+        yield f'<svg {namespace} viewBox="{rc}" width="{fmt_num(rc.width)}" ' \
+              f'height="{fmt_num(rc.height)}"' \
+              f'{self.to_attr_string()}>\n'
+        if with_defs:
+            yield DefsSection.to_svg(self.get_refs() if viewport is None else self.collect_refs(children=elements))
+
+        for index, element in enumerate(elements):
+            if index:
+                yield '\n'
+            yield element.to_svg()
+        yield '</svg>'
+
+    def to_svg(self, with_defs: bool = True, viewport: Rect = None):
+        """
+        :param with_defs: False - omit own <defs> section, in case of canvas uses the shared defs of the document
+        :param viewport: render only the elements intersecting the region of canvas, None - the whole canvas
+        """
+        return ''.join(self.iter_svg(with_defs, viewport))
 
-        # calculate bound rect
+    def tiles(self, tile_width, tile_height=None) -> list:
+        """
+        Split the canvas (its viewBox) into the grid of tiles, the tiles of the last column and row are clipped
+        by the canvas
+        :param tile_width: the width of tile
+        :param tile_height: the height of tile, None - the same as the width
+        :return: the list of (column, row, Rect) of all tiles, row by row
+        """
+        if tile_width <= 0 or (tile_height is not None and tile_height <= 0):
+            raise ValueError(f"the size of tile must be positive, not {tile_width} x {tile_height}")
+        tile_height = tile_width if tile_height is None else tile_height
         if self.is_autobound:
             self.rc = self.calc_bound_rect()
-        viewbox = str(self.rc)
-        defs_section = DefsSection.to_svg()
-        return f'<svg {namespace} viewBox="{viewbox}" width="{self.rc.width}" height="{self.rc.height}"' \
-               f' {self.to_attr_string()}>\n{defs_section}{elements}</svg>'
+        x, y, width, height = self.rc.to_list()
+        columns = max(ceil(width / tile_width), 1)
+        rows = max(ceil(height / tile_height), 1)
+        return [(column, row, self.tile_rect(column, row, tile_width, tile_height))
+                for row in range(rows) for column in range(columns)]
+
+    def tile_rect(self, column: int, row: int, tile_width, tile_height=None) -> Rect:
+        """ :return: the region of canvas covered by the tile, clipped by the canvas """
+        tile_height = tile_width if tile_height is None else tile_height
+        x, y, width, height = self.rc.to_list()
+        left = x + column * tile_width
+        top = y + row * tile_height
+        return Rect(left, top, max(min(tile_width, x + width - left), 0), max(min(tile_height, y + height - top), 0))
+
+    def render_tile(self, column: int, row: int, tile_width, tile_height=None, with_defs: bool = True) -> str:
+        """
+        Render one tile of canvas, see tiles(). The markup of tile is cached: it is rebuilt only in case of
+        the set of elements of tile, the revision of one of them or the attributes of canvas are changed
+        :return: the svg markup of tile
+        """
+        tile_height = tile_width if tile_height is None else tile_height
+        rc = self.tile_rect(column, row, tile_width, tile_height)
+        elements = self.elements_in(rc)
+        state = (str(rc), self.to_attr_string(), tuple((element, element._rev) for element in elements))
+        key = (column, row, tile_width, tile_height, with_defs)
+        cached = self._tiles.get(key)
+        if cached is not None and cached[0] == state:
+            return cached[1]
+        markup = ''.join(self.iter_svg(with_defs, rc, elements))
+        self._tiles[key] = (state, markup)
+        return markup
+
+    def clear_tiles(self):
+        """ Drop the cached markup of all tiles """
+        self._tiles.clear()
+
+    def write_to(self, fp, with_defs: bool = True, encoding: str = 'utf-8', buffer_size: int = 65536,
+                 viewport: Rect = None) -> int:
+        """
+        Stream the svg markup of canvas into a file-like object or a socket.
+        Fragments are collected into chunks of about buffer_size characters, so the memory use is bounded
+        by the chunk size and by the largest top level element, not by the size of the document.
+        :param fp: text file (io.TextIOBase), binary file/io.BufferedWriter or socket
+        :param with_defs: False - omit own <defs> section
+        :param encoding: encoding used for binary files and sockets
+        :param buffer_size: the size of the chunk to be written at once
+        :param viewport: write only the elements intersecting the region of canvas, None - the whole canvas
+        :return: the count of written characters
+        """
+        if isinstance(fp, io.TextIOBase):
+            write = fp.write
+        elif hasattr(fp, 'sendall'):
+            def write(chunk): fp.sendall(chunk.encode(encoding))
+        else:
+            def write(chunk): fp.write(chunk.encode(encoding))
+
+        chunk = []
+        chunk_size = 0
+        written = 0
+        for fragment in self.iter_svg(with_defs, viewport):
+            chunk.append(fragment)
+            chunk_size += len(fragment)
+            if chunk_size >= buffer_size:
+                write(''.join(chunk))
+                written += chunk_size
+                chunk.clear()
+                chunk_size = 0
+        if chunk:
+            write(''.join(chunk))
+            written += chunk_size
+        return written
+
+    def delta(self, commit: bool = True) -> dict:
+        """
+        Build the changes of canvas since the last committed state, in form {element id: {attribute: value}}.
+        The removed attribute has value None. The first call returns the full state of canvas.
+        Only elements with id may be addressed by the client, the subtrees without changes
+        (with the same revision as committed) are skipped.
+        :param commit: True - the current state becomes the committed one
+        :return: the dict of changes, empty in case of no changes
+        """
+        changes = {}
+        committed = self._committed if commit else dict(self._committed)
+        for element in self.elements:
+            self._build_delta(element, committed, changes)
+        return changes
+
+    def delta_json(self, commit: bool = True) -> str:
+        """ Return the delta in compact json format, to be applied by the delta_applier_script() on the client """
+        return json.dumps(self.delta(commit), separators=(',', ':'), default=str)
+
+    def commit(self):
+        """ Take the current state of canvas as committed, without building the delta """
+        self.delta(commit=True)
+
+    def committed_state(self) -> dict:
+        """
+        The committed state of canvas (as it was sent to clients by the last delta() or commit()),
+        in form of delta {element id: {attribute: value}}, to initialize the newly connected client
+        """
+        state = {}
+        for element, (_, attrs, snapshot) in self._committed.items():
+            if attrs is not None:
+                state[element.id] = attrs
+            if snapshot is not None:
+                state.update(element.virtual_delta(snapshot))
+        return state
+
+    @staticmethod
+    def _build_delta(element, committed: dict, changes: dict):
+        state = committed.get(element)
+        if state is not None and state[0] == element._rev:
+            return      # nothing was changed in this subtree
+
+        attrs = None
+        if element.id:
+            attrs = element.to_attr_dict()
+            changed = diff_attrs(attrs, state[1] if state is not None else None)
+            if changed:
+                changes[element.id] = changed
+
+        snapshot = element.virtual_snapshot()
+        if snapshot is not None:
+            changes.update(element.virtual_delta(snapshot, state[2] if state is not None else None))
+        committed[element] = (element._rev, attrs, snapshot)
+        for child in element.iter_children():
+            SvgRoot._build_delta(child, committed, changes)
 
     def add_element(self, element):
         self.elements.append(element)
+        self.adopt(element)
+        self._refs_dirty[element] = None
+        self._refs_cache = None
+        if self._moved is not None:
+            self._moved[element] = None
+        if self._bounds is not None:
+            self.__extend_bounds(element, element.get_bound_box())
+
+    def __extend_bounds(self, element, box: tuple):
+        self._bounds = box_union((self._bounds, box)) if self._bounds else box
+        if box_on_edge(box, self._bounds):
+            self._edge_boxes[element] = box
+
+    def _child_changed(self, child):
+        self._refs_dirty[child] = None
+
+    def get_refs(self) -> frozenset:
+        """
+        The ids of defs referenced by canvas. The counts of references by elements are maintained, so only
+        the elements changed since the last call are visited (see _child_changed())
+        """
+        refs = self._refs_cache
+        if refs is None:
+            counts = self._ref_counts
+            element_refs = self._element_refs
+            for element in self._refs_dirty:
+                new_refs = element.get_refs()
+                old_refs = element_refs.get(element, ())
+                if new_refs == old_refs:
+                    continue
+                for ref in old_refs:
+                    counts[ref] -= 1
+                    if not counts[ref]:
+                        del counts[ref]
+                for ref in new_refs:
+                    counts[ref] = counts.get(ref, 0) + 1
+                element_refs[element] = new_refs
+            self._refs_dirty.clear()
+            refs = set(counts)
+            self.compile_own_refs(refs)
+            refs = self._refs_cache = frozenset(refs)
+        return refs
+
+    def _child_moved(self, child):
+        if self._moved is not None:
+            self._moved[child] = None
+        if self._bounds:
+            box = child.get_bound_box()
+            old_box = self._edge_boxes.get(child)
+            if old_box is None or box_union((box, old_box)) == box:
+                # the element was inside the union box or it has grown, the union box can not shrink
+                self.__extend_bounds(child, box)
+            elif box != old_box:
+                self._bounds = None     # the element on the edge is moved, the union box may shrink
+
+    def set_spatial_index(self, cell_size: float | None = 64):
+        """
+        Enable the spatial index of top level elements for elements_at(), elements_in() and nearest()
+        :param cell_size: the side of grid cell, about the size of typical widget. None - disable the index
+        """
+        if cell_size is None:
+            self._spatial = self._moved = None
+            return
+        self._spatial = SpatialGrid(cell_size)
+        self._moved = dict.fromkeys(self.elements)
+
+    def __spatial_index(self):
+        """ :return: the spatial index with re-indexed moved elements, None in case of the index is disabled """
+        if self._moved:
+            spatial = self._spatial
+            for element in self._moved:
+                spatial.insert(element, *element.get_bound_box())
+            self._moved.clear()
+        return self._spatial
+
+    def elements_at(self, x, y) -> list:
+        """
+        Hit testing: find the top level elements whose bounding rects contain the point
+        :return: the list of elements in paint order, the topmost element is the last one
+        """
+        spatial = self.__spatial_index()
+        if spatial is not None:
+            return spatial.at(x, y)
+        return [element for element in self.elements if box_contains(element.get_bound_box(), x, y)]
+
+    def elements_in(self, rect: Rect, contained: bool = False) -> list:
+        """
+        Find the top level elements in the region
+        :param rect: the region
+        :param contained: False - elements intersecting the region, True - elements entirely inside the region
+        :return: the list of elements in paint order
+        """
+        x1, y1, x2, y2 = rect.to_box()
+        spatial = self.__spatial_index()
+        if spatial is not None:
+            return spatial.query(x1, y1, x2, y2, contained)
+        test = box_inside if contained else box_intersects
+        return [element for element in self.elements if test(element.get_bound_box(), x1, y1, x2, y2)]
+
+    def nearest(self, x, y, max_distance: float = float("inf")):
+        """
+        Find the top level element nearest to the point, the distance is measured to the bounding rect of element,
+        the element containing the point has distance 0. Of elements at the same distance the topmost one is returned
+        :param max_distance: the elements farther than max_distance are ignored
+        :return: (element, distance) or None in case of no element was found
+        """
+        spatial = self.__spatial_index()
+        if spatial is not None:
+            return spatial.nearest(x, y, max_distance)
+        found = None
+        for element in self.elements:
+            distance = box_distance(element.get_bound_box(), x, y)
+            if distance <= max_distance and (found is None or distance <= found[1]):
+                found = (element, distance)
+        return found
 
     def add_elements(self, elements: list):
         for element in elements:
-            self.elements.append(element)
+            self.add_element(element)
+
+    def iter_children(self):
+        return iter(self.elements)
 
     def get_bound_rect(self):
         return self.rc
@@ -328,31 +1131,52 @@ class SvgRect(SvgElement):
     def get_bound_rect(self) -> Rect:
         return self.rc
 
+    def get_bound_box(self) -> tuple:
+        return self.rc.to_box()
+
     def set_rect(self, rect: Rect):
         self.rc.set_rect(rect.pt.x, rect.pt.y, rect.width, rect.height)
+        self.invalidate(attributes=False, geometry=True)
+
+    def set_rect_coords(self, x, y, width, height):
+        self.rc.set_rect(x, y, width, height)
+        self.invalidate(attributes=False, geometry=True)
 
     def set_width(self, w):
         self.rc.set_width(w)
+        self.invalidate(attributes=False, geometry=True)
 
     def set_height(self, h):
         self.rc.set_height(h)
+        self.invalidate(attributes=False, geometry=True)
 
     def set_size(self, width=None, height=None):
         self.rc.set_size(width, height)
+        self.invalidate(attributes=False, geometry=True)
 
     def offset(self, dx=0, dy=0):
         self.rc.offset(dx=dx, dy=dy)
-
-    def to_svg(self):
+        self.invalidate(attributes=False, geometry=True)
+
+    def to_attr_dict(self) -> dict:
+        attrs = {name: fmt_num(value) for name, value in self.rc.to_dict().items()}
+        if self.rx:
+            attrs['rx'] = fmt_num(self.rx)
+        if self.ry:
+            attrs['ry'] = fmt_num(self.ry)
+        attrs.update(super().to_attr_dict())
+        return attrs
+
+    def iter_svg(self):
         rc_str = self.rc.to_attr_string()
 
         radius_str = ''
         if self.rx or self.ry:
             if self.rx:
-                radius_str = f'rx="{self.rx}"'
+                radius_str = f' rx="{fmt_num(self.rx)}"'
             if self.ry:
-                radius_str += f'ry="{self.ry}"'
-        return f'<rect {rc_str}{radius_str}{self.to_attr_string()}/>'
+                radius_str += f' ry="{fmt_num(self.ry)}"'
+        yield f'<rect {rc_str}{radius_str}{self.to_attr_string()}/>'
 
 
 class SvgLine(SvgElement):
@@ -392,12 +1216,19 @@ class SvgLine(SvgElement):
         return f'Line: x1: {self.x1}, y1: {self.y1}, x2:{self.x2}, y2:{self.y2}{self.to_attr_string()}'
 
     def get_bound_rect(self):
-        rc = Rect().from_coord(self.x1, self.y1, self.x2, self.y2)
-        return rc
+        return Rect(self.x1, self.y1, self.x2 - self.x1, self.y2 - self.y1)
 
-    def to_svg(self):
-        coordinates_str = f'x1="{self.x1}"x2="{self.x2}"y1="{self.y1}"y2="{self.y2}"'
-        return f'<line {coordinates_str}{self.to_attr_string()}/>'
+    def get_bound_box(self) -> tuple:
+        return min(self.x1, self.x2), min(self.y1, self.y2), max(self.x1, self.x2), max(self.y1, self.y2)
+
+    def to_attr_dict(self) -> dict:
+        return {'x1': fmt_num(self.x1), 'x2': fmt_num(self.x2), 'y1': fmt_num(self.y1), 'y2': fmt_num(self.y2),
+                **super().to_attr_dict()}
+
+    def iter_svg(self):
+        coordinates_str = f'x1="{fmt_num(self.x1)}" x2="{fmt_num(self.x2)}" y1="{fmt_num(self.y1)}" ' \
+                          f'y2="{fmt_num(self.y2)}"'
+        yield f'<line {coordinates_str}{self.to_attr_string()}/>'
 
 
 class SvgCircle(SvgElement):
@@ -429,11 +1260,17 @@ class SvgCircle(SvgElement):
         return self.to_svg()
 
     def get_bound_rect(self):
-        rc = Rect().from_coord(self.cx - self.r, self.cy - self.r, self.cx + self.r, self.cy + self.r)
-        return rc
+        return Rect(self.cx - self.r, self.cy - self.r, self.r * 2, self.r * 2)
 
-    def to_svg(self):
-        return f'<circle cx="{self.cx}"cy="{self.cy}"r="{self.r}"{self.to_attr_string()}/>'
+    def get_bound_box(self) -> tuple:
+        return self.cx - self.r, self.cy - self.r, self.cx + self.r, self.cy + self.r
+
+    def to_attr_dict(self) -> dict:
+        return {'cx': fmt_num(self.cx), 'cy': fmt_num(self.cy), 'r': fmt_num(self.r), **super().to_attr_dict()}
+
+    def iter_svg(self):
+        yield f'<circle cx="{fmt_num(self.cx)}" cy="{fmt_num(self.cy)}" r="{fmt_num(self.r)}"' \
+              f'{self.to_attr_string()}/>'
 
 
 class SvgEllipse(SvgElement):
@@ -469,11 +1306,45 @@ class SvgEllipse(SvgElement):
         return self.to_svg()
 
     def get_bound_rect(self):
-        rc = Rect().from_coord(self.cx - self.rx, self.cy - self.ry, self.cx + self.rx, self.cy + self.ry)
-        return rc
+        return Rect(self.cx - self.rx, self.cy - self.ry, self.rx * 2, self.ry * 2)
+
+    def get_bound_box(self) -> tuple:
+        return self.cx - self.rx, self.cy - self.ry, self.cx + self.rx, self.cy + self.ry
+
+    def to_attr_dict(self) -> dict:
+        return {'cx': fmt_num(self.cx), 'cy': fmt_num(self.cy), 'rx': fmt_num(self.rx), 'ry': fmt_num(self.ry),
+                **super().to_attr_dict()}
+
+    def iter_svg(self):
+        yield f'<ellipse cx="{fmt_num(self.cx)}" cy="{fmt_num(self.cy)}" rx="{fmt_num(self.rx)}" ' \
+              f'ry="{fmt_num(self.ry)}"{self.to_attr_string()}/>'
 
-    def to_svg(self):
-        return f'<circle cx="{self.cx}"cy="{self.cy}"rx="{self.rx}"ry="{self.ry}"{self.to_attr_string()}/>'
+
+@lru_cache(maxsize=512)
+def unit_figure(angels_count: int, inner_ratio: float, start_angle: float = 0, rotation: float = 0,
+                counterclockwise: bool = False) -> tuple:
+    """
+    The vertices of polygon or star inscribed in the circle of radius 1 with center in (0, 0), memoized:
+    the shape depends on these parameters only, the figures of any size and position scale and move it
+    :param angels_count: number of vertices of polygon or rays of star
+    :param inner_ratio: inner radius of star as a part of outer radius, 0 - polygon
+    :param start_angle: the angle of the first vertex, degrees
+    :param rotation: degrees
+    :param counterclockwise: the order of vertices
+    :return: flat tuple of vertex coordinates (x0, y0, x1, y1, ...)
+    """
+    start_angle = start_angle / 2 if inner_ratio else start_angle
+    count = angels_count * 2 if inner_ratio else angels_count
+    angle = ((start_angle + rotation) * pi) / 180
+    delta = -(2 * pi) / count if counterclockwise else (2 * pi) / count
+    coords = []
+    for index in range(count):
+        if index:
+            angle += delta
+        radius = inner_ratio if inner_ratio and not index % 2 else 1
+        coords.append(radius * sin(angle))
+        coords.append(-radius * cos(angle))
+    return tuple(coords)
 
 
 class SvgFigure(SvgElement):
@@ -514,48 +1385,58 @@ class SvgFigure(SvgElement):
         return self.to_svg()
 
     def get_bound_rect(self):
-        rc = Rect().from_coord(self.cx - self.r_out, self.cy - self.r_out, self.cx + self.r_out, self.cy + self.r_out)
-        return rc
+        return Rect(self.cx - self.r_out, self.cy - self.r_out, self.r_out * 2, self.r_out * 2)
 
-    def to_svg(self):
-        path = self.build_figure(counterclockwise=0)
-        return f'<polygon points="{path}"{self.to_attr_string()}/>'
+    def get_bound_box(self) -> tuple:
+        return self.cx - self.r_out, self.cy - self.r_out, self.cx + self.r_out, self.cy + self.r_out
 
-    def build_figure(self, counterclockwise=0):
-        start_angle = self.start_angle / 2 if self.r_inner_pct else self.start_angle
-        angels_count = self.angels * 2 if self.r_inner_pct else self.angels
+    def to_attr_dict(self) -> dict:
+        return {'points': self.build_figure(counterclockwise=0), **super().to_attr_dict()}
 
-        start_angle_rad = ((start_angle + self.rotation) * pi) / 180
-        # self.start_angle = ((self.start_angle + self.rotation) * pi) / 180   # convert degrees to radians
-        inner_radius = (self.r_out / 100) * self.r_inner_pct
+    def iter_svg(self):
+        path = self.build_figure(counterclockwise=0)
+        yield f'<polygon points="{path}"{self.to_attr_string()}/>'
 
-        points = ''
-        if self.r_inner_pct:
-            points += f'{self.cx + inner_radius * sin(start_angle_rad)}, ' \
-                      f'{self.cy - inner_radius * cos(start_angle_rad)}'
-        else:
-            points += f'{self.cx + self.r_out * sin(start_angle_rad)}, ' \
-                      f'{self.cy - self.r_out * cos(start_angle_rad)}'
+    def shape_key(self, counterclockwise=0) -> tuple:
+        """ The parameters of unit shape of figure, see unit_figure() """
+        return self.angels, self.r_inner_pct / 100, self.start_angle, self.rotation, bool(counterclockwise)
 
-        delta = (2 * pi) / angels_count
+    def build_figure(self, counterclockwise=0):
+        """
+        :return: the points of polygon: 'x0, y0, x1, y1, ...', the cached unit shape scaled by r_out and moved
+            to (cx, cy)
+        """
+        coords = unit_figure(*self.shape_key(counterclockwise))
+        r = self.r_out
+        return fmt_coords([origin + r * coord for origin, coord in zip((self.cx, self.cy) * (len(coords) // 2),
+                                                                       coords)])
 
-        for i in range(1, angels_count):
-            if counterclockwise:
-                start_angle_rad += -delta
-            else:
-                start_angle_rad += delta   # correct an angle
-            if self.r_inner_pct:
-                if i % 2:
-                    points += f' {self.cx + self.r_out * sin(start_angle_rad)},' \
-                              f'{self.cy - self.r_out * cos(start_angle_rad)}'
-                else:
-                    points += f' {self.cx + inner_radius * sin(start_angle_rad)},' \
-                              f'{self.cy - inner_radius * cos(start_angle_rad)}'
+    @staticmethod
+    def render_many(figures: list) -> list:
+        """
+        Serialize many figures at once: the points of figures of the same shape and size are computed by one
+        vectorized operation (numpy), the markup is stored into the caches of figures
+        :param figures: list of SvgFigure
+        :return: list of markup of figures
+        """
+        groups = {}
+        for index, figure in enumerate(figures):
+            groups.setdefault((figure.shape_key(), figure.r_out), []).append(index)
+
+        result = [''] * len(figures)
+        for (key, r), indexes in groups.items():
+            coords = unit_figure(*key)
+            vertices = len(coords) // 2
+            centers = [(figures[index].cx, figures[index].cy) for index in indexes]
+            if np is not None:
+                # (figures, 2 * vertices) matrix of coordinates: the centers repeated per vertex + scaled shape
+                rows = (np.tile(np.asarray(centers, dtype=float), vertices) + r * np.asarray(coords)).tolist()
             else:
-                points += f' {self.cx + self.r_out * sin(start_angle_rad)},' \
-                          f'{self.cy - self.r_out * cos(start_angle_rad)}'
-
-        return points
+                rows = ([origin + r * coord for origin, coord in zip(center * vertices, coords)] for center in centers)
+            for index, row in zip(indexes, rows):
+                figure = figures[index]
+                figure._svg_cache = result[index] = f'<polygon points="{fmt_coords(row)}"{figure.to_attr_string()}/>'
+        return result
 
 
 class SvgText(SvgElement):
@@ -582,21 +1463,40 @@ class SvgText(SvgElement):
         self.y = y
         self.text = text
 
-        self.set_attributes([
-            f'fill:{self.font_color}',
-            f'font_family:{self.font_family}',
-            f'font-size:{self.font_size}',
-            f'font-stretch:{self.font_stretch}',
-            f'dominant-baseline:{self.text_baseline}',
-            f'text-anchor:{self.text_anchor}'
-        ])
+        self.set_attrs({
+            'fill': self.font_color,
+            'font_family': self.font_family,
+            'font-size': self.font_size,
+            'font-stretch': self.font_stretch,
+            'dominant-baseline': self.text_baseline,
+            'text-anchor': self.text_anchor
+        })
 
     def __str__(self) -> str:
         return self.to_svg()
 
-    def to_svg(self):
-        return f'<text x="{self.x}" y="{self.y}" {self.to_attr_string()}>{self.text}</text>'
+    def to_attr_dict(self) -> dict:
+        # textContent is not an attribute, the client replaces the text of element
+        return {'x': fmt_num(self.x), 'y': fmt_num(self.y), 'textContent': str(self.text), **super().to_attr_dict()}
+
+    def iter_svg(self):
+        yield f'<text x="{fmt_num(self.x)}" y="{fmt_num(self.y)}"{self.to_attr_string()}>' \
+              f'{escape_text(self.text)}</text>'
 
     def get_bound_rect(self):
-        return self.rc
+        x1, y1, x2, y2 = self.get_bound_box()
+        return Rect(x1, y1, x2 - x1, y2 - y1)
+
+    def get_bound_box(self) -> tuple:
+        """
+        The approximate box of text: the average glyph is about 0.6 of the font size wide,
+        the box is aligned by text-anchor and dominant-baseline
+        """
+        match = re.match(r'\s*([\d.]+)', str(self.font_size))
+        size = float(match.group(1)) if match else 10
+        width = len(self.text) * size * 0.6
+        x = self.x - (width / 2 if self.text_anchor == 'middle' else width if self.text_anchor == 'end' else 0)
+        y = self.y - (size / 2 if self.text_baseline == 'middle' else 0 if self.text_baseline == 'hanging'
+                      else size * 0.8)
+        return x, y, x + width, y + size
 
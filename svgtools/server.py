@@ -0,0 +1,392 @@
+import asyncio
+import json
+import logging
+import time
+from math import isfinite
+
+from svgtools.document import SvgDocument
+from svgtools.primitives import delta_applier_script, check_attr
+
+logger = logging.getLogger(__name__)
+
+
+class SseClient:
+    """ The connected browser: the stream of server-sent events """
+    __slots__ = ("writer", "lagging_since", "last_write")
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.lagging_since = None   # the time the client stopped receiving frames, None - the client is in sync
+        self.last_write = time.monotonic()
+
+    def buffered(self) -> int:
+        """ :return: the count of bytes written to the client and not sent yet """
+        return self.writer.transport.get_write_buffer_size()
+
+    def send(self, data: bytes):
+        self.writer.write(data)
+        self.last_write = time.monotonic()
+
+
+class LiveServer:
+    """ LiveServer
+        Serve the document as html page and push the changes of its widgets to the browsers by Server-Sent Events.
+        Only the standard library (asyncio) is used.
+
+        GET /           - the page: the document with all registry defs (the deltas may reference any of them)
+                          and the script applying the pushed deltas
+        GET /events     - the stream of events: the first one is the full state of widgets, then the deltas
+        POST /update    - json {element id: update}, see apply_update(). The whole body is checked
+                          before any update is applied, the invalid one is rejected by 400 Bad Request
+
+        The updates change the widgets only. Once per frame (fps times per second) the changes of all canvases
+        are collected by SvgRoot.delta() and serialized once, the same bytes are written to all clients,
+        so many updates between two frames are coalesced into one event and nothing is rendered per client.
+        Backpressure: the client, whose send buffer exceeds high_water bytes, is skipped by the next frames.
+        When its buffer drops below low_water, it gets the full state instead of the skipped deltas.
+        The client lagging longer than max_lag seconds is disconnected.
+        The frame, which fails to build, is logged and skipped, the next frames are pushed as usual.
+
+        The in-process producers call update() from the event loop
+        (or loop.call_soon_threadsafe(server.update, updates) from other threads).
+
+        :param document: SvgDocument, or SvgRoot canvas
+        :param host, port: the address to listen on, port 0 - any free port, see port after start()
+        :param fps: the max count of frames per second
+        :param high_water, low_water: the limits of send buffer of client, bytes
+        :param max_lag: seconds
+        :param heartbeat: the period of keep-alive comments, seconds
+        :param max_body: the max size of POST body, bytes, the larger one is rejected by 413 Payload Too Large
+    """
+    update_keys = ('attrs', 'value', 'values', 'state', 'states')   # the keys of dict update, see apply_update()
+    locked_attrs = frozenset(('id', 'class', 'class_name'))          # can not be changed by attrs update
+
+    page_script = '<script>\n{applier}\n' \
+                  'new EventSource("/events").onmessage = function (event) {{ applySvgDelta(event.data); }};\n' \
+                  '</script>\n'
+
+    def __init__(self, document, host: str = '127.0.0.1', port: int = 8080, fps: float = 10,
+                 high_water: int = 256 * 1024, low_water: int = 16 * 1024, max_lag: float = 30,
+                 heartbeat: float = 15, max_body: int = 1024 * 1024):
+        if fps <= 0:
+            raise ValueError(f"fps must be positive, not {fps}")
+        self.document = document if isinstance(document, SvgDocument) else SvgDocument([document])
+        self.host = host
+        self.port = port
+        self.fps = fps
+        self.high_water = high_water
+        self.low_water = low_water
+        self.max_lag = max_lag
+        self.heartbeat = heartbeat
+        self.max_body = max_body
+        self.clients = set()
+        self.frame = 0              # the id of the last event
+        self._elements = None       # {element id: element}, None - must be rebuilt
+        self._elements_frame = -1   # the frame the ids were collected in, see find()
+        self._revs = {}             # {canvas: revision of canvas at the last frame}
+        self._snapshot = None       # (frame, the full state event) - cached for all clients connecting in one frame
+        self._server = None
+        self._frames_task = None
+
+        for canvas in self.document.canvases:
+            canvas.commit()         # the clients get the committed state on connect, then the changes only
+            self._revs[canvas] = canvas._rev
+
+    # updates
+
+    def find(self, element_id: str):
+        """
+        :return: the element of document with id, None in case of not found.
+            The unknown id rebuilds the ids of document at most once per frame (the element may be added since
+            the last build), the other misses of the frame are the dict lookups only
+        """
+        if self._elements is None or (element_id not in self._elements and self._elements_frame != self.frame):
+            self._elements = {}
+            self._elements_frame = self.frame
+            for canvas in self.document.canvases:
+                self.__collect_ids(canvas)
+        return self._elements.get(element_id)
+
+    def __collect_ids(self, element):
+        for child in element.iter_children():
+            if child.id:
+                self._elements[child.id] = child
+            self.__collect_ids(child)
+
+    def update(self, updates: dict) -> list:
+        """
+        Apply the updates to widgets, the changes are pushed to clients by the next frame.
+        The widgets may be changed by their own methods as well, the frame collects all changes of canvases.
+        All updates are checked before the first one is applied, see check_update()
+        :param updates: {element id: update}, see apply_update()
+        :return: the list of unknown ids
+        """
+        if not isinstance(updates, dict):
+            raise ValueError(f"the updates must be an object {{element id: update}}, not {type(updates).__name__}")
+        unknown = []
+        found = []
+        for element_id, update in updates.items():
+            element = self.find(element_id)
+            if element is None:
+                unknown.append(element_id)
+                continue
+            self.check_update(element_id, element, update)
+            found.append((element, update))
+        for element, update in found:
+            self.apply_update(element, update)
+        return unknown
+
+    @classmethod
+    def check_update(cls, element_id: str, element, update):
+        """
+        Check the update has the form accepted by apply_update() and the element has its setters.
+        The numbers must be finite. The attributes are checked by check_attr(), the event handlers (on*),
+        the id and the class can not be set
+        """
+        def check_setter(name: str):
+            if not callable(getattr(element, f'set_{name}', None)):
+                raise ValueError(f"{element_id}: {type(element).__name__} does not support '{name}' update")
+
+        def check_number(name: str, value):
+            if type(value) not in (int, float):
+                raise ValueError(f"{element_id}: '{name}' must be a number, not {type(value).__name__}")
+            if not isfinite(value):
+                raise ValueError(f"{element_id}: '{name}' must be a finite number, not {value!r}")
+
+        def check_numbers(name: str, values):
+            if not isinstance(values, list):
+                raise ValueError(f"{element_id}: '{name}' must be a list, not {type(values).__name__}")
+            for value in values:
+                check_number(name, value)
+
+        if isinstance(update, dict):
+            for name, value in update.items():
+                if name not in cls.update_keys:
+                    raise ValueError(f"{element_id}: unknown update '{name}', expected one of {cls.update_keys}")
+                check_setter(name)
+                if name == 'attrs':
+                    if not isinstance(value, dict):
+                        raise ValueError(f"{element_id}: 'attrs' must be an object, not {type(value).__name__}")
+                    for attr_name, attr_value in value.items():
+                        if attr_name in cls.locked_attrs or str(attr_name)[:2].lower() == 'on':
+                            raise ValueError(f"{element_id}: the attribute {attr_name!r} can not be updated")
+                        try:
+                            check_attr(attr_name, attr_value)
+                        except ValueError as e:
+                            raise ValueError(f"{element_id}: {e}") from None
+                elif name in ('values', 'states'):
+                    check_numbers(name, value)
+                else:
+                    check_number(name, value)
+        elif isinstance(update, list):
+            check_setter('values')
+            check_numbers('values', update)
+        else:
+            check_setter('value')
+            check_number('value', update)
+
+    @staticmethod
+    def apply_update(element, update):
+        """
+        Apply the update to element:
+            number - set_value(number), list - set_values(list),
+            {"value": v, "values": [...], "state": s, "states": [...], "attrs": {name: value}} - any of keys
+        """
+        if isinstance(update, dict):
+            if 'attrs' in update:
+                element.set_attrs(update['attrs'])
+            for name in ('value', 'values', 'state', 'states'):
+                if name in update:
+                    getattr(element, f'set_{name}')(update[name])
+        elif isinstance(update, list):
+            element.set_values(update)
+        else:
+            element.set_value(update)
+
+    # events
+
+    @staticmethod
+    def event(frame: int, data: str) -> bytes:
+        return f'id: {frame}\ndata: {data}\n\n'.encode()
+
+    def snapshot(self) -> bytes:
+        """ The event with the full state of all widgets as of the last frame, built once per frame """
+        if self._snapshot is None or self._snapshot[0] != self.frame:
+            state = {}
+            for canvas in self.document.canvases:
+                state.update(canvas.committed_state())
+            data = json.dumps(state, separators=(',', ':'), default=str)
+            self._snapshot = (self.frame, self.event(self.frame, data))
+        return self._snapshot[1]
+
+    def build_frame(self) -> bytes | None:
+        """ Collect the changes of all canvases since the last frame, None - nothing was changed """
+        changes = {}
+        for canvas in self.document.canvases:
+            if canvas._rev != self._revs.get(canvas):
+                self._revs[canvas] = canvas._rev
+                changes.update(canvas.delta(commit=True))
+        if not changes:
+            return None
+        self.frame += 1
+        return self.event(self.frame, json.dumps(changes, separators=(',', ':'), default=str))
+
+    def broadcast(self, data: bytes | None):
+        """ Write the frame to clients in sync, resync the drained lagging clients, drop the dead ones """
+        now = time.monotonic()
+        for client in list(self.clients):
+            if client.writer.is_closing():
+                self.clients.discard(client)
+                continue
+            buffered = client.buffered()
+            if client.lagging_since is not None:
+                if buffered <= self.low_water:
+                    client.lagging_since = None
+                    client.send(self.snapshot())
+                elif now - client.lagging_since > self.max_lag:
+                    self.disconnect(client)
+            elif buffered > self.high_water:
+                client.lagging_since = now
+            elif data is not None:
+                client.send(data)
+            elif now - client.last_write > self.heartbeat:
+                client.send(b': ping\n\n')
+
+    def disconnect(self, client: SseClient):
+        self.clients.discard(client)
+        client.writer.transport.abort()     # do not wait for the buffered data of slow client
+
+    async def frames(self):
+        period = 1 / self.fps
+        while True:
+            started = time.monotonic()
+            try:
+                self.broadcast(self.build_frame())
+            except Exception:
+                logger.exception("LiveServer: the frame %d failed", self.frame + 1)
+            await asyncio.sleep(max(period - (time.monotonic() - started), 0))
+
+    # http
+
+    def page(self) -> bytes:
+        script = self.page_script.format(applier=delta_applier_script())
+        html = self.document.to_html(all_defs=True)
+        if '</body>' in html:
+            html = html.replace('</body>', f'{script}</body>', 1)
+        else:
+            html += script
+        return html.encode()
+
+    @staticmethod
+    def response(writer: asyncio.StreamWriter, status: str, body: bytes = b'',
+                 content_type: str = 'text/plain; charset=utf-8'):
+        writer.write(f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n'
+                     f'Connection: close\r\n\r\n'.encode() + body)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            method, path, _ = request_line.split(' ', 2)
+            headers = {}
+            for line in header_lines:
+                if ':' in line:
+                    name, value = line.split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+            path = path.split('?', 1)[0]
+
+            if method == 'GET' and path == '/events':
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n'
+                             b'Connection: keep-alive\r\n\r\n')
+                client = SseClient(writer)
+                client.send(self.snapshot())
+                self.clients.add(client)
+                while await reader.read(1024):
+                    pass                # wait for the client to disconnect
+                self.clients.discard(client)
+                return
+            if method == 'GET' and path in ('/', '/index.html'):
+                self.response(writer, '200 OK', self.page(), 'text/html; charset=utf-8')
+            elif method == 'POST' and path == '/update':
+                length = int(headers.get('content-length', 0))
+                if length < 0:
+                    raise ValueError(f"invalid content-length: {length}")
+                if length > self.max_body:
+                    self.response(writer, '413 Payload Too Large', f'the max body size is {self.max_body}'.encode())
+                    await writer.drain()
+                    return
+                body = await reader.readexactly(length)
+                unknown = self.update(json.loads(body))
+                self.response(writer, '200 OK', json.dumps({'unknown': unknown}).encode(), 'application/json')
+            else:
+                self.response(writer, '404 Not Found', b'not found')
+            await writer.drain()
+        except (ValueError, AttributeError, TypeError, KeyError) as e:
+            self.response(writer, '400 Bad Request', str(e).encode())
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        """ Start listening and pushing the frames, the actual port is stored in port """
+        self._server = await asyncio.start_server(self.handle, self.host, self.port, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._frames_task = asyncio.create_task(self.frames())
+        return self
+
+    async def close(self):
+        if self._frames_task is not None:
+            self._frames_task.cancel()
+            self._frames_task = None
+        for client in list(self.clients):
+            self.disconnect(client)
+        if self._server is not None:
+            self._server.close()
+            await asyncio.sleep(0)      # let the handlers of disconnected clients finish
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    def run(self):
+        """ Run the server in the current thread until it is interrupted """
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            pass
+
+
+async def read_events(host: str, port: int, path: str = '/events'):
+    """
+    The stand-in client for tests and benchmarks: connect to the event stream and yield the events
+    :return: async iterator of (event id, data), the data is parsed json
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n'.encode())
+        await writer.drain()
+        await reader.readuntil(b'\r\n\r\n')
+        event_id = None
+        data = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            line = line.rstrip(b'\r\n')
+            if not line:
+                if data:
+                    yield event_id, json.loads(b'\n'.join(data))
+                event_id = None
+                data = []
+            elif line.startswith(b'id:'):
+                event_id = int(line[3:])
+            elif line.startswith(b'data:'):
+                data.append(line[5:].lstrip())
+    finally:
+        writer.close()
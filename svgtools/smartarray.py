@@ -1,10 +1,24 @@
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from itertools import groupby, islice, repeat
+from operator import itemgetter
+from math import fsum
+from numbers import Real
 from typing import List, Dict
 
+try:
+    import numpy as np
+except ImportError:     # numpy is optional, the typed arrays fall back to pure python
+    np = None
+
 
 class ArrayItem:
     """
-
+    The node of LinkedSmartArray
     """
+    __slots__ = ("value", "key", "prev", "next")
+
     def __init__(self, key=None, value=None, next_item=None, prev_item=None):
         self.value = value
         self.key = key
@@ -18,11 +32,15 @@ class ArrayItem:
             return {self.key: self.value}
 
 
-class SmartArray:
+class LinkedSmartArray:
     """
+    The doubly linked list implementation of SmartArray API. Kept as the reference implementation,
+    SmartArray is faster for all operations except the insertion and deletion near the head of big arrays.
+
     Array implementation with handy API:
 
     append(val, key=None, count: int = 1) - append specified items to array
+    extend(values, keys=None) - append all values (and keys) to array at once
     at(index: int = -1, key=None, value=None) - find and return an item by one of parameter: index or key or value
     delete(at_index=-1, value=None, key=None) - find and delete an item from array
     filter(by_value=None, by_key=None) - filter an item by key or by value and return dictionary
@@ -50,15 +68,11 @@ class SmartArray:
         self.from_list(from_list)
         self.from_dict(from_dict)
 
-        self.__length = self.length()
-
     def from_list(self, from_list):
-        for il in from_list:
-            self.__add(il)
+        self.extend(from_list)
 
     def from_dict(self, from_dict: dict):
-        for dk in from_dict:
-            self.__add(from_dict[dk], key=dk)
+        self.extend(from_dict.values(), keys=from_dict.keys())
 
     def __str__(self):
         result = "["
@@ -121,34 +135,29 @@ class SmartArray:
     def __delitem__(self, key):
         self.delete(key=key)
 
-    def __count(self) -> int:
-        """
-        Count the length of SmartArray instance
-        :return: the count of items, 0 - in case of empty
-        """
-        item = self.__items
-        length = 0
-        while item:
-            length += 1
-            item = item.next
-        return length
-
     def __add(self, val, key=None, n=1):
-        prev_item = None if not self.__last else self.__last
-
-        for index in range(0, n):
-            item = ArrayItem(value=val, key=key, prev_item=prev_item)
+        self.__link(ArrayItem(value=val, key=key) for index in range(0, n))
 
-            if not self.__items:
+    def __link(self, items) -> int:
+        """
+        Link the batch of new items at the end of array in one pass
+        :param items: iterable of ArrayItem
+        :return: the count of linked items
+        """
+        prev_item = self.__last
+        count = 0
+        for item in items:
+            item.prev = prev_item
+            if prev_item is None:
                 self.__items = item
-                prev_item = item
-                self.__last = item
             else:
                 prev_item.next = item
-                prev_item = item
-                self.__last = prev_item
+            prev_item = item
+            count += 1
 
-        self.__length = self.__count()
+        self.__last = prev_item
+        self.__length += count
+        return count
 
     def __at(self, index=-1, key=None, value=None) -> ArrayItem:
         """
@@ -216,10 +225,10 @@ class SmartArray:
 
     def length(self) -> int:
         """
-        Count the length of SmartArray instance
+        Return the length of SmartArray instance, the length is maintained by all mutations, O(1)
         :return: the count of items, 0 - in case of empty
         """
-        return self.__count()
+        return self.__length
 
     def set_at(self, index, value=None, key=None):
         """
@@ -259,16 +268,18 @@ class SmartArray:
             new_item.prev = cur_item.prev
             new_item.prev.next = cur_item.prev = new_item
 
-        self.__length = self.__count()
+        self.__length += 1
         return True
 
     def clear(self):
         """
-        Delete all items from SmartArray
+        Delete all items from SmartArray, O(1): the items are just unlinked
         :return: None
         """
-        while self.length():
-            self.delete(self.length()-1)
+        self.__items = None
+        self.__last = None
+        self.__next = None
+        self.__length = 0
         self.__sorted_list = None
 
     def delete(self, at_index=-1, value=None, key=None):
@@ -284,23 +295,17 @@ class SmartArray:
         if del_item is None:
             return False
 
-        if at_index == 0:
+        if del_item.prev is None:
             self.__items = del_item.next
-            if del_item.next is not None:
-                del_item.next.prev = None
-            if self.__length == 1:
-                self.__last = None
-            del del_item
         else:
             del_item.prev.next = del_item.next
-            if del_item.next:
-                del_item.next.prev = del_item.prev
-            else:
-                self.__last = del_item.prev
-
-            del del_item
+        if del_item.next is None:
+            self.__last = del_item.prev
+        else:
+            del_item.next.prev = del_item.prev
+        del del_item
 
-        self.__length = self.__count()
+        self.__length -= 1
         return True
 
     def index(self, value=None, key=None) -> int:
@@ -398,7 +403,7 @@ class SmartArray:
         :return:
             SmartArray: the copy of current instance of SmartArray
         """
-        new_arr = SmartArray()
+        new_arr = type(self)()
         item = self.__items
         while item:
             new_arr.append(item.value, key=item.key)
@@ -416,6 +421,1196 @@ class SmartArray:
         self.__add(val=val, key=key, n=count)
         return self.length()
 
+    def extend(self, values, keys=None) -> int:
+        """
+        Append all values at the end of SmartArray instance, the whole batch is linked in one pass
+        :param values: [iterable] - the values
+        :param keys: [iterable] - optional parameter, the keys of values
+        :return: the new length of array
+        """
+        if keys is None:
+            self.__link(ArrayItem(value=value) for value in values)
+        else:
+            self.__link(ArrayItem(value=value, key=key) for value, key in zip(values, keys))
+        return self.length()
+
+
+
+class SmartArray:
+    """
+    Array implementation with handy API:
+
+    append(val, key=None, count: int = 1) - append specified items to array
+    extend(values, keys=None) - append all values (and keys) to array at once
+    at(index: int = -1, key=None, value=None) - find and return an item by one of parameter: index or key or value
+    delete(at_index=-1, value=None, key=None) - find and delete an item from array
+    filter(by_value=None, by_key=None) - filter an item by key or by value and return dictionary
+    get_sorted_list() - return the previously sorted list
+    index(value=None, key=None) - find and return an item by key or value
+    insert(value, key=None, at_index=0) - insert an item into specified position
+    length() - returns the count of elements in array
+    scopy() - returns the safe copy of array
+    set_at(index, value=None, key=None) - store the new value and key at specified index
+    sort(reverse: bool = False, sort_by: str = "val") - sort an array and returns sorted list
+    value(index: int = -1, key=None) - find and return an item by index and or key
+    key(index: int = -1, value=None) - find and return an item by index and or value
+    set_sorted_by(sort_by: str = "val") - enable (or disable with None) the always sorted index
+    min(), max() - the item with the least or the greatest value (or key, in case of the sorted index by key)
+    top_k(k), between(lo, hi) - rank and range queries, the sorted index must be enabled
+    sum(), mean() - reductions of numeric values
+    to_memoryview(), to_numpy() - zero copy export of values of typed array
+
+    Storage: keys and values are stored in two parallel lists, so the access by position is O(1).
+    The list of keys is created by the first stored key, the arrays without keys do not spend memory on it.
+    Typed mode, SmartArray(typecode='d'): the homogeneous numeric values are stored in array.array buffer
+    (8 bytes per double instead of the list slot and the float object), filter(by_value), sort and reductions
+    are vectorized with numpy if it is installed.
+    The hash index {key: [positions]} gives O(1) average lookup by key. The positions are stored relative to
+    the base offset, so the insertion or deletion shifts either the items before the position (by moving the base)
+    or the items after it, whichever part is shorter: the index is kept up to date in O(1) at the both ends
+    of array and near them. In case of more than key_shift_limit items would be shifted (in the middle
+    of large array), the index is dropped and rebuilt by the next lookup by key, so the series of changes
+    in the middle costs one rebuild.
+    The optional sorted index is the list of (value, id, key) or (key, id, value) entries kept in sorted order
+    by binary search on every change. The id is the serial number of item, it makes the entries unique and
+    keeps the equal items in the order of addition. The items without key (or with None value) are not indexed.
+    """
+    key_shift_limit = 1024  # the max count of items whose indexed positions are shifted by insert() or delete()
+
+    def __init__(self, length=0, initial_value=0, from_list=[], from_dict={}, sorted_by: str = None,
+                 typecode: str = None):
+        """
+        :param sorted_by: "val" or "key" - enable the always sorted index, see set_sorted_by()
+        :param typecode: array.array typecode ('d', 'f', 'i', 'q', ...) - store the values in typed buffer
+        """
+        self.typecode = typecode
+        self._keys = None       # None - no one item has a key
+        self._values = self.__new_values()
+        self._key_index = {}    # {key: ascending list of positions - _key_base}, None - must be rebuilt
+        self._key_base = 0      # the offset of positions stored in the key index
+        self._version = 0       # incremented by every mutation, see version
+        self._sorted_list = None
+        self._sorted_list_version = -1
+        self._sorted_by = None  # None - the sorted index is disabled, "val" or "key"
+        self._sorted = None     # sorted index entries
+        self._ids = None        # ids of items, parallel to keys and values, maintained with the sorted index
+        self._next_id = 0
+
+        self.set_sorted_by(sorted_by)
+
+        if length:
+            self.append(initial_value, count=length)
+
+        self.from_list(from_list)
+        self.from_dict(from_dict)
+
+    def __new_values(self):
+        return [] if self.typecode is None else array(self.typecode)
+
+    def __keys(self):
+        """ :return: keys of all items, iterable """
+        return repeat(None, len(self._values)) if self._keys is None else self._keys
+
+    def __key_at(self, pos):
+        return None if self._keys is None else self._keys[pos]
+
+    def __numpy_values(self):
+        """ :return: numpy array over the buffer of typed array (no copy), None in case of numpy is not available """
+        if np is None or self.typecode is None or not len(self._values):
+            return None
+        return np.frombuffer(self._values, dtype=self._values.typecode)
+
+    def from_list(self, from_list):
+        self.extend(from_list)
+
+    def from_dict(self, from_dict: dict):
+        if from_dict:
+            self.extend(from_dict.values(), keys=from_dict.keys())
+
+    def __str__(self):
+        result = "["
+        key_str = val_str = ""
+        for key, value in zip(self.__keys(), self._values):
+            if type(key) == str:
+                key_str = f"'{key}'"
+            else:
+                key_str = f"{key}"
+
+            if type(value) == str:
+                val_str = f"'{value}'"
+            else:
+                val_str = f"{value}"
+
+            if len(result) > 1:
+                result += ","
+
+            if key_str.find("None") >= 0:
+                result += f"{val_str}"
+            else:
+                result += f"{key_str}: {val_str}"
+
+        result += "]"
+        return result
+
+    def __iter__(self):
+        """
+        Iterate the items: {key: value} or just the value in case of key is None.
+        Every loop gets its own iterator, so the nested and concurrent loops over the same array are independent.
+        :raise RuntimeError: in case of the array was changed during iteration
+        """
+        version = self._version
+        for key, value in zip(self.__keys(), self._values):
+            if self._version != version:
+                raise RuntimeError("SmartArray changed during iteration")
+            yield value if key is None else {key: value}
+        if self._version != version:
+            raise RuntimeError("SmartArray changed during iteration")
+
+    def items(self):
+        """
+        :return: the view of array items as (key, value) pairs, the key is None for items without key
+        """
+        return SmartArrayView(self, "items")
+
+    def keys(self):
+        """
+        :return: the view of array keys
+        """
+        return SmartArrayView(self, "keys")
+
+    def values(self):
+        """
+        :return: the view of array values
+        """
+        return SmartArrayView(self, "values")
+
+    @property
+    def version(self) -> int:
+        """
+        The mutation counter, incremented by every change of array. Used to detect the changes during iteration and
+        to check whether the cached data (e.g. sorted list) is stale
+        """
+        return self._version
+
+    def __getitem__(self, item):
+        return self.at(index=item)
+
+    def __setitem__(self, index, value):
+        if type(value) == dict:
+            for k in value:
+                self.set_at(index=index, value=value[k], key=k)
+        else:
+            if isinstance(index, (str, float)) or index < 0:
+                raise ValueError(f"index must be integer in range from 0 upto length of array -1")
+            if index > self.length():
+                raise IndexError(f"index {index} out of range")
+            self.set_at(index=index, value=value)
+
+    def __delitem__(self, key):
+        self.delete(key=key)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __item(self, pos):
+        key = self.__key_at(pos)
+        return self._values[pos] if key is None else {key: self._values[pos]}
+
+    def __index_key(self, key, pos):
+        try:
+            positions = self._key_index.get(key)
+        except TypeError:
+            return      # unhashable keys are not indexed
+        pos -= self._key_base
+        if positions is None:
+            self._key_index[key] = [pos]
+        else:
+            insort(positions, pos)
+
+    def __unindex_key(self, key, pos):
+        try:
+            positions = self._key_index.get(key)
+        except TypeError:
+            return
+        del positions[bisect_left(positions, pos - self._key_base)]
+        if not positions:
+            del self._key_index[key]
+
+    def __shift_keys(self, start: int, end: int, delta: int):
+        """ Move the indexed positions of items at positions start ... end - 1 by delta """
+        if self._keys is None or self._key_index is None or start >= end:
+            return
+        if end - start > self.key_shift_limit:
+            self._key_index = None
+            return
+        lo = start - self._key_base
+        hi = end - self._key_base
+        shifted = set()
+        for key in self._keys[start:end]:
+            if key is None:
+                continue
+            try:
+                if key in shifted:
+                    continue
+                shifted.add(key)
+            except TypeError:
+                continue    # unhashable keys are not indexed
+            positions = self._key_index[key]
+            first = bisect_left(positions, lo)
+            last = bisect_left(positions, hi, first)
+            positions[first:last] = [pos + delta for pos in positions[first:last]]
+
+    def __key_positions(self, key) -> list:
+        """
+        :return: ascending list of positions of items with specified key
+        """
+        if self._key_index is None:
+            self._key_index = {}
+            self._key_base = 0
+            for pos, item_key in enumerate(self.__keys()):
+                if item_key is not None:
+                    self.__index_key(item_key, pos)
+        try:
+            positions = self._key_index.get(key)
+        except TypeError:
+            return [pos for pos, item_key in enumerate(self.__keys()) if item_key == key]
+        if not positions:
+            return []
+        base = self._key_base
+        return [pos + base for pos in positions] if base else positions
+
+    def __at(self, index=-1, key=None, value=None) -> int:
+        """
+        Find the position of item by index or first occurrence of item with specified key or value
+        :param index:
+        :param key:
+        :param value:
+        :return: the position of item or -1
+        """
+        if 0 <= index < len(self._values):
+            return index
+        if key:
+            positions = self.__key_positions(key)
+            if positions:
+                return positions[0]
+        if value:
+            try:
+                return self._values.index(value)
+            except ValueError:
+                pass
+        return -1
+
+    def sort_by_value(self, e):
+        return "" if e["value"] is None else e["value"]
+
+    def sort_by_key(self, e):
+        return "" if e["key"] is None else e["key"]
+
+    def sort(self, reverse: bool = False, sort_by: str = "val"):
+        """
+        Sort an array by "val" or by "key" and return the new list with sorted elements
+        :param reverse: True - ascending sort order, False - descending sort order
+        :param sort_by: "val" - sort by values, "key" - sort by keys
+        :return: the new list of sorted items in form: [{key:value},{key:value},...], or [value, value, ...]
+        """
+        self._sorted_list_version = self._version
+        if self._sorted_by == ("key" if sort_by == "key" else "val") and len(self._sorted) == len(self._values):
+            # all items are in the sorted index, no sorting is required
+            entries = self.__stable_entries(reverse)
+            if sort_by == "key":
+                self._sorted_list = [{"key": key, "value": value} for key, _, value in entries]
+            else:
+                self._sorted_list = [value if key is None else {"key": key, "value": value}
+                                     for value, _, key in entries]
+            if len(self._sorted_list):
+                return self._sorted_list
+            return None
+
+        if self.typecode is not None and sort_by != "key" and len(self._values):
+            self._sorted_list = self.__sort_typed(reverse)
+            return self._sorted_list
+
+        list_to_sort = self.filter()
+        if len(list_to_sort):
+            if sort_by == "key":
+                list_to_sort.sort(reverse=reverse, key=self.sort_by_key)
+            else:
+                list_to_sort.sort(reverse=reverse, key=self.sort_by_value)
+
+            self._sorted_list = []
+            for item in list_to_sort:
+                if item['key'] is None:
+                    self._sorted_list.append(item['value'])
+                else:
+                    self._sorted_list.append(item)
+
+            return self._sorted_list
+
+    def __stable_entries(self, reverse: bool) -> list:
+        """
+        The entries of sorted index in the order of stable list.sort(reverse=reverse): the equal items are kept
+        in the order of their positions in array (in the index they are in the order of addition)
+        """
+        entries = []
+        positions = None
+        for _, group in groupby(reversed(self._sorted) if reverse else self._sorted, key=itemgetter(0)):
+            group = list(group)
+            if len(group) > 1:
+                if positions is None:
+                    positions = {item_id: pos for pos, item_id in enumerate(self._ids)}
+                group.sort(key=lambda entry: positions[entry[1]])
+            entries.extend(group)
+        return entries
+
+    def __sort_typed(self, reverse: bool) -> list:
+        """ Stable sort of typed values, the equal items keep their order in both directions """
+        values = self.__numpy_values()
+        if self._keys is None:
+            if values is None:
+                return sorted(self._values, reverse=reverse)
+            result = np.sort(values, kind='stable')
+            return (result[::-1] if reverse else result).tolist()
+
+        if values is None:
+            order = sorted(range(len(self._values)), key=self._values.__getitem__, reverse=reverse)
+        elif reverse:
+            order = (len(values) - 1 - np.argsort(values[::-1], kind='stable'))[::-1].tolist()
+        else:
+            order = np.argsort(values, kind='stable').tolist()
+        keys = self._keys
+        return [self._values[pos] if keys[pos] is None else {"key": keys[pos], "value": self._values[pos]}
+                for pos in order]
+
+    def get_sorted_list(self) -> List:
+        """
+        :return: return the previously sorted list, see also is_sorted_list_stale()
+        """
+        return self._sorted_list
+
+    def is_sorted_list_stale(self) -> bool:
+        """
+        :return: True in case of the array was changed after the last sort()
+        """
+        return self._sorted_list_version != self._version
+
+    def set_sorted_by(self, sort_by: str = "val"):
+        """
+        Enable the always sorted index of items, which is updated by every change of array
+        :param sort_by: "val" - sort by values, "key" - sort by keys, None - disable the sorted index
+        """
+        if sort_by not in (None, "val", "key"):
+            raise ValueError(f"sort_by must be 'val', 'key' or None, not {sort_by}")
+        self._sorted_by = sort_by
+        if sort_by is None:
+            self._sorted = self._ids = None
+            return
+        count = len(self._values)
+        self._ids = list(range(self._next_id, self._next_id + count))
+        self._next_id += count
+        entries = (self.__sorted_entry(pos) for pos in range(count))
+        self._sorted = sorted(entry for entry in entries if entry is not None)
+
+    def __sorted_entry(self, pos):
+        if self._sorted_by == "key":
+            key = self.__key_at(pos)
+            return None if key is None else (key, self._ids[pos], self._values[pos])
+        value = self._values[pos]
+        return None if value is None else (value, self._ids[pos], self.__key_at(pos))
+
+    def __sort_in(self, pos):
+        entry = self.__sorted_entry(pos)
+        if entry is not None:
+            insort(self._sorted, entry)
+
+    def __sort_out(self, pos):
+        entry = self.__sorted_entry(pos)
+        if entry is not None:
+            del self._sorted[bisect_left(self._sorted, entry)]
+
+    def __sorted_item(self, entry):
+        if self._sorted_by == "key":
+            return {entry[0]: entry[2]}
+        return entry[0] if entry[2] is None else {entry[2]: entry[0]}
+
+    def __check_sorted(self):
+        if self._sorted_by is None:
+            raise ValueError("the sorted index is not enabled, call set_sorted_by() first")
+
+    def min(self):
+        """
+        :return: the item with the least value (or key), None in case of array is empty
+        """
+        if self._sorted_by is not None:
+            return self.__sorted_item(self._sorted[0]) if self._sorted else None
+        return self.__reduce_at(np.argmin if np is not None else None, min)
+
+    def max(self):
+        """
+        :return: the item with the greatest value (or key), None in case of array is empty
+        """
+        if self._sorted_by is not None:
+            return self.__sorted_item(self._sorted[-1]) if self._sorted else None
+        return self.__reduce_at(np.argmax if np is not None else None, max)
+
+    def __reduce_at(self, np_arg_func, func):
+        """ Find the first item with the least (or greatest) value by the full scan """
+        if not len(self._values):
+            return None
+        values = self.__numpy_values()
+        if values is not None:
+            return self.__item(int(np_arg_func(values)))
+        return self.__item(func(range(len(self._values)), key=self._values.__getitem__))
+
+    def sum(self):
+        """
+        :return: the sum of values, 0 in case of array is empty
+        """
+        values = self.__numpy_values()
+        if values is not None:
+            return values.sum().item()
+        return sum(self._values)
+
+    def mean(self):
+        """
+        :return: the arithmetic mean of values, None in case of array is empty
+        """
+        if not len(self._values):
+            return None
+        values = self.__numpy_values()
+        if values is not None:
+            return values.mean().item()
+        return sum(self._values) / len(self._values)
+
+    def to_memoryview(self) -> memoryview:
+        """
+        Zero copy export of values of typed array by the buffer protocol
+        Note: the array can not change its length while the exported memoryview is alive (BufferError), release it
+        :return: memoryview over the values buffer
+        """
+        if self.typecode is None:
+            raise AttributeError("to_memoryview() requires the typed array, create SmartArray(typecode=...)")
+        return memoryview(self._values)
+
+    def to_numpy(self):
+        """
+        Zero copy export of values of typed array as numpy array, shares the memory with SmartArray
+        """
+        if self.typecode is None:
+            raise AttributeError("to_numpy() requires the typed array, create SmartArray(typecode=...)")
+        if np is None:
+            raise AttributeError("to_numpy() requires numpy")
+        return np.frombuffer(self._values, dtype=self._values.typecode)
+
+    def top_k(self, k: int, largest: bool = True) -> list:
+        """
+        :param k: the count of items to return
+        :param largest: True - k items with the greatest values (or keys) in descending order,
+            False - k items with the least values in ascending order
+        :return: the list of items: value or {key: value}
+        """
+        self.__check_sorted()
+        entries = reversed(self._sorted) if largest else self._sorted
+        return [self.__sorted_item(entry) for entry in islice(entries, max(k, 0))]
+
+    def between(self, lo, hi) -> list:
+        """
+        :return: the list of items with value (or key) in range lo <= value <= hi in ascending order
+        """
+        self.__check_sorted()
+        start = bisect_left(self._sorted, (lo,))
+        end = bisect_right(self._sorted, (hi, float("inf")))
+        return [self.__sorted_item(entry) for entry in self._sorted[start:end]]
+
+    def length(self) -> int:
+        """
+        Return the length of SmartArray instance, O(1)
+        :return: the count of items, 0 - in case of empty
+        """
+        return len(self._values)
+
+    def set_at(self, index, value=None, key=None):
+        """
+        Set the value and key to item at specified index
+        :param index: the index of item that will be changed
+        :param value: optional parameter that will be stored
+        :param key: optional parameter that will bbe stored
+        :return: [bool] True in case of item was found and changed
+        """
+        pos = self.__at(index=index)
+        if pos < 0:
+            return False
+
+        entry = None if self._sorted is None else self.__sorted_entry(pos)
+        if value:
+            self._values[pos] = value   # first: the only step, which may fail (the wrong type of typed array)
+        self._version += 1
+        if entry is not None:
+            del self._sorted[bisect_left(self._sorted, entry)]
+        if key and key != self.__key_at(pos):
+            if self._key_index is not None:
+                if self.__key_at(pos) is not None:
+                    self.__unindex_key(self._keys[pos], pos)
+                self.__index_key(key, pos)
+            if self._keys is None:
+                self._keys = [None] * len(self._values)
+            self._keys[pos] = key
+        if self._sorted is not None:
+            self.__sort_in(pos)
+        return True
+
+    def insert(self, value, key=None, at_index=0):
+        """
+        Insert the new item at specified position
+        :param value: new item value
+        :param key: new item key (optional)
+        :param at_index: new item position inside array, Default is 0
+        :return: False in case of index is out of length
+        """
+        if not 0 <= at_index < len(self._values):
+            return False
+
+        count = len(self._values)
+        # the values are resized first: the only step, which may fail (BufferError while the values are exported,
+        # the wrong type of typed array), the indexes are not changed in this case
+        self._values.insert(at_index, value)
+        self._version += 1
+        if at_index <= count - at_index:
+            # the items before the position are fewer: all positions are shifted by the base, they are moved back
+            self.__shift_keys(0, at_index, -1)
+            self._key_base += 1
+        else:
+            self.__shift_keys(at_index, count, 1)
+        if key is not None and self._keys is None:
+            self._keys = [None] * count
+        if self._keys is not None:
+            self._keys.insert(at_index, key)
+            if key is not None and self._key_index is not None:
+                self.__index_key(key, at_index)
+        if self._sorted is not None:
+            self._ids.insert(at_index, self._next_id)
+            self._next_id += 1
+            self.__sort_in(at_index)
+        return True
+
+    def clear(self):
+        """
+        Delete all items from SmartArray
+        :return: None
+        """
+        self._keys = None
+        self._values = self.__new_values()
+        self._key_index = {}
+        self._key_base = 0
+        self._version += 1
+        self._sorted_list = None
+        if self._sorted is not None:
+            self._sorted = []
+            self._ids = []
+
+    def delete(self, at_index=-1, value=None, key=None):
+        """
+        Delete item from array. The item may be identified by its position, by value or by key
+        In case of item, specified by value or key only the first found item will be deleted
+        :param at_index: an index of item that must be deleted
+        :param value: the item with this value will be deleted
+        :param key: the item with this ey will be deleted
+        :return: False in case of out of index
+        """
+        pos = self.__at(at_index, key=key, value=value)
+        if pos < 0:
+            return False
+
+        entry = None if self._sorted is None else self.__sorted_entry(pos)
+        count = len(self._values)
+        del self._values[pos]       # first: fails while the values are exported, nothing is changed in this case
+        self._version += 1
+        if self._sorted is not None:
+            if entry is not None:
+                del self._sorted[bisect_left(self._sorted, entry)]
+            del self._ids[pos]
+        if self._keys is not None:
+            if self._keys[pos] is not None and self._key_index is not None:
+                self.__unindex_key(self._keys[pos], pos)
+            if pos < count - 1 - pos:
+                self.__shift_keys(0, pos, 1)
+                self._key_base -= 1
+            else:
+                self.__shift_keys(pos + 1, count, -1)
+            del self._keys[pos]
+        return True
+
+    def index(self, value=None, key=None) -> int:
+        """
+        Find the index of first occurrence of item with specified value or key
+        :param value: find item by value
+        :param key: find value by key
+        :return: an index of first occurrence of item or -1 in case of item not found
+        """
+        found = []
+        if key:
+            positions = self.__key_positions(key)
+            if positions:
+                found.append(positions[0])
+        if value:
+            try:
+                found.append(self._values.index(value))
+            except ValueError:
+                pass
+        return min(found) if found else -1
+
+    def value(self, index: int = -1, key=None):
+        """
+        Find and return the value of item specified by index or first occurrence of item, specified by key
+        :param index: an index of item
+        :param key: a key of item
+        :return: value or None in case of item was not found
+        """
+        pos = self.__at(index, key=key)
+        if pos < 0:
+            return None
+
+        return self._values[pos]
+
+    def key(self, index: int = -1, value=None):
+        """
+        Find and return the key of item specified by index or first occurrence of item, specified by value
+        :param index: an index of item
+        :param value: a value of item
+        :return: key or None in case of item was not found or item has not key
+        """
+        pos = self.__at(index, value=value)
+        if pos < 0:
+            return None
+
+        return self.__key_at(pos)
+
+    def at(self, index: int = -1, key=None, value=None):
+        """
+        Find an item by specified parameter and return the {key: value} or value in case of key is None
+        :param index: return an item by specified index
+        :param key: return the first occurrence of item with specified key
+        :param value: return the first occurrence of item with specified value
+        :return: the dict of item parameters: key and value in form {item.key: item.value}, or just the value in
+        case of key is None, or empty string in case of item was not found
+        """
+        pos = self.__at(index, key=key, value=value)
+        if pos < 0:
+            return ""
+
+        return self.__item(pos)
+
+    def filter(self, by_value=None, by_key=None) -> List[{}]:
+        """
+        Finds all concurrences specified by key or by value, builds and
+        returns the list of pairs in form [{key:value}, {key:value}, ...]
+        In case of two parameters are None this function return the list of all pairs
+
+        :param by_value: [any] find all concurrences by specified value
+        :param by_key: [any]  find all concurrences by specified key
+
+        :return: List: the list of pairs in form [{key:value}, {key:value}, ...],
+            or empty list in case of no one items was found
+
+        Example
+                print(arr.filter(by_key="key")
+        """
+        keys = self.__keys()
+        values = self._values
+        if by_key is None and by_value is None:
+            return [{"key": key, "value": value} for key, value in zip(keys, values)]
+        if not by_value:
+            if not by_key:
+                return []
+            return [{self._keys[pos]: values[pos]} for pos in self.__key_positions(by_key)]
+
+        if by_key is None:
+            array_values = self.__numpy_values()
+            if array_values is not None:
+                # vectorized comparison, the dicts are built for found items only
+                found = np.flatnonzero(array_values == by_value).tolist()
+                return [{self.__key_at(pos): values[pos]} for pos in found]
+
+        filtered = []
+        for key, value in zip(keys, values):
+            if by_key and by_key == key:
+                filtered.append({key: value})
+            if by_value == value:
+                filtered.append({key: value})
+        return filtered
+
+    def scopy(self):
+        """
+        Returns the safe copy of this array
+        :return:
+            SmartArray: the copy of current instance of SmartArray
+        """
+        new_arr = type(self)(sorted_by=self._sorted_by, typecode=self.typecode)
+        new_arr.extend(self._values, keys=self._keys)
+        return new_arr
+
+    def append(self, val, key=None, count: int = 1) -> int:
+        """
+        Append the new item at the end of SmartArray instance
+        :param val: [any] - the value
+        :param key: [any] - optional parameter
+        :param count: [int] - optional parameter, the count of items to be appended
+        :return: the new length of array
+        """
+        return self.extend([val] * count, keys=None if key is None else [key] * count)
+
+    def extend(self, values, keys=None) -> int:
+        """
+        Append all values at the end of SmartArray instance
+        :param values: [iterable] - the values
+        :param keys: [iterable] - optional parameter, the keys of values
+        :return: the new length of array
+        """
+        start = len(self._values)
+        if keys is not None and not (type(values) is list and type(keys) is list and len(values) == len(keys)):
+            pairs = list(zip(values, keys))
+            values = [value for value, _ in pairs]
+            keys = [key for _, key in pairs]
+        if self.typecode is not None and not isinstance(values, array):
+            values = array(self.typecode, values)   # the wrong type fails here, before the array is changed
+        # the values are extended first: the only step, which may fail (BufferError while the values are exported)
+        self._values.extend(values)
+        self._version += 1
+        if keys is None:
+            if self._keys is not None:
+                self._keys.extend(repeat(None, len(self._values) - start))
+        else:
+            if self._keys is None:
+                self._keys = [None] * start
+            self._keys.extend(keys)
+            if self._key_index is not None:
+                for pos in range(start, len(self._keys)):
+                    if self._keys[pos] is not None:
+                        self.__index_key(self._keys[pos], pos)
+        if self._sorted is not None:
+            self.__sort_extended(start)
+        return len(self._values)
+
+    def __sort_extended(self, start: int):
+        """ Add the items appended from start position to the sorted index """
+        end = len(self._values)
+        self._ids.extend(range(self._next_id, self._next_id + end - start))
+        self._next_id += end - start
+        if end - start > 32:
+            # bulk append: sort once, timsort merges the sorted runs in linear time
+            entries = (self.__sorted_entry(pos) for pos in range(start, end))
+            self._sorted.extend(entry for entry in entries if entry is not None)
+            self._sorted.sort()
+        else:
+            for pos in range(start, end):
+                self.__sort_in(pos)
+
+
+class SmartArrayView:
+    """
+    The live view of SmartArray: keys, values or (key, value) pairs.
+    Iterates the array storage directly, without building the dict per item
+    """
+    __slots__ = ("array", "kind")
+
+    def __init__(self, array: SmartArray, kind: str):
+        self.array = array
+        self.kind = kind
+
+    def __len__(self):
+        return len(self.array)
+
+    def __iter__(self):
+        array = self.array
+        version = array.version
+        keys = repeat(None, len(array)) if array._keys is None else array._keys
+        if self.kind == "keys":
+            source = keys
+        elif self.kind == "values":
+            source = array._values
+        else:
+            source = zip(keys, array._values)
+        for item in source:
+            if array.version != version:
+                raise RuntimeError("SmartArray changed during iteration")
+            yield item
+        if array.version != version:
+            raise RuntimeError("SmartArray changed during iteration")
+
+    def __repr__(self):
+        return f"SmartArrayView({self.kind}: {list(self)})"
+
+
+
+class RingSmartArray:
+    """
+    The fixed capacity circular SmartArray: the rolling window of recent samples.
+    Appending to the full window evicts the oldest item, push, evict and the access by position are O(1).
+
+    push(value, key=None) - append an item, returns the evicted item or None
+    evict() - delete and return the oldest item
+    append, extend, at, value, key, index, filter, sort, get_sorted_list, set_at, insert, delete, clear, length -
+    the same API as of SmartArray, the index 0 is the oldest item
+    min(), max(), sum(), mean() - the window aggregates, maintained incrementally
+
+    The min and max are kept in monotonic queues of (serial number, value), so they are O(1) amortized per push.
+    set_at, insert and delete of any item except the oldest change the middle of window and rebuild the
+    aggregates, O(n).
+    """
+    def __init__(self, capacity: int, from_list=[], typecode: str = None, aggregates: bool = None):
+        """
+        :param capacity: the max count of items in window
+        :param typecode: array.array typecode ('d', 'f', 'i', 'q', ...) - store the values in typed buffer
+        :param aggregates: True - maintain min, max and sum of window, the values must be numbers,
+            None - maintain them while the values are numbers, the first other value (str, dict, ...) turns them off
+            until the window is cleared, False - do not maintain
+        """
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive integer, not {capacity}")
+        self.capacity = capacity
+        self.typecode = typecode
+        self._auto_aggregates = aggregates is None and typecode is None
+        self.aggregates = aggregates is not False
+        self._version = 0
+        self._sorted_list = None
+        self.clear()
+        self.extend(from_list)
+
+    def clear(self):
+        """
+        Delete all items from window
+        :return: None
+        """
+        if self.typecode is None:
+            self._values = [None] * self.capacity
+        else:
+            self._values = array(self.typecode, [0]) * self.capacity
+        self._keys = None               # None - no one item has a key
+        self._head = 0                  # the physical position of the oldest item
+        self._length = 0
+        self._first_seq = 0             # the serial number of the oldest item
+        self._min_queue = deque()       # (seq, value), values are ascending from the oldest minimum
+        self._max_queue = deque()       # (seq, value), values are descending from the oldest maximum
+        self._sum = 0
+        self._pushes = 0                # since the last exact summation
+        self._version += 1
+        if self._auto_aggregates:
+            self.aggregates = True
+
+    def __len__(self):
+        return self._length
+
+    def __str__(self):
+        return str(self.snapshot())
+
+    def __getitem__(self, item):
+        return self.at(index=item)
+
+    def __iter__(self):
+        """
+        Iterate the items from the oldest to the newest: {key: value} or just the value in case of key is None
+        :raise RuntimeError: in case of the window was changed during iteration
+        """
+        version = self._version
+        for index in range(self._length):
+            if self._version != version:
+                raise RuntimeError("RingSmartArray changed during iteration")
+            yield self.__item(self.__pos(index))
+        if self._version != version:
+            raise RuntimeError("RingSmartArray changed during iteration")
+
+    @property
+    def version(self) -> int:
+        """ The mutation counter, incremented by every change of window """
+        return self._version
+
+    def is_full(self) -> bool:
+        return self._length == self.capacity
+
+    def length(self) -> int:
+        return self._length
+
+    def __pos(self, index: int) -> int:
+        """ :return: the physical position of item with logical index """
+        pos = self._head + index
+        return pos - self.capacity if pos >= self.capacity else pos
+
+    def __item(self, pos: int):
+        key = None if self._keys is None else self._keys[pos]
+        return self._values[pos] if key is None else {key: self._values[pos]}
+
+    def push(self, value, key=None):
+        """
+        Append the new item to window, in case of the window is full the oldest item is evicted
+        :return: the evicted item or None
+        """
+        evicted = self.evict() if self._length == self.capacity else None
+        pos = self.__pos(self._length)
+        self._values[pos] = value
+        if key is not None and self._keys is None:
+            self._keys = [None] * self.capacity
+        if self._keys is not None:
+            self._keys[pos] = key
+        self._length += 1
+        self._version += 1
+
+        if self.aggregates:
+            seq = self._first_seq + self._length - 1
+            self.__add_to_aggregates(seq, value)
+            self._pushes += 1
+            if self.aggregates and self._pushes >= self.capacity:
+                self.__resum()
+        return evicted
+
+    def __add_to_aggregates(self, seq: int, value):
+        if self._auto_aggregates and type(value) not in (float, int) and not isinstance(value, Real):
+            self.__stop_aggregates()
+            return
+        self._sum += value
+        min_queue = self._min_queue
+        while min_queue and min_queue[-1][1] > value:
+            min_queue.pop()
+        min_queue.append((seq, value))
+        max_queue = self._max_queue
+        while max_queue and max_queue[-1][1] < value:
+            max_queue.pop()
+        max_queue.append((seq, value))
+
+    def __stop_aggregates(self):
+        """ The non-numeric value is stored, the aggregates are not maintained until the window is cleared """
+        self.aggregates = False
+        self._min_queue.clear()
+        self._max_queue.clear()
+        self._sum = 0
+
+    def __resum(self):
+        """ Exact summation of window, drops the rounding errors accumulated by incremental updates of floats """
+        values = [self._values[self.__pos(index)] for index in range(self._length)]
+        if self.typecode in ('f', 'd') or (self.typecode is None and any(type(value) == float for value in values)):
+            self._sum = fsum(values)
+        else:
+            self._sum = sum(values)
+        self._pushes = 0
+
+    def __rebuild_aggregates(self):
+        self._min_queue.clear()
+        self._max_queue.clear()
+        self._sum = 0
+        if self.aggregates:
+            for index in range(self._length):
+                self.__add_to_aggregates(self._first_seq + index, self._values[self.__pos(index)])
+                if not self.aggregates:
+                    return
+            self.__resum()
+
+    def evict(self):
+        """
+        Delete the oldest item from window
+        :return: the evicted item, None in case of window is empty
+        """
+        if not self._length:
+            return None
+        pos = self._head
+        item = self.__item(pos)
+        value = self._values[pos]
+        if self.typecode is None:
+            self._values[pos] = None    # release the reference
+        if self._keys is not None:
+            self._keys[pos] = None
+        self._head = self.__pos(1)
+        self._length -= 1
+        self._version += 1
+
+        if self.aggregates:
+            seq = self._first_seq
+            self._sum -= value
+            if self._min_queue[0][0] == seq:
+                self._min_queue.popleft()
+            if self._max_queue[0][0] == seq:
+                self._max_queue.popleft()
+        self._first_seq += 1
+        return item
+
+    def append(self, val, key=None, count: int = 1) -> int:
+        """
+        Append the new item at the end of window, the oldest items are evicted from the full window
+        :return: the new length of window
+        """
+        for _ in range(count):
+            self.push(val, key)
+        return self._length
+
+    def extend(self, values, keys=None) -> int:
+        """
+        Append all values (and keys) at the end of window
+        :return: the new length of window
+        """
+        if keys is None:
+            for value in values:
+                self.push(value)
+        else:
+            for value, key in zip(values, keys):
+                self.push(value, key)
+        return self._length
+
+    def snapshot(self) -> SmartArray:
+        """
+        :return: SmartArray with the items of window from the oldest to the newest
+        """
+        arr = SmartArray(typecode=self.typecode)
+        positions = [self.__pos(index) for index in range(self._length)]
+        values = self._values
+        if self._keys is None:
+            arr.extend([values[pos] for pos in positions])
+        else:
+            arr.extend([values[pos] for pos in positions], keys=[self._keys[pos] for pos in positions])
+        return arr
+
+    def __replace(self, arr: SmartArray):
+        """ Replace the content of window by items of array (the last capacity items), rebuild the aggregates """
+        values = list(arr.values())
+        keys = list(arr.keys())
+        self.clear()
+        self.extend(values, keys)
+
+    def at(self, index: int = -1, key=None, value=None):
+        """
+        Find an item by index (O(1)), or the first occurrence of item with specified key or value (O(n))
+        :return: {key: value} or just the value in case of key is None, or empty string in case of item was not found
+        """
+        if 0 <= index < self._length:
+            return self.__item(self.__pos(index))
+        index = self.index(value=value, key=key)
+        return "" if index < 0 else self.__item(self.__pos(index))
+
+    def value(self, index: int = -1, key=None):
+        """
+        :return: the value of item specified by index or first occurrence of item with key, None - not found
+        """
+        if not 0 <= index < self._length:
+            index = self.index(key=key)
+        return None if index < 0 else self._values[self.__pos(index)]
+
+    def key(self, index: int = -1, value=None):
+        """
+        :return: the key of item specified by index or first occurrence of item with value, None - not found
+        """
+        if not 0 <= index < self._length:
+            index = self.index(value=value)
+        if index < 0 or self._keys is None:
+            return None
+        return self._keys[self.__pos(index)]
+
+    def index(self, value=None, key=None) -> int:
+        """
+        Find the index of first occurrence of item with specified value or key
+        :return: an index of first occurrence of item or -1 in case of item not found
+        """
+        for index in range(self._length):
+            pos = self.__pos(index)
+            if (key and self._keys is not None and self._keys[pos] == key) or (value and self._values[pos] == value):
+                return index
+        return -1
+
+    def filter(self, by_value=None, by_key=None) -> List[{}]:
+        """
+        The same as SmartArray.filter(), the items are in order from the oldest to the newest
+        """
+        return self.snapshot().filter(by_value=by_value, by_key=by_key)
+
+    def sort(self, reverse: bool = False, sort_by: str = "val"):
+        """
+        The same as SmartArray.sort(), the window is not changed
+        """
+        self._sorted_list = self.snapshot().sort(reverse=reverse, sort_by=sort_by)
+        return self._sorted_list
+
+    def get_sorted_list(self) -> List:
+        """
+        :return: return the previously sorted list
+        """
+        return self._sorted_list
+
+    def set_at(self, index, value=None, key=None):
+        """
+        Set the value and key to item at specified index, O(n) in case of aggregates are maintained
+        :return: [bool] True in case of item was found and changed
+        """
+        if not 0 <= index < self._length:
+            return False
+        pos = self.__pos(index)
+        if key:
+            if self._keys is None:
+                self._keys = [None] * self.capacity
+            self._keys[pos] = key
+        if value:
+            self._values[pos] = value
+        self._version += 1
+        self.__rebuild_aggregates()
+        return True
+
+    def insert(self, value, key=None, at_index=0):
+        """
+        Insert the new item at specified position, the oldest item is evicted from the full window, O(n)
+        :return: False in case of index is out of length
+        """
+        arr = self.snapshot()
+        if not arr.insert(value, key=key, at_index=at_index):
+            return False
+        if len(arr) > self.capacity:
+            arr.delete(0)
+        self.__replace(arr)
+        return True
+
+    def delete(self, at_index=-1, value=None, key=None):
+        """
+        Delete item from window, specified by position, by value or by key.
+        The deletion of the oldest item is O(1), of any other item is O(n)
+        :return: False in case of item was not found
+        """
+        if not 0 <= at_index < self._length:
+            at_index = self.index(value=value, key=key)
+            if at_index < 0:
+                return False
+        if at_index == 0:
+            self.evict()
+            return True
+        arr = self.snapshot()
+        arr.delete(at_index)
+        self.__replace(arr)
+        return True
+
+    def __check_aggregates(self):
+        if not self.aggregates:
+            raise ValueError("the aggregates are not maintained: the window holds non-numeric values, "
+                             "or it was created with aggregates=False")
+
+    def min(self):
+        """
+        :return: the least value in window (the oldest one of equal values), None in case of window is empty
+        """
+        self.__check_aggregates()
+        return self._min_queue[0][1] if self._length else None
+
+    def max(self):
+        """
+        :return: the greatest value in window (the oldest one of equal values), None in case of window is empty
+        """
+        self.__check_aggregates()
+        return self._max_queue[0][1] if self._length else None
+
+    def sum(self):
+        """
+        :return: the sum of values in window
+        """
+        self.__check_aggregates()
+        return self._sum
+
+    def mean(self):
+        """
+        :return: the arithmetic mean of values in window, None in case of window is empty
+        """
+        self.__check_aggregates()
+        return self._sum / self._length if self._length else None
 
 if __name__ == "__main__":
     test_array = SmartArray()
@@ -492,4 +1687,3 @@ if __name__ == "__main__":
     sorted = larr.sort()
     larr.clear()
     sorted = 0
-
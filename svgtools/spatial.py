@@ -0,0 +1,238 @@
+from math import floor, hypot, inf
+from operator import itemgetter
+
+
+def box_contains(box: tuple, x, y) -> bool:
+    return box[0] <= x <= box[2] and box[1] <= y <= box[3]
+
+
+def box_intersects(box: tuple, x1, y1, x2, y2) -> bool:
+    return box[0] <= x2 and x1 <= box[2] and box[1] <= y2 and y1 <= box[3]
+
+
+def box_inside(box: tuple, x1, y1, x2, y2) -> bool:
+    return x1 <= box[0] and box[2] <= x2 and y1 <= box[1] and box[3] <= y2
+
+
+def box_distance(box: tuple, x, y) -> float:
+    """ :return: the distance from point to the nearest point of box, 0 - the point is inside the box """
+    dx = max(box[0] - x, 0, x - box[2])
+    dy = max(box[1] - y, 0, y - box[3])
+    return hypot(dx, dy)
+
+
+def box_union(boxes) -> tuple:
+    """
+    :param boxes: iterable of boxes (x1, y1, x2, y2)
+    :return: the box enclosing all boxes, () in case of no boxes
+    """
+    boxes = boxes if isinstance(boxes, (list, tuple)) else list(boxes)
+    if not boxes:
+        return ()
+    return min(map(itemgetter(0), boxes)), min(map(itemgetter(1), boxes)), \
+        max(map(itemgetter(2), boxes)), max(map(itemgetter(3), boxes))
+
+
+def box_on_edge(box: tuple, outer: tuple) -> bool:
+    """ :return: True in case of box touches the edge of outer box, so it may define the size of outer box """
+    return box[0] <= outer[0] or box[1] <= outer[1] or box[2] >= outer[2] or box[3] >= outer[3]
+
+
+class SpatialGrid:
+    """ SpatialGrid
+        The uniform grid index of bounding boxes, for hit testing and region queries without the scan of all items.
+        The plane is divided into square cells, every item is stored in the buckets of all cells its box overlaps,
+        so the point query checks the items of one cell only. The cells are kept in dict, only the occupied cells
+        take memory.
+        The items with huge boxes (covering more than max_cells cells, for ex. the background) are not spread
+        over the cells, they are kept in the separate list checked by every query.
+        The results are returned in the order of insertion of items (the paint order of canvas elements,
+        the topmost element is the last one). Moving of item does not change its order.
+
+        insert(item, x1, y1, x2, y2) - add the item or move the already indexed one, O(cells of box)
+        remove(item) - delete the item from index
+        at(x, y) - items whose boxes contain the point
+        query(x1, y1, x2, y2, contained=False) - items whose boxes intersect (or are inside) the rectangle
+        nearest(x, y, max_distance=inf) - the item nearest to the point, scanning the rings of cells around it
+
+        :param cell_size: the side of cell, about the size of typical item gives the best results
+        :param max_cells: the max count of cells of item, the larger items are not spread over the cells
+    """
+    __slots__ = ("cell_size", "max_cells", "_cells", "_boxes", "_order", "_large", "_next_order", "_extent")
+
+    def __init__(self, cell_size: float = 64, max_cells: int = 256):
+        if cell_size <= 0:
+            raise ValueError(f"cell_size must be positive, not {cell_size}")
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self._cells = {}        # {(column, row): [items]}
+        self._boxes = {}        # {item: (x1, y1, x2, y2, cells)}, cells - list of cell keys, None - large item
+        self._order = {}        # {item: serial number of insertion}
+        self._large = []        # items covering more than max_cells cells
+        self._next_order = 0
+        self._extent = None     # (min column, min row, max column, max row) of all ever occupied cells
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def __contains__(self, item):
+        return item in self._boxes
+
+    def box(self, item):
+        """ :return: the indexed bounding box of item (x1, y1, x2, y2), None in case of item is not indexed """
+        box = self._boxes.get(item)
+        return None if box is None else box[:4]
+
+    def __cell(self, x, y) -> tuple:
+        return floor(x / self.cell_size), floor(y / self.cell_size)
+
+    def insert(self, item, x1, y1, x2, y2):
+        """
+        Add the item with bounding box to index, the already indexed item is moved to the new box
+        """
+        if x1 > x2:
+            x1, x2 = x2, x1
+        if y1 > y2:
+            y1, y2 = y2, y1
+        if item in self._boxes:
+            if self._boxes[item][:4] == (x1, y1, x2, y2):
+                return
+            self.__unlink(item)
+        else:
+            self._order[item] = self._next_order
+            self._next_order += 1
+
+        col1, row1 = self.__cell(x1, y1)
+        col2, row2 = self.__cell(x2, y2)
+        if (col2 - col1 + 1) * (row2 - row1 + 1) > self.max_cells:
+            self._large.append(item)
+            cells = None
+        else:
+            cells = [(col, row) for col in range(col1, col2 + 1) for row in range(row1, row2 + 1)]
+            buckets = self._cells
+            for cell in cells:
+                bucket = buckets.get(cell)
+                if bucket is None:
+                    buckets[cell] = [item]
+                else:
+                    bucket.append(item)
+            if self._extent is None:
+                self._extent = (col1, row1, col2, row2)
+            else:
+                min_col, min_row, max_col, max_row = self._extent
+                self._extent = (min(min_col, col1), min(min_row, row1), max(max_col, col2), max(max_row, row2))
+        self._boxes[item] = (x1, y1, x2, y2, cells)
+
+    def remove(self, item) -> bool:
+        """
+        Delete the item from index
+        :return: False in case of item was not indexed
+        """
+        if item not in self._boxes:
+            return False
+        self.__unlink(item)
+        del self._order[item]
+        return True
+
+    def __unlink(self, item):
+        cells = self._boxes.pop(item)[4]
+        if cells is None:
+            self._large.remove(item)
+            return
+        for cell in cells:
+            bucket = self._cells[cell]
+            bucket.remove(item)
+            if not bucket:
+                del self._cells[cell]
+
+    def clear(self):
+        self._cells.clear()
+        self._boxes.clear()
+        self._order.clear()
+        self._large.clear()
+        self._next_order = 0
+        self._extent = None
+
+    def __ordered(self, items) -> list:
+        if len(items) > 1:
+            items.sort(key=self._order.__getitem__)
+        return items
+
+    def at(self, x, y) -> list:
+        """
+        :return: the list of items whose boxes contain the point, in the order of insertion
+        """
+        boxes = self._boxes
+        found = [item for item in self._cells.get(self.__cell(x, y), ()) if box_contains(boxes[item], x, y)]
+        found.extend(item for item in self._large if box_contains(boxes[item], x, y))
+        return self.__ordered(found)
+
+    def query(self, x1, y1, x2, y2, contained: bool = False) -> list:
+        """
+        :param contained: False - items whose boxes intersect the rectangle, True - items whose boxes are inside it
+        :return: the list of items in the order of insertion
+        """
+        test = box_inside if contained else box_intersects
+        boxes = self._boxes
+        col1, row1 = self.__cell(x1, y1)
+        col2, row2 = self.__cell(x2, y2)
+        if (col2 - col1 + 1) * (row2 - row1 + 1) > len(self._cells):
+            # the rectangle covers more cells than are occupied, check the occupied ones
+            buckets = (bucket for (col, row), bucket in self._cells.items()
+                       if col1 <= col <= col2 and row1 <= row <= row2)
+        else:
+            buckets = (self._cells.get((col, row), ()) for col in range(col1, col2 + 1)
+                       for row in range(row1, row2 + 1))
+        found = set()
+        for bucket in buckets:
+            found.update(item for item in bucket if test(boxes[item], x1, y1, x2, y2))
+        found.update(item for item in self._large if test(boxes[item], x1, y1, x2, y2))
+        return self.__ordered(list(found))
+
+    def nearest(self, x, y, max_distance: float = inf):
+        """
+        Find the item nearest to the point: the rings of cells around the point are scanned until the found item
+        is nearer than any item of the next ring may be. Of items at the same distance the last inserted
+        (the topmost) one is returned
+        :param max_distance: the items farther than max_distance are ignored
+        :return: (item, distance) or None in case of no item was found
+        """
+        best = None
+        best_key = (max_distance, inf)
+        boxes = self._boxes
+        order = self._order
+
+        def check(candidates):
+            nonlocal best, best_key
+            for item in candidates:
+                key = (box_distance(boxes[item], x, y), -order[item])
+                if key < best_key:
+                    best, best_key = item, key
+
+        check(self._large)
+        if self._extent is not None:
+            col, row = self.__cell(x, y)
+            min_col, min_row, max_col, max_row = self._extent
+            last_ring = max(col - min_col, max_col - col, row - min_row, max_row - row)
+            for ring in range(last_ring + 1):
+                # the items of this ring and of the next ones are not nearer than (ring - 1) cells
+                bound = (ring - 1) * self.cell_size
+                if (best is not None and best_key[0] <= bound) or bound > max_distance:
+                    break
+                if ring * 8 > len(self._cells):
+                    # the ring is longer than the count of occupied cells, check all remaining cells at once
+                    check(item for (cell_col, cell_row), bucket in self._cells.items()
+                          if max(abs(cell_col - col), abs(cell_row - row)) >= ring for item in bucket)
+                    break
+                if ring == 0:
+                    check(self._cells.get((col, row), ()))
+                    continue
+                cells = self._cells
+                for cell_col in range(col - ring, col + ring + 1):
+                    check(cells.get((cell_col, row - ring), ()))
+                    check(cells.get((cell_col, row + ring), ()))
+                for cell_row in range(row - ring + 1, row + ring):
+                    check(cells.get((col - ring, cell_row), ()))
+                    check(cells.get((col + ring, cell_row), ()))
+
+        return None if best is None else (best, best_key[0])
@@ -0,0 +1,385 @@
+import inspect
+import json
+from functools import lru_cache
+
+from svgtools.columnar import ArrayBulbGrid
+from svgtools.document import SvgDocument
+from svgtools.figures import SmartBulb, SmartBulbGrid, SmartRect, SmartRectGrid, SmartBar, SmartBarsCtrl
+from svgtools.primitives import SvgRoot, SvgText, attr_preset, check_attr
+from svgtools.thresholds import compile_thresholds
+
+# the widget types available to specs: {"type" of widget spec: class}, may be extended by applications
+widget_types = {cls.__name__: cls for cls in (SmartBulb, SmartBulbGrid, SmartRect, SmartRectGrid, SmartBar,
+                                              SmartBarsCtrl, ArrayBulbGrid, SvgText)}
+
+# the keys of widget spec, which are not the parameters of constructor, see SpecLoader.build_widget()
+setup_keys = frozenset(('type', 'preset', 'attrs', 'min_value', 'max_value', 'thresholds', 'state', 'states',
+                        'value', 'values'))
+
+# the constructor parameters, which must be numbers (rx, ry may be percents: "3%")
+numeric_params = frozenset(('x', 'y', 'cx', 'cy', 'r', 'width', 'height', 'bulb_radius', 'gap', 'body_width',
+                            'bkg_border_width', 'bkg_gap', 'bkg_rx'))
+
+
+class SpecError(ValueError):
+    """ SpecError
+        The spec is invalid. All found errors are collected, not only the first one
+
+        :param errors: list of strings "path: message", path - for ex. canvases[0].widgets[3].width
+    """
+    def __init__(self, errors: list):
+        super().__init__(f'{len(errors)} error(s) in spec:\n' + '\n'.join(errors))
+        self.errors = errors
+
+
+@lru_cache(maxsize=None)
+def signature_params(func) -> tuple:
+    """ :return: (names of all parameters, names of required parameters) of function, self is skipped """
+    params = [param for name, param in inspect.signature(func).parameters.items()
+              if name != 'self' and param.kind not in (param.VAR_POSITIONAL, param.VAR_KEYWORD)]
+    return frozenset(param.name for param in params), \
+        frozenset(param.name for param in params if param.default is param.empty)
+
+
+@lru_cache(maxsize=None)
+def str_params(func) -> frozenset:
+    """ :return: names of parameters of function annotated as str (for ex. text of SvgText), id is checked apart """
+    return frozenset(name for name, param in inspect.signature(func).parameters.items()
+                     if param.annotation is str and name != 'id')
+
+
+def is_number(value) -> bool:
+    return type(value) in (int, float)
+
+
+class SpecLoader:
+    """ SpecLoader
+        Build the document (canvases and widgets) from the declarative spec: the dict loaded from json.
+        The whole spec is validated before anything is built, SpecError lists all errors at once.
+        The widget, which fails to build anyway, is reported by SpecError with its path as well,
+        the half-built document is never returned.
+
+        {
+          "thresholds": {"levels": "{0:blue,25:green,50:yellow,75:red}", "temp": {"0": "blue", "60": "red"}},
+          "presets": {"bar": {"type": "SmartBar", "width": 20, "height": 150, "orient": "vert", "thresholds": "levels"}},
+          "attrs": {"dimmed": {"opacity": "0.5"}},
+          "template": "<html><body>{0}</body></html>",
+          "canvases": [
+            {"id": "site", "view_box": [0, 0, 600, 400], "autobound": false, "widgets": [
+              {"type": "SmartBulbGrid", "id": "grid", "bulb_radius": 8, "count": 32, "values": [3, 25, 60]},
+              {"preset": "bar", "id": "bar-0", "x": 10, "y": 100, "value": 42, "attrs": "dimmed"}
+            ]}
+          ]
+        }
+
+        The widget spec is the keyword arguments of constructor of widget "type" (see widget_types), merged over
+        the named preset, plus the setup keys applied to the built widget in this order:
+            attrs - {name: value} or the name of shared attributes preset
+            min_value, max_value
+            thresholds - the name of shared thresholds, thresholds string or {threshold: color}
+            state, states, value, values - the initial state or value (of grid: the list of states or values)
+        The canvas spec is the keyword arguments of SvgRoot (id, class_name, view_box, attrs, autobound)
+        and the list of widgets, in paint order.
+
+        The shared parts are prepared once per spec, while it is validated: the thresholds are compiled into
+        ThresholdTable shared by all widgets using them, the named attributes into read-only presets
+        (see attr_preset()), the signatures of constructors are inspected once per type. Every canvas
+        gets all its widgets by one add_elements() call.
+
+        :param spec: dict
+    """
+    __slots__ = ("spec", "errors", "_thresholds", "_attrs", "_presets", "_ids")
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.errors = []
+        self._thresholds = {}   # {name or inline json: ThresholdTable}
+        self._attrs = {}        # {name: shared preset}
+        self._presets = {}      # {name: dict of parameters}
+        self._ids = set()
+
+    # validation
+
+    def error(self, path: str, message: str):
+        self.errors.append(f'{path}: {message}')
+
+    def validate(self) -> list:
+        """
+        Check the whole spec and prepare its shared parts
+        :return: the list of errors, empty in case of the spec is valid
+        """
+        self.errors = []
+        self._ids = set()
+        spec = self.spec
+        if not isinstance(spec, dict):
+            self.error('spec', 'must be an object')
+            return self.errors
+        for key in spec.keys() - {'thresholds', 'presets', 'attrs', 'template', 'canvases'}:
+            self.error(key, 'unknown key')
+        if not isinstance(spec.get('template', ''), str):
+            self.error('template', 'must be a string')
+
+        for name, thresholds in self.__section('thresholds').items():
+            self.__compile_thresholds(f'thresholds.{name}', thresholds, name)
+        for name, attrs in self.__section('attrs').items():
+            if isinstance(attrs, dict):
+                self.__check_attrs(f'attrs.{name}', attrs)
+                self._attrs[name] = attr_preset(attrs)
+            else:
+                self.error(f'attrs.{name}', 'must be an object')
+        for name, preset in self.__section('presets').items():
+            if isinstance(preset, dict):
+                self._presets[name] = preset
+            else:
+                self.error(f'presets.{name}', 'must be an object')
+        for name, preset in self._presets.items():
+            self.__check_preset(f'presets.{name}', preset)
+
+        canvases = spec.get('canvases')
+        if not isinstance(canvases, list) or not canvases:
+            self.error('canvases', 'must be a non-empty list')
+        else:
+            for index, canvas in enumerate(canvases):
+                self.__check_canvas(f'canvases[{index}]', canvas)
+        return self.errors
+
+    def __section(self, key: str) -> dict:
+        section = self.spec.get(key, {})
+        if not isinstance(section, dict):
+            self.error(key, 'must be an object')
+            return {}
+        return section
+
+    def __compile_thresholds(self, path: str, thresholds, name: str = None):
+        """ Compile the thresholds string or {threshold: color}, the json keys of dict are converted to numbers """
+        key = name or json.dumps(thresholds, sort_keys=True)
+        if key in self._thresholds:
+            return
+        try:
+            if isinstance(thresholds, dict):
+                thresholds = {float(threshold) if '.' in threshold else int(threshold): color
+                              for threshold, color in thresholds.items()}
+            elif not isinstance(thresholds, str):
+                raise ValueError('must be a string or an object')
+            self._thresholds[key] = compile_thresholds(thresholds)
+        except (ValueError, TypeError) as e:
+            self.error(path, f'invalid thresholds {thresholds!r}: {e}')
+
+    def __check_canvas(self, path: str, canvas):
+        if not isinstance(canvas, dict):
+            self.error(path, 'must be an object')
+            return
+        for key in canvas.keys() - {'id', 'class_name', 'view_box', 'attrs', 'autobound', 'widgets'}:
+            self.error(f'{path}.{key}', 'unknown key')
+        view_box = canvas.get('view_box')
+        if not isinstance(view_box, list) or len(view_box) != 4 or not all(map(is_number, view_box)):
+            self.error(f'{path}.view_box', 'must be a list of 4 numbers [x, y, width, height]')
+        if 'attrs' in canvas:
+            self.__check_attrs_param(f'{path}.attrs', canvas['attrs'])
+        if not isinstance(canvas.get('autobound', True), bool):
+            self.error(f'{path}.autobound', 'must be true or false')
+        widgets = canvas.get('widgets', [])
+        if not isinstance(widgets, list):
+            self.error(f'{path}.widgets', 'must be a list')
+            return
+        for index, widget in enumerate(widgets):
+            self.__check_widget(f'{path}.widgets[{index}]', widget)
+
+    def __check_attrs_param(self, path: str, attrs):
+        """ The attrs of widget or canvas: {name: value} or the name of attributes preset """
+        if isinstance(attrs, dict):
+            self.__check_attrs(path, attrs)
+        elif not isinstance(attrs, str) or attrs not in self._attrs:
+            self.error(path, 'must be an object or the name of attributes preset')
+
+    def __check_attrs(self, path: str, attrs: dict):
+        """ The names and values of attributes are serialized into the valid markup, see check_attr() """
+        for name, value in attrs.items():
+            try:
+                check_attr(name, value)
+            except ValueError as e:
+                self.error(f'{path}.{name}', str(e))
+
+    @staticmethod
+    def __widget_type(widget: dict):
+        """ :return: the class of widget type, None in case of the type is missed or unknown """
+        widget_type = widget.get('type')
+        return widget_types.get(widget_type) if isinstance(widget_type, str) else None
+
+    def __check_preset(self, path: str, preset: dict):
+        """ The preset is the partial widget spec: the parameters are checked, the required ones may be missed """
+        if 'preset' in preset:
+            self.error(f'{path}.preset', 'the presets can not be nested')
+        cls = self.__widget_type(preset)
+        if 'type' in preset and cls is None:
+            self.error(f'{path}.type', f'unknown widget type {preset["type"]!r}')
+        self.__check_params(path, preset, cls, required=False)
+
+    def __check_widget(self, path: str, widget):
+        if not isinstance(widget, dict):
+            self.error(path, 'must be an object')
+            return
+        if 'preset' in widget:
+            if not isinstance(widget['preset'], str):
+                self.error(f'{path}.preset', f'must be the name of preset, not {widget["preset"]!r}')
+                return
+            preset = self._presets.get(widget['preset'])
+            if preset is None:
+                self.error(f'{path}.preset', f'unknown preset {widget["preset"]!r}')
+                return
+            widget = {**preset, **widget}
+        cls = self.__widget_type(widget)
+        if cls is None:
+            self.error(f'{path}.type', f'unknown widget type {widget.get("type")!r}, '
+                                       f'one of {", ".join(widget_types)} is expected')
+            return
+        self.__check_params(path, widget, cls, required=True)
+
+        widget_id = widget.get('id')
+        if widget_id is not None and not isinstance(widget_id, str):
+            self.error(f'{path}.id', f'must be a string, not {widget_id!r}')
+        elif widget_id:
+            if widget_id in self._ids:
+                self.error(f'{path}.id', f'duplicate id {widget_id!r}')
+            self._ids.add(widget_id)
+
+    def __check_params(self, path: str, widget: dict, cls, required: bool):
+        if cls is not None:
+            names, required_names = signature_params(cls.__init__)
+            for key in widget.keys() - names - setup_keys:
+                self.error(f'{path}.{key}', f'unknown parameter of {cls.__name__}')
+            if required:
+                for key in sorted(required_names - widget.keys()):
+                    self.error(f'{path}.{key}', f'required parameter of {cls.__name__} is missed')
+            for key in sorted(str_params(cls.__init__).intersection(widget)):
+                if not isinstance(widget[key], str):
+                    self.error(f'{path}.{key}', f'must be a string, not {widget[key]!r}')
+            for key in ('state', 'states', 'value', 'values', 'thresholds', 'min_value', 'max_value'):
+                method = 'set_' + key
+                if key in widget and (not hasattr(cls, method)
+                                      or len(signature_params(getattr(cls, method))[1]) != 1):
+                    self.error(f'{path}.{key}', f'{cls.__name__} has no {method}() of one argument')
+
+        for key in numeric_params.intersection(widget):
+            if not is_number(widget[key]):
+                self.error(f'{path}.{key}', f'must be a number, not {widget[key]!r}')
+        if 'count' in widget and (type(widget['count']) != int or widget['count'] < 1):
+            self.error(f'{path}.count', f'must be a positive integer, not {widget["count"]!r}')
+        for key in ('value', 'min_value', 'max_value'):
+            if key in widget and not is_number(widget[key]):
+                self.error(f'{path}.{key}', f'must be a number, not {widget[key]!r}')
+        if 'state' in widget and type(widget['state']) != int:
+            self.error(f'{path}.state', f'must be an integer, not {widget["state"]!r}')
+        for key, check in (('values', is_number), ('states', lambda item: type(item) == int)):
+            if key in widget and (not isinstance(widget[key], list) or not all(map(check, widget[key]))):
+                self.error(f'{path}.{key}', f'must be a list of {"numbers" if key == "values" else "integers"}')
+        if 'attrs' in widget:
+            self.__check_attrs_param(f'{path}.attrs', widget['attrs'])
+        thresholds = widget.get('thresholds')
+        if thresholds is not None:
+            if isinstance(thresholds, str) and ':' not in thresholds:
+                if thresholds not in self._thresholds:
+                    self.error(f'{path}.thresholds', f'unknown thresholds {thresholds!r}')
+            else:
+                self.__compile_thresholds(f'{path}.thresholds', thresholds)
+
+    # building
+
+    def thresholds(self, thresholds):
+        """ :return: the shared ThresholdTable of thresholds of widget spec: the name, string or dict """
+        if isinstance(thresholds, str) and ':' not in thresholds:
+            return self._thresholds[thresholds]
+        return self._thresholds[json.dumps(thresholds, sort_keys=True)]
+
+    def attrs(self, attrs):
+        """ :return: the shared preset of attributes of widget spec, or the dict as it is """
+        return attrs if isinstance(attrs, dict) else self._attrs[attrs]
+
+    def build_widget(self, widget: dict):
+        if 'preset' in widget:
+            widget = {**self._presets[widget['preset']], **widget}
+        params = {key: value for key, value in widget.items() if key not in setup_keys}
+        element = widget_types[widget['type']](**params)
+        if 'attrs' in widget:
+            element.set_attrs(self.attrs(widget['attrs']))
+        if 'min_value' in widget:
+            element.set_min_value(widget['min_value'])
+        if 'max_value' in widget:
+            element.set_max_value(widget['max_value'])
+        if 'thresholds' in widget:
+            element.set_thresholds(self.thresholds(widget['thresholds']))
+        for key in ('state', 'states', 'value', 'values'):
+            if key in widget:
+                getattr(element, 'set_' + key)(widget[key])
+        return element
+
+    def build_canvas(self, canvas: dict, path: str = 'canvas') -> SvgRoot:
+        """
+        Build the validated canvas spec
+        :param path: the path of canvas in spec, for errors
+        :raise SpecError: in case of any widget fails to build, all failures are listed
+        """
+        attrs = canvas.get('attrs')
+        try:
+            root = SvgRoot(id=canvas.get('id', ''), class_name=canvas.get('class_name', ''),
+                           view_box=canvas['view_box'], attrs=None if attrs is None else self.attrs(attrs),
+                           autobound=canvas.get('autobound', True))
+        except Exception as e:
+            raise SpecError([f'{path}: {type(e).__name__}: {e}']) from e
+        widgets = []
+        errors = []
+        for index, widget in enumerate(canvas.get('widgets', [])):
+            try:
+                widgets.append(self.build_widget(widget))
+            except Exception as e:
+                errors.append(f'{path}.widgets[{index}]: {type(e).__name__}: {e}')
+        if errors:
+            raise SpecError(errors)
+        root.add_elements(widgets)
+        return root
+
+    def load(self) -> SvgDocument:
+        """
+        Validate the spec and build the document
+        :raise SpecError: in case of the spec is invalid, nothing is built
+        """
+        if self.validate():
+            raise SpecError(self.errors)
+        canvases = []
+        for index, canvas in enumerate(self.spec['canvases']):
+            try:
+                canvases.append(self.build_canvas(canvas, f'canvases[{index}]'))
+            except SpecError as e:
+                self.errors.extend(e.errors)
+        if self.errors:
+            raise SpecError(self.errors)
+        return SvgDocument(canvases, template=self.spec.get('template', ''))
+
+
+def load_spec(spec: dict | str) -> SvgDocument:
+    """
+    Build the document from spec, see SpecLoader
+    :param spec: dict or json string
+    :raise SpecError: in case of the spec is invalid
+    """
+    if isinstance(spec, str):
+        spec = json.loads(spec)
+    return SpecLoader(spec).load()
+
+
+def load_spec_file(path: str) -> SvgDocument:
+    with open(path, encoding='utf-8') as file:
+        return load_spec(json.load(file))
+
+
+def load_canvas(spec: dict | str, index: int = 0) -> SvgRoot:
+    """
+    Build one canvas of spec, may be used as the builder of CanvasSpec for BatchRenderer
+    :param index: the index of canvas in spec
+    """
+    if isinstance(spec, str):
+        spec = json.loads(spec)
+    loader = SpecLoader(spec)
+    if loader.validate():
+        raise SpecError(loader.errors)
+    return loader.build_canvas(spec['canvases'][index], f'canvases[{index}]')
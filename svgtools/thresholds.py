@@ -0,0 +1,120 @@
+from bisect import bisect_left
+from weakref import WeakValueDictionary
+
+try:
+    import numpy as np
+except ImportError:     # numpy is optional, resolve_many() falls back to pure python
+    np = None
+
+
+class ThresholdTable:
+    """ ThresholdTable
+        Immutable, sorted table of thresholds: {threshold value: color}.
+        The color of value is the color of the greatest threshold lower than the value,
+        it is resolved by binary search in O(log k), regardless of the order the thresholds were specified in.
+        Do not create tables directly, use compile_thresholds(), which shares the same table between all
+        widgets with identical thresholds.
+
+        :param items: iterable of pairs (threshold value, color)
+    """
+    __slots__ = ("keys", "colors", "_str", "__weakref__")
+
+    def __init__(self, items=()):
+        pairs = sorted(items, key=lambda pair: pair[0])
+        self.keys = tuple(pair[0] for pair in pairs)
+        self.colors = tuple(pair[1] for pair in pairs)
+        self._str = str(dict(pairs))
+
+    def __str__(self) -> str:
+        return self._str
+
+    def __repr__(self) -> str:
+        return f'ThresholdTable: {self._str}'
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __contains__(self, key) -> bool:
+        index = bisect_left(self.keys, key)
+        return index < len(self.keys) and self.keys[index] == key
+
+    def __getitem__(self, key):
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            return self.colors[index]
+        raise KeyError(key)
+
+    def items(self):
+        return zip(self.keys, self.colors)
+
+    def to_dict(self) -> dict:
+        return dict(zip(self.keys, self.colors))
+
+    def index(self, value) -> int:
+        """
+        Return the index of the color of value, -1 in case of value is not greater than any threshold
+        """
+        return bisect_left(self.keys, value) - 1
+
+    def resolve(self, value, default: str = 'black') -> str:
+        """
+        Return the color of value: the color of the greatest threshold lower than value
+        :param value: the value to be resolved
+        :param default: the color in case of value is not greater than any threshold
+        """
+        index = bisect_left(self.keys, value)
+        return self.colors[index - 1] if index else default
+
+    def resolve_many(self, values, default: str = 'black') -> list:
+        """
+        Resolve the colors of many values at once, vectorized in case of values is a numpy array
+        :param values: numpy array or any iterable of values
+        :param default: the color in case of value is not greater than any threshold
+        :return: list of colors
+        """
+        colors = (default,) + self.colors
+        if np is not None and isinstance(values, np.ndarray):
+            indexes = np.searchsorted(self.keys, values, side='left') if self.keys else np.zeros(len(values), int)
+            return np.array(colors, dtype=object)[indexes].tolist()
+        keys = self.keys
+        return [colors[bisect_left(keys, value)] for value in values]
+
+
+_interned = WeakValueDictionary()   # {sorted pairs: table}, tables live while some widget uses them
+
+
+def parse_thresholds(thr_str: str) -> list:
+    """
+    Parse the thresholds string, for ex: '{0:blue,25:green,50:yellow,75:red}'
+    :return: list of pairs (threshold value, color)
+    """
+    thr_str = thr_str.strip().removeprefix('{').removesuffix('}')
+    pairs = []
+    for thr in thr_str.split(","):
+        v, c = thr.split(":")
+        pairs.append((int(v), c.strip()))
+    return pairs
+
+
+def compile_thresholds(thresholds: str | dict | ThresholdTable) -> ThresholdTable:
+    """
+    Compile thresholds into the immutable ThresholdTable. Identical thresholds are compiled into the same table
+    :param thresholds: thresholds string '{0:blue,25:green}', dict {0: 'blue', 25: 'green'} or compiled table
+    :return: ThresholdTable
+    """
+    if isinstance(thresholds, ThresholdTable):
+        return thresholds
+    if type(thresholds) == str:
+        pairs = parse_thresholds(thresholds)
+    else:
+        pairs = thresholds.items()
+
+    key = tuple(sorted(pairs, key=lambda pair: pair[0]))
+    table = _interned.get(key)
+    if table is None:
+        table = ThresholdTable(key)
+        _interned[key] = table
+    return table